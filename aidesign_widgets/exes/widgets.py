@@ -81,6 +81,10 @@ def _run_command():
         from aidesign_widgets.exes import widgets_grid_crop
         widgets_grid_crop.argv_copy = argv_copy
         widgets_grid_crop.run()
+    elif command == "grid-stitch":
+        from aidesign_widgets.exes import widgets_grid_stitch
+        widgets_grid_stitch.argv_copy = argv_copy
+        widgets_grid_stitch.run()
     elif command == "rand-crop":
         from aidesign_widgets.exes import widgets_rand_crop
         widgets_rand_crop.argv_copy = argv_copy
@@ -97,6 +101,10 @@ def _run_command():
         from aidesign_widgets.exes import widgets_bulk_crop
         widgets_bulk_crop.argv_copy = argv_copy
         widgets_bulk_crop.run()
+    elif command == "bench":
+        from aidesign_widgets.exes import widgets_bench
+        widgets_bench.argv_copy = argv_copy
+        widgets_bench.run()
     else:
         print(unknown_cmd_info.format(command), file=_stderr)
         _exit(1)
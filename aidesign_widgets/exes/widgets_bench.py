@@ -0,0 +1,764 @@
+""""widgets bench" command executable."""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import copy
+import datetime
+import random
+import sys
+import time
+import traceback
+import typing
+
+from os import path as ospath
+from PIL import Image as pil_image
+
+from aidesign_widgets.libs import codecs
+from aidesign_widgets.libs import crops
+from aidesign_widgets.libs import defaults
+from aidesign_widgets.libs import utils
+
+# Aliases
+
+_abspath = ospath.abspath
+_argv = sys.argv
+_check_format = codecs.check_format
+_clamp_int = utils.clamp_int
+_decode = codecs.decode
+_deepcopy = copy.deepcopy
+_encode = codecs.encode
+_exit = sys.exit
+_find_mse = codecs.find_mse
+_find_reducing_gap = crops.find_reducing_gap
+_find_save_kwargs = codecs.find_save_kwargs
+_flushlogs = utils.flushlogs
+_format_exc = traceback.format_exc
+_IO = typing.IO
+_join = ospath.join
+_load_json = utils.load_json
+_logln = utils.logln
+_logstr = utils.logstr
+_mse_to_psnr = codecs.mse_to_psnr
+_now = datetime.datetime.now
+_perf_counter = time.perf_counter
+_pil_image = pil_image
+# _print_exc = traceback.print_exc  # Debug
+_Random = random.Random
+_resize_image = crops.resize_image
+_stderr = sys.stderr
+_stdout = sys.stdout
+_supported_formats = codecs.supported_formats
+_supported_profiles = codecs.supported_profiles
+_supported_resamples = crops.supported_resamples
+_TimedInput = utils.TimedInput
+
+# -
+
+brief_usage = "widgets bench <command> ..."
+"""Brief usage."""
+
+usage = fr"""
+
+Usage: {brief_usage}
+Help: widgets help
+
+""".strip()
+"""Usage."""
+
+timeout = float(10)
+"""Timeout in seconds."""
+supported_bench_types = ["codec", "resample"]
+"""Supported benchmark types."""
+
+info = fr"""
+
+"{brief_usage}", command "{{}}", command config:
+{{}}
+-
+Please confirm the above config file contents
+Do you want to continue? [ Y (Yes) | n (no) ]: < default: Yes, timeout: {timeout} seconds >
+
+""".strip()
+"""Primary info to display."""
+
+will_start_info = fr"""
+
+Will start benchmarking
+---- The following will be logged to {{}} ----
+
+""".strip()
+"""Info to display before benchmarking starts."""
+
+stopped_info = fr"""
+
+---- The above has been logged to {{}} ----
+Benchmarking stopped
+
+""".strip()
+"""Info to display after benchmarking stops."""
+
+completed_info = fr"""
+
+---- The above has been logged to {{}} ----
+Benchmarking completed
+
+""".strip()
+"""Info to display after benchmarking completes."""
+
+aborted_info = fr"""
+
+Aborted the benchmarking process
+
+""".strip()
+"""Info to display when the user aborts the benchmarking process."""
+
+too_few_args_info = fr"""
+
+"{brief_usage}" gets too few arguments
+Expects 1 arguments; Gets {{}} arguments
+{usage}
+
+""".strip()
+"""Info to display when the executable gets too few arguments."""
+
+too_many_args_info = fr"""
+
+"{brief_usage}" gets too many arguments
+Expects 1 arguments; Gets {{}} arguments
+{usage}
+
+""".strip()
+"""Info to display when the executable gets too many arguments."""
+
+unknown_bench_type_info = fr"""
+
+"{brief_usage}" gets an unknown benchmark type: "{{}}"
+Supported benchmark types: {supported_bench_types}
+{usage}
+
+""".strip()
+"""Info to display when the executable gets an unknown benchmark type."""
+
+argv_copy = None
+"""Consumable copy of sys.argv."""
+bench_type = None
+"""Benchmark type."""
+config_loc = None
+"""Config location."""
+log_loc = None
+"""Log location."""
+
+
+def _parse_image_loc(config):
+    config: dict = config
+
+    image_loc = config["image_location"]
+
+    if image_loc is None:
+        raise ValueError("Image location cannot be None")
+
+    image_loc = str(image_loc)
+    image_loc = _abspath(image_loc)
+    return image_loc
+
+
+def _parse_rand_seed(config):
+    """Returns manual_seed, seed."""
+    config: dict = config
+
+    manual_seed = config["manual_seed"]
+
+    if manual_seed is None:
+        manual_seed = None
+        seed = _Random().randint(0, 2 ** 32 - 1)
+    else:  # elif manual_seed is not None:
+        manual_seed = int(manual_seed) % (2 ** 32 - 1)
+        manual_seed = int(manual_seed)
+        seed = manual_seed
+    # end if
+
+    return manual_seed, seed
+
+
+def _parse_crop_res(config):
+    config: dict = config
+
+    crop_res = config["crop_resolution"]
+
+    if crop_res is None:
+        raise ValueError("Crop resolution cannot be None")
+
+    crop_res = int(crop_res)
+
+    if crop_res == 0:
+        crop_res = 1
+
+    if crop_res < 0:
+        crop_res *= -1
+
+    return crop_res
+
+
+def _parse_resize_res(config):
+    config: dict = config
+
+    resize_res = config["resize_resolution"]
+
+    if resize_res is not None:
+        resize_res = int(resize_res)
+
+        if resize_res == 0:
+            resize_res = 1
+
+        if resize_res < 0:
+            resize_res *= -1
+    else:  # elif resize_res is None:
+        resize_res = None
+    # end if
+
+    return resize_res
+
+
+def _parse_crop_quality(config):
+    config: dict = config
+
+    crop_quality_key = "crop_quality"
+
+    if crop_quality_key in config:
+        crop_quality = config[crop_quality_key]
+        crop_quality = int(crop_quality)
+        crop_quality = _clamp_int(crop_quality, 0, 100)
+    else:
+        crop_quality = 95
+    # end if
+
+    return crop_quality
+
+
+def _parse_sample_count(config):
+    config: dict = config
+
+    sample_count = config["sample_count"]
+
+    if sample_count is None:
+        raise ValueError("Sample count cannot be None")
+
+    sample_count = int(sample_count)
+
+    if sample_count == 0:
+        sample_count = 1
+
+    if sample_count < 0:
+        sample_count *= -1
+
+    return sample_count
+
+
+def _parse_out_formats(config):
+    config: dict = config
+
+    out_formats_key = "output_formats"
+
+    if out_formats_key in config and config[out_formats_key] is not None:
+        out_formats = config[out_formats_key]
+        out_formats = [str(out_format).lower() for out_format in out_formats]
+    else:
+        out_formats = list(_supported_formats)
+    # end if
+
+    for out_format in out_formats:
+        if out_format not in _supported_formats:
+            raise ValueError(f"Unsupported output format: {out_format}; Supported: {_supported_formats}")
+    # end for
+
+    return out_formats
+
+
+def _parse_encoder_profiles(config):
+    config: dict = config
+
+    encoder_profiles_key = "encoder_profiles"
+
+    if encoder_profiles_key in config and config[encoder_profiles_key] is not None:
+        encoder_profiles = config[encoder_profiles_key]
+        encoder_profiles = [str(encoder_profile).lower() for encoder_profile in encoder_profiles]
+    else:
+        encoder_profiles = list(_supported_profiles)
+    # end if
+
+    for encoder_profile in encoder_profiles:
+        if encoder_profile not in _supported_profiles:
+            raise ValueError(f"Unsupported encoder profile: {encoder_profile}; Supported: {_supported_profiles}")
+    # end for
+
+    return encoder_profiles
+
+
+def _parse_resamples(config):
+    config: dict = config
+
+    resamples_key = "resamples"
+
+    if resamples_key in config and config[resamples_key] is not None:
+        resamples = config[resamples_key]
+        resamples = [str(resample).lower() for resample in resamples]
+    else:
+        resamples = list(_supported_resamples)
+    # end if
+
+    for resample in resamples:
+        if resample not in _supported_resamples:
+            raise ValueError(f"Unsupported resample: {resample}; Supported: {_supported_resamples}")
+    # end for
+
+    return resamples
+
+
+def _parse_reducing_gaps(config):
+    config: dict = config
+
+    reducing_gaps_key = "reducing_gaps"
+
+    if reducing_gaps_key in config and config[reducing_gaps_key] is not None:
+        reducing_gaps = config[reducing_gaps_key]
+        reducing_gaps = [_find_reducing_gap(reducing_gap) for reducing_gap in reducing_gaps]
+    else:
+        reducing_gaps = [None, float(2), float(3)]
+    # end if
+
+    return reducing_gaps
+
+
+def _sample_crops(image, rand, crop_res, resize_res, sample_count):
+    image: _pil_image.Image = image
+    rand: random.Random = rand
+
+    width, height = image.size
+    max_pos_x = width - crop_res
+    max_pos_y = height - crop_res
+    crops = []
+
+    if max_pos_x < 0 or max_pos_y < 0:
+        return crops
+
+    for _ in range(sample_count):
+        pos_x = rand.randint(0, max_pos_x)
+        pos_y = rand.randint(0, max_pos_y)
+        box = (pos_x, pos_y, pos_x + crop_res, pos_y + crop_res)
+        crop = image.crop(box)
+
+        if resize_res is not None:
+            crop = crop.resize(size=(resize_res, resize_res), resample=_pil_image.BICUBIC)
+
+        crop.load()
+        crops.append(crop)
+    # end for
+
+    return crops
+
+
+def _bench_codec(crops, out_format, encoder_profile, crop_quality):
+    """Returns encode_ms, byte_count, psnr, all averaged per crop."""
+    crops: list[_pil_image.Image] = crops
+
+    save_kwargs = _find_save_kwargs(out_format, encoder_profile, crop_quality)
+    datas = []
+
+    # Warm up the encoder so that its one-time setup cost is not timed
+    _encode(crops[0], out_format, save_kwargs)
+
+    start_time = _perf_counter()
+
+    for crop in crops:
+        data = _encode(crop, out_format, save_kwargs)
+        datas.append(data)
+    # end for
+
+    end_time = _perf_counter()
+
+    crop_count = len(crops)
+    encode_ms = (end_time - start_time) * 1000 / crop_count
+    byte_count = sum(len(data) for data in datas) / crop_count
+    total_mse = 0.0
+
+    for crop, data in zip(crops, datas):
+        decoded = _decode(data)
+        total_mse += _find_mse(crop, decoded)
+    # end for
+
+    psnr = _mse_to_psnr(total_mse / crop_count)
+    return encode_ms, byte_count, psnr
+
+
+def _bench_resample(crops, ref_crops, resize_res, resample, reducing_gap):
+    """Returns resize_ms, psnr, both averaged per crop; psnr is against the reference crops."""
+    crops: list[_pil_image.Image] = crops
+    ref_crops: list[_pil_image.Image] = ref_crops
+
+    size = (resize_res, resize_res)
+    resized_crops = []
+
+    # Warm up the resampler so that its one-time setup cost is not timed
+    _resize_image(crops[0], size, resample, reducing_gap)
+
+    start_time = _perf_counter()
+
+    for crop in crops:
+        resized_crop = _resize_image(crop, size, resample, reducing_gap)
+        resized_crop.load()
+        resized_crops.append(resized_crop)
+    # end for
+
+    end_time = _perf_counter()
+
+    crop_count = len(crops)
+    resize_ms = (end_time - start_time) * 1000 / crop_count
+    total_mse = 0.0
+
+    for ref_crop, resized_crop in zip(ref_crops, resized_crops):
+        total_mse += _find_mse(ref_crop, resized_crop)
+
+    psnr = _mse_to_psnr(total_mse / crop_count)
+    return resize_ms, psnr
+
+
+def _prep_and_bench_codec(logs):
+    global config_loc
+    logs: list[_IO] = logs
+
+    info = str(
+        "Started preparation\n"
+        "-"
+    )
+
+    _logln(logs, info)
+
+    # Parse config
+    config = _load_json(config_loc)
+
+    image_loc = _parse_image_loc(config)
+    _logln(logs, f"Image location: {image_loc}")
+
+    manual_seed, seed = _parse_rand_seed(config)
+    rand = _Random(seed)
+
+    if manual_seed is None:
+        _logln(logs, f"Auto random seed: {seed}")
+    else:
+        _logln(logs, f"Manual random seed: {seed}")
+    # end if
+
+    crop_res = _parse_crop_res(config)
+    _logln(logs, f"Crop resolution: {crop_res}")
+    resize_res = _parse_resize_res(config)
+
+    if resize_res is None:
+        _logln(logs, "No resize, keep crop resolution")
+    else:
+        _logln(logs, f"Resize resolution: {resize_res}")
+    # end if
+
+    crop_quality = _parse_crop_quality(config)
+    _logln(logs, f"Crop quality: {crop_quality}")
+    sample_count = _parse_sample_count(config)
+    _logln(logs, f"Sample count: {sample_count}")
+    out_formats = _parse_out_formats(config)
+    _logln(logs, f"Output formats: {out_formats}")
+    encoder_profiles = _parse_encoder_profiles(config)
+    _logln(logs, f"Encoder profiles: {encoder_profiles}")
+
+    # Edit PIL max image pixels to avoid zip bomb detection false alarm
+    max_width = 65535
+    max_height = 65535
+    max_pixels = max_width * max_height
+    _pil_image.MAX_IMAGE_PIXELS = max_pixels
+    _logln(logs, f"Tweaked PIL safety max pixels:  Width: {max_width}  Height: {max_height}  Total: {max_pixels}")
+
+    # Read image and sample crops
+    image = _pil_image.open(image_loc)
+    _logln(logs, "Completed loading image")
+    crops = _sample_crops(image, rand, crop_res, resize_res, sample_count)
+    _logln(logs, f"Sampled {len(crops)} crops")
+
+    if len(crops) <= 0:
+        raise ValueError(f"Crop resolution {crop_res} is larger than the image size {image.size}")
+
+    info = str(
+        "-\n"
+        "Completed preparation"
+    )
+
+    _logln(logs, info)
+
+    info = str(
+        "Started codec benchmarking\n"
+        "-"
+    )
+
+    _logln(logs, info)
+
+    for out_format in out_formats:
+        if not _check_format(out_format):
+            _logln(logs, f"Skipped output format {out_format}: not supported by the installed PIL")
+            continue
+
+        for encoder_profile in encoder_profiles:
+            encode_ms, byte_count, psnr = _bench_codec(crops, out_format, encoder_profile, crop_quality)
+
+            info = str(
+                f"Format: {out_format:<5}  Profile: {encoder_profile:<8}  "
+                f"Encode: {encode_ms:.3f} ms/crop  Size: {byte_count:.1f} bytes/crop  PSNR: {psnr:.2f} dB"
+            )
+
+            _logln(logs, info)
+        # end for
+    # end for
+
+    info = str(
+        "-\n"
+        "Completed codec benchmarking"
+    )
+
+    _logln(logs, info)
+    _flushlogs(logs)
+
+
+def _prep_and_bench_resample(logs):
+    global config_loc
+    logs: list[_IO] = logs
+
+    info = str(
+        "Started preparation\n"
+        "-"
+    )
+
+    _logln(logs, info)
+
+    # Parse config
+    config = _load_json(config_loc)
+
+    image_loc = _parse_image_loc(config)
+    _logln(logs, f"Image location: {image_loc}")
+
+    manual_seed, seed = _parse_rand_seed(config)
+    rand = _Random(seed)
+
+    if manual_seed is None:
+        _logln(logs, f"Auto random seed: {seed}")
+    else:
+        _logln(logs, f"Manual random seed: {seed}")
+    # end if
+
+    crop_res = _parse_crop_res(config)
+    _logln(logs, f"Crop resolution: {crop_res}")
+    resize_res = _parse_resize_res(config)
+
+    if resize_res is None:
+        raise ValueError("Resize resolution cannot be None for resample benchmarking")
+
+    _logln(logs, f"Resize resolution: {resize_res}")
+    sample_count = _parse_sample_count(config)
+    _logln(logs, f"Sample count: {sample_count}")
+    resamples = _parse_resamples(config)
+    _logln(logs, f"Resamples: {resamples}")
+    reducing_gaps = _parse_reducing_gaps(config)
+    _logln(logs, f"Reducing gaps: {reducing_gaps}")
+
+    # Edit PIL max image pixels to avoid zip bomb detection false alarm
+    max_width = 65535
+    max_height = 65535
+    max_pixels = max_width * max_height
+    _pil_image.MAX_IMAGE_PIXELS = max_pixels
+    _logln(logs, f"Tweaked PIL safety max pixels:  Width: {max_width}  Height: {max_height}  Total: {max_pixels}")
+
+    # Read image and sample crops
+    image = _pil_image.open(image_loc)
+    _logln(logs, "Completed loading image")
+    crops = _sample_crops(image, rand, crop_res, None, sample_count)
+    _logln(logs, f"Sampled {len(crops)} crops")
+
+    if len(crops) <= 0:
+        raise ValueError(f"Crop resolution {crop_res} is larger than the image size {image.size}")
+
+    # The full precision Lanczos resize is the quality reference
+    ref_crops = [_resize_image(crop, (resize_res, resize_res), "lanczos") for crop in crops]
+
+    info = str(
+        "-\n"
+        "Completed preparation"
+    )
+
+    _logln(logs, info)
+
+    info = str(
+        "Started resample benchmarking\n"
+        "-"
+    )
+
+    _logln(logs, info)
+
+    for resample in resamples:
+        for reducing_gap in reducing_gaps:
+            # The nearest resample ignores the reducing gap
+            if resample == "nearest" and reducing_gap is not None:
+                continue
+
+            resize_ms, psnr = _bench_resample(crops, ref_crops, resize_res, resample, reducing_gap)
+
+            info = str(
+                f"Resample: {resample:<8}  Reducing gap: {str(reducing_gap):<4}  "
+                f"Resize: {resize_ms:.3f} ms/crop  PSNR: {psnr:.2f} dB"
+            )
+
+            _logln(logs, info)
+        # end for
+    # end for
+
+    info = str(
+        "-\n"
+        "Completed resample benchmarking"
+    )
+
+    _logln(logs, info)
+    _flushlogs(logs)
+
+
+def _start_benching():
+    global bench_type
+    global log_loc
+
+    assert bench_type in supported_bench_types
+
+    start_time = _now()
+    log_file: _IO = open(log_loc, "a+")
+    all_logs = [_stdout, log_file]
+    err_logs = [_stderr, log_file]
+
+    info = str(
+        f"AIDesign-Widgets {bench_type} benchmarking\n"
+        f"-"
+    )
+
+    _logln(all_logs, info)
+
+    try:
+        if bench_type == "codec":
+            _prep_and_bench_codec(all_logs)
+        else:  # elif bench_type == "resample":
+            _prep_and_bench_resample(all_logs)
+        # end if
+    except BaseException as base_exception:
+        _logstr(err_logs, _format_exc())
+        end_time = _now()
+        exe_time = end_time - start_time
+
+        info = str(
+            f"-\n"
+            f"Execution stopped after: {exe_time} (days, hours: minutes: seconds)\n"
+            f"-"
+        )
+
+        _logln(all_logs, info)
+        log_file.close()
+        raise base_exception
+    # end try
+
+    end_time = _now()
+    exe_time = end_time - start_time
+
+    info = str(
+        f"-\n"
+        f"Execution time: {exe_time} (days, hours: minutes: seconds)\n"
+        f"-"
+    )
+
+    _logln(all_logs, info)
+    log_file.close()
+
+
+def run():
+    """Runs the executable as a command."""
+    global argv_copy
+    global bench_type
+    global config_loc
+    global log_loc
+    argv_copy_length = len(argv_copy)
+
+    assert argv_copy_length >= 0
+
+    if argv_copy_length < 1:
+        print(too_few_args_info.format(argv_copy_length), file=_stderr)
+        _exit(1)
+    elif argv_copy_length == 1:
+        bench_type = argv_copy.pop(0)
+        bench_type = str(bench_type)
+
+        if bench_type in supported_bench_types:
+            config_loc = _join(defaults.app_data_path, defaults.bench_config_name)
+            print(info.format(bench_type, config_loc))
+
+            timed_input = _TimedInput()
+            answer = timed_input.take(timeout)
+
+            if answer is None:
+                answer = "Yes"
+                print(f"\n{answer} (timeout)")
+            elif len(answer) <= 0:
+                answer = "Yes"
+                print(f"{answer} (default)")
+            # end if
+
+            print("-")
+
+            if answer.lower() == "yes" or answer.lower() == "y":
+                log_loc = _join(defaults.app_data_path, "log.txt")
+                print(will_start_info.format(log_loc))
+
+                try:
+                    _start_benching()
+                except BaseException as base_exception:
+                    # _print_exc()  # Debug
+
+                    if isinstance(base_exception, SystemExit):
+                        exit_code = base_exception.code
+                    else:
+                        exit_code = 1
+                    # end if
+
+                    print(stopped_info.format(log_loc), file=_stderr)
+                    _exit(exit_code)
+                # end try
+
+                print(completed_info.format(log_loc))
+            else:  # elif answer.lower() == "no" or answer.lower() == "n" or answer is Others:
+                print(aborted_info)
+            # end if
+
+            _exit(0)
+        else:  # elif bench_type not in supported_bench_types:
+            print(unknown_bench_type_info.format(bench_type), file=_stderr)
+            _exit(1)
+        # end if
+    else:  # elif argv_copy_length > 1:
+        print(too_many_args_info.format(argv_copy_length), file=_stderr)
+        _exit(1)
+    # end if
+
+
+def main():
+    """Starts the executable."""
+    global argv_copy
+    argv_length = len(_argv)
+
+    assert argv_length >= 1
+
+    argv_copy = _deepcopy(_argv)
+    argv_copy.pop(0)
+    run()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@
 # First added by username: liu-yucheng
 # Last updated by username: liu-yucheng
 
+import concurrent.futures
 import copy
 import datetime
 import os
@@ -15,18 +16,35 @@ import typing
 from os import path as ospath
 from PIL import Image as pil_image
 
+from aidesign_widgets.libs import codecs
+from aidesign_widgets.libs import crops
 from aidesign_widgets.libs import defaults
+from aidesign_widgets.libs import manifests
+from aidesign_widgets.libs import phashes
+from aidesign_widgets.libs import plans
+from aidesign_widgets.libs import stats
 from aidesign_widgets.libs import utils
 
 # Aliases
 
 _abspath = ospath.abspath
+_allocate_counts = plans.allocate_counts
 _argv = sys.argv
 _basename = ospath.basename
+_check_format = codecs.check_format
+_clamp_int = utils.clamp_int
 _deepcopy = copy.deepcopy
+_draft_image = crops.draft_image
 _exit = sys.exit
+_find_ext = codecs.find_ext
+_find_fit_size = crops.find_fit_size
+_find_manifest_ext = manifests.find_ext
+_find_rand_space_size = plans.find_rand_space_size
+_find_reducing_gap = crops.find_reducing_gap
+_find_save_kwargs = codecs.find_save_kwargs
 _flush_logs = utils.flushlogs
 _format_exc = traceback.format_exc
+_HashIndex = phashes.HashIndex
 _IO = typing.IO
 _join = ospath.join
 _listdir = os.listdir
@@ -34,14 +52,23 @@ _load_json = utils.load_json
 _logln = utils.logln
 _logstr = utils.logstr
 _makedirs = os.makedirs
+_ManifestWriter = manifests.ManifestWriter
 _now = datetime.datetime.now
 _pil_image = pil_image
 _pil_image_open = pil_image.open
 # _print_exc = traceback.print_exc  # Debug
+_resize_image = crops.resize_image
+_save_image = codecs.save
 _save_json = utils.save_json
 _split_text = ospath.splitext
+_StatsAccumulator = stats.StatsAccumulator
 _stderr = sys.stderr
 _stdout = sys.stdout
+_supported_formats = codecs.supported_formats
+_supported_manifest_formats = manifests.supported_formats
+_supported_profiles = codecs.supported_profiles
+_supported_resamples = crops.supported_resamples
+_ThreadPoolExecutor = concurrent.futures.ThreadPoolExecutor
 _TimedInput = utils.TimedInput
 
 # -
@@ -59,8 +86,18 @@ Help: widgets help
 
 timeout = float(30)
 """Timeout in seconds."""
-supported_crop_types = ["grid", "rand"]
-"""Supported crop types"""
+supported_crop_types = ["grid", "rand", "resize"]
+"""Supported crop types
+
+"resize" shrinks each whole image instead of cropping it.
+"""
+supported_count_weightings = ["area", "pixels", "uniform"]
+"""Supported crop count weightings of the bulk random cropping total crop count.
+
+"area" weights each image by its valid crop position area.
+"pixels" weights each image by its pixel count.
+"uniform" weights each image that fits a crop the same.
+"""
 
 info = fr"""
 
@@ -161,6 +198,98 @@ def _parse_out_path(config):
     return out_path
 
 
+def _parse_manifest_format(config):
+    config: dict = config
+
+    manifest_format_key = "manifest_format"
+
+    if manifest_format_key in config and config[manifest_format_key] is not None:
+        manifest_format = config[manifest_format_key]
+        manifest_format = str(manifest_format).lower()
+    else:
+        manifest_format = None
+    # end if
+
+    if manifest_format is not None and manifest_format not in _supported_manifest_formats:
+        raise ValueError(f"Unsupported manifest format: {manifest_format}; Supported: {_supported_manifest_formats}")
+
+    return manifest_format
+
+
+def _parse_manifest_loc(config, out_path, manifest_format):
+    config: dict = config
+    out_path = str(out_path)
+
+    manifest_loc_key = "manifest_location"
+
+    if manifest_format is None:
+        manifest_loc = None
+    elif manifest_loc_key in config and config[manifest_loc_key] is not None:
+        manifest_loc = config[manifest_loc_key]
+        manifest_loc = str(manifest_loc)
+        manifest_loc = _abspath(manifest_loc)
+    else:
+        manifest_loc = _join(out_path, "manifest" + _find_manifest_ext(manifest_format))
+    # end if
+
+    return manifest_loc
+
+
+def _parse_stats_loc(config, out_path, save_stats):
+    config: dict = config
+    out_path = str(out_path)
+    save_stats = bool(save_stats)
+
+    stats_loc_key = "stats_location"
+
+    if not save_stats:
+        stats_loc = None
+    elif stats_loc_key in config and config[stats_loc_key] is not None:
+        stats_loc = config[stats_loc_key]
+        stats_loc = str(stats_loc)
+        stats_loc = _abspath(stats_loc)
+    else:
+        stats_loc = _join(out_path, "stats.json")
+    # end if
+
+    return stats_loc
+
+
+def _parse_total_crop_count(config):
+    config: dict = config
+
+    total_crop_count_key = "total_crop_count"
+
+    if total_crop_count_key in config and config[total_crop_count_key] is not None:
+        total_crop_count = config[total_crop_count_key]
+        total_crop_count = abs(int(total_crop_count))
+    else:
+        total_crop_count = None
+    # end if
+
+    return total_crop_count
+
+
+def _parse_count_weighting(config):
+    config: dict = config
+
+    count_weighting_key = "crop_count_weighting"
+
+    if count_weighting_key in config and config[count_weighting_key] is not None:
+        count_weighting = config[count_weighting_key]
+        count_weighting = str(count_weighting).lower()
+    else:
+        count_weighting = "area"
+    # end if
+
+    if count_weighting not in supported_count_weightings:
+        raise ValueError(
+            f"Unsupported crop count weighting: {count_weighting}; Supported: {supported_count_weightings}"
+        )
+
+    return count_weighting
+
+
 def _parse_grid_overrides(config):
     config: dict = config
 
@@ -179,6 +308,282 @@ def _parse_rand_overrides(config):
     return rand_overrides
 
 
+def _parse_resize_overrides(config):
+    config: dict = config
+
+    resize_overrides = config["resize_config_overrides"]
+    resize_overrides: dict
+
+    return resize_overrides
+
+
+def _parse_resize_params(overrides):
+    """Returns params, the bulk resize params, a dict."""
+    overrides: dict = overrides
+
+    short_side = overrides.get("short_side")
+    box_width = overrides.get("box_width")
+    box_height = overrides.get("box_height")
+
+    if short_side is not None:
+        short_side = max(abs(int(short_side)), 1)
+
+    if box_width is not None:
+        box_width = max(abs(int(box_width)), 1)
+
+    if box_height is not None:
+        box_height = max(abs(int(box_height)), 1)
+
+    if box_width is None and box_height is None:
+        box = None
+
+        if short_side is None:
+            raise ValueError("Short side, box width, and box height cannot all be None")
+    else:
+        box = (box_width, box_height)
+    # end if
+
+    resample = str(overrides.get("resample") or "bicubic").lower()
+
+    if resample not in _supported_resamples:
+        raise ValueError(f"Unsupported resample: {resample}; Supported: {_supported_resamples}")
+
+    out_format = str(overrides.get("output_format") or "jpeg").lower()
+
+    if out_format == "jpg":
+        out_format = "jpeg"
+
+    if not _check_format(out_format):
+        raise ValueError(f"Unusable output format: {out_format}; Supported: {_supported_formats}")
+
+    encoder_profile = str(overrides.get("encoder_profile") or "fast").lower()
+
+    if encoder_profile not in _supported_profiles:
+        raise ValueError(f"Unsupported encoder profile: {encoder_profile}; Supported: {_supported_profiles}")
+
+    crop_quality = overrides.get("crop_quality")
+    crop_quality = 95 if crop_quality is None else _clamp_int(int(crop_quality), 0, 100)
+    png_compress_level = overrides.get("png_compress_level")
+
+    if png_compress_level is not None:
+        png_compress_level = _clamp_int(int(png_compress_level), 0, 9)
+
+    worker_count = overrides.get("worker_count")
+
+    if worker_count is not None:
+        worker_count = max(int(worker_count), 1)
+
+    params = {
+        "short_side": short_side,
+        "box": box,
+        "upscale": bool(overrides.get("upscale", False)),
+        "resample": resample,
+        "reducing_gap": _find_reducing_gap(overrides.get("reducing_gap")),
+        "draft": bool(overrides.get("draft", True)),
+        "output_format": out_format,
+        "encoder_profile": encoder_profile,
+        "save_kwargs": _find_save_kwargs(out_format, encoder_profile, crop_quality, png_compress_level),
+        "worker_count": worker_count
+    }
+
+    return params
+
+
+def _resize_file(in_loc, out_loc, params, save_stats=False):
+    """Returns source_size, size, byte_count, image_stats, resize_stats; the stats are None without save_stats."""
+    in_loc = str(in_loc)
+    out_loc = str(out_loc)
+    params: dict = params
+
+    image = _pil_image_open(in_loc)
+    source_size = image.size
+    size = _find_fit_size(source_size, params["short_side"], params["box"], params["upscale"])
+
+    if params["draft"]:
+        _draft_image(image, size)
+
+    if image.size != size:
+        image = _resize_image(image, size, params["resample"], params["reducing_gap"])
+
+    byte_count = _save_image(image, out_loc, params["output_format"], params["save_kwargs"])
+
+    # Each worker finds the stats of its own image, and the main thread merges them
+    if save_stats:
+        image_stats = _StatsAccumulator()
+        resize_stats = image_stats.add(image)
+    else:
+        image_stats = None
+        resize_stats = None
+    # end if
+
+    image.close()
+    return source_size, size, byte_count, image_stats, resize_stats
+
+
+def _bulk_resize(logs, in_locs, out_path, manifest, overrides, dataset_stats=None):
+    logs: list[_IO] = logs
+    in_locs: list[str] = in_locs
+    out_path = str(out_path)
+    manifest: _ManifestWriter = manifest
+    overrides: dict = overrides
+    dataset_stats: _StatsAccumulator = dataset_stats
+
+    params = _parse_resize_params(overrides)
+    _logln(logs, f"Short side: {params['short_side']}")
+    _logln(logs, f"Box: {params['box']}")
+    _logln(logs, f"Upscale: {params['upscale']}")
+    _logln(logs, f"Resample: {params['resample']}")
+    _logln(logs, f"Reducing gap: {params['reducing_gap']}")
+    _logln(logs, f"JPEG draft decoding: {params['draft']}")
+    _logln(logs, f"Output format: {params['output_format']}")
+    _logln(logs, f"Encoder profile: {params['encoder_profile']}")
+    _logln(logs, f"Worker count: {params['worker_count']}")
+
+    ext = _find_ext(params["output_format"])
+    in_locs_len = len(in_locs)
+    out_locs = []
+
+    for in_loc in in_locs:
+        image_name = _split_text(_basename(in_loc))[0]
+        out_locs.append(_join(out_path, f"Resize-{image_name}{ext}"))
+    # end for
+
+    info = str(
+        "-\n"
+        "Completed preparation"
+    )
+
+    _logln(logs, info)
+
+    info = str(
+        "Started bulk resizing\n"
+        "-"
+    )
+
+    _logln(logs, info)
+
+    # PIL releases the GIL while it decodes, resizes, and encodes, so the worker threads run in parallel
+    executor = _ThreadPoolExecutor(params["worker_count"])
+    results = executor.map(
+        _resize_file, in_locs, out_locs, [params] * in_locs_len, [dataset_stats is not None] * in_locs_len
+    )
+    in_loc_idx = 0
+    total_byte_count = 0
+
+    try:
+        for source_size, size, byte_count, image_stats, resize_stats in results:
+            in_loc = in_locs[in_loc_idx]
+            out_loc = out_locs[in_loc_idx]
+            total_byte_count += byte_count
+
+            info = str(
+                f"- Resized image {in_loc_idx + 1} / {in_locs_len}:  "
+                f"Size: {source_size[0]}x{source_size[1]} to {size[0]}x{size[1]}  Bytes: {byte_count}"
+            )
+
+            _logln(logs, info)
+
+            if image_stats is not None:
+                dataset_stats.merge(image_stats)
+
+            if manifest is not None:
+                record = {
+                    "index": in_loc_idx,
+                    "source": in_loc,
+                    "x": 0,
+                    "y": 0,
+                    "width": source_size[0],
+                    "height": source_size[1],
+                    "resize": min(size),
+                    "flip": "",
+                    "rotation": 0,
+                    "location": out_loc,
+                    "bytes": byte_count,
+                    "resize_width": size[0],
+                    "resize_height": size[1]
+                }
+
+                if resize_stats is not None:
+                    record.update(resize_stats)
+
+                manifest.write(record)
+            # end if
+
+            in_loc_idx += 1
+        # end for
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    # end try
+
+    _logln(logs, f"Bulk resized image count: {in_loc_idx}  Total bytes: {total_byte_count}")
+
+
+def _parse_dedup(overrides):
+    """Returns dedup_max_distance, dedup_hash_size; dedup_max_distance is None if there is no dedup."""
+    overrides: dict = overrides
+
+    dedup_max_distance_key = "dedup_max_distance"
+    dedup_hash_size_key = "dedup_hash_size"
+
+    if dedup_max_distance_key in overrides and overrides[dedup_max_distance_key] is not None:
+        dedup_max_distance = overrides[dedup_max_distance_key]
+        dedup_max_distance = abs(int(dedup_max_distance))
+    else:
+        dedup_max_distance = None
+    # end if
+
+    if dedup_hash_size_key in overrides and overrides[dedup_hash_size_key] is not None:
+        dedup_hash_size = overrides[dedup_hash_size_key]
+        dedup_hash_size = int(dedup_hash_size)
+        dedup_hash_size = _clamp_int(dedup_hash_size, 2, 32)
+    else:
+        dedup_hash_size = 8
+    # end if
+
+    return dedup_max_distance, dedup_hash_size
+
+
+def _parse_save_stats(overrides):
+    overrides: dict = overrides
+
+    save_stats_key = "save_stats"
+
+    if save_stats_key in overrides:
+        save_stats = overrides[save_stats_key]
+        save_stats = bool(save_stats)
+    else:
+        save_stats = False
+    # end if
+
+    return save_stats
+
+
+def _allocate_crop_counts(sizes, crop_res, count_weighting, total_crop_count):
+    sizes: list[tuple[int, int]] = sizes
+    crop_res = max(abs(int(crop_res)), 1)
+    count_weighting = str(count_weighting)
+    total_crop_count = int(total_crop_count)
+
+    weights = []
+
+    for width, height in sizes:
+        area = _find_rand_space_size(width, height, crop_res)
+
+        if count_weighting == "area":
+            weight = area
+        elif count_weighting == "pixels":
+            weight = width * height if area > 0 else 0
+        else:  # elif count_weighting == "uniform":
+            weight = 1 if area > 0 else 0
+        # end if
+
+        weights.append(weight)
+    # end for
+
+    result = _allocate_counts(weights, total_crop_count)
+    return result
+
+
 def _backup_config(config_loc, backup_loc):
     config_loc: str = config_loc
     backup_loc: str = backup_loc
@@ -228,13 +633,22 @@ def _prep_and_crop(logs):
     _logln(logs, f"Bulk input path: {in_path}")
     out_path = _parse_out_path(config)
     _logln(logs, f"Bulk output path: {out_path}")
+    manifest_format = _parse_manifest_format(config)
+    manifest_loc = _parse_manifest_loc(config, out_path, manifest_format)
+    total_crop_count = _parse_total_crop_count(config)
+    count_weighting = _parse_count_weighting(config)
 
     if crop_type == "grid":
         cmd_config_overrides = _parse_grid_overrides(config)
-    else:  # elif crop_type == "rand":
+    elif crop_type == "rand":
         cmd_config_overrides = _parse_rand_overrides(config)
+    else:  # elif crop_type == "resize":
+        cmd_config_overrides = _parse_resize_overrides(config)
     # end if
 
+    save_stats = _parse_save_stats(cmd_config_overrides)
+    stats_loc = _parse_stats_loc(config, out_path, save_stats)
+
     # End
     # Prepare context
     # - Edit PIL max image pixels to avoid zip bomb detection false alarm
@@ -248,8 +662,11 @@ def _prep_and_crop(logs):
     # - End
     # - Filter the input path
 
+    # - Opening an image only reads its header, so the sizes come at no decoding cost
+
     names = _listdir(in_path)
     in_locs = []
+    in_sizes = []
 
     for name in names:
         loc = _join(in_path, name)
@@ -257,11 +674,14 @@ def _prep_and_crop(logs):
         try:
             image = _pil_image_open(loc)
             image_format = image.format
+            image_size = image.size
         except Exception as _:
             image_format = None
+            image_size = None
 
         if image_format is not None:
             in_locs.append(loc)
+            in_sizes.append(image_size)
     # end for
 
     in_locs_len = len(in_locs)
@@ -272,6 +692,56 @@ def _prep_and_crop(logs):
     # Ensure the output path
     _makedirs(out_path, exist_ok=True)
 
+    # Open the bulk manifest, which all the images share
+    if manifest_format is not None:
+        manifest = _ManifestWriter(manifest_loc, manifest_format)
+        _logln(logs, f"Bulk manifest location: {manifest.loc}")
+    else:
+        manifest = None
+    # end if
+
+    # Create the bulk stats accumulator, which all the images share
+    if save_stats:
+        dataset_stats = _StatsAccumulator()
+        _logln(logs, f"Bulk stats location: {stats_loc}")
+    else:
+        dataset_stats = None
+    # end if
+
+    if crop_type == "resize":
+        _bulk_resize(logs, in_locs, out_path, manifest, cmd_config_overrides, dataset_stats)
+
+        if manifest is not None:
+            manifest.close()
+            _logln(logs, f"Bulk manifest record count: {manifest.count}")
+        # end if
+
+        if dataset_stats is not None:
+            dataset_stats.save(stats_loc)
+            _logln(logs, f"Bulk stats image count: {dataset_stats.crop_count}")
+        # end if
+
+        info = str(
+            "-\n"
+            "Completed bulk resizing"
+        )
+
+        _logln(logs, info)
+        _flush_logs(logs)
+        return
+    # end if
+
+    # Create the bulk perceptual hash index, which all the images share
+    dedup_max_distance, dedup_hash_size = _parse_dedup(cmd_config_overrides)
+
+    if dedup_max_distance is not None:
+        index = _HashIndex(dedup_max_distance, dedup_hash_size ** 2)
+        info = f"Bulk near duplicate dropping:  Max distance: {dedup_max_distance}  Hash size: {dedup_hash_size}"
+        _logln(logs, info)
+    else:
+        index = None
+    # end if
+
     if crop_type == "grid":
         from aidesign_widgets.exes import widgets_grid_crop
         cmd_config_loc = _join(defaults.app_data_path, defaults.grid_crop_config_name)
@@ -286,6 +756,26 @@ def _prep_and_crop(logs):
         cmd_module = widgets_rand_crop
     # end if
 
+    # Allocate the total crop count of a bulk random cropping run, in a single pass over the image sizes
+    if crop_type == "rand" and total_crop_count is not None:
+        if "crop_resolution" in cmd_config_overrides:
+            crop_res = cmd_config_overrides["crop_resolution"]
+        else:
+            crop_res = _load_json(cmd_config_loc)["crop_resolution"]
+        # end if
+
+        crop_counts = _allocate_crop_counts(in_sizes, crop_res, count_weighting, total_crop_count)
+
+        info = str(
+            f"Bulk total crop count: {total_crop_count}  "
+            f"Weighting: {count_weighting}  Allocated: {sum(crop_counts)}"
+        )
+
+        _logln(logs, info)
+    else:
+        crop_counts = None
+    # end if
+
     # End
 
     info = str(
@@ -304,6 +794,12 @@ def _prep_and_crop(logs):
     in_loc_idx = 0
 
     for in_loc in in_locs:
+        if crop_counts is not None and crop_counts[in_loc_idx] <= 0:
+            _logln(logs, f"- Skipped image {in_loc_idx + 1} / {in_locs_len}, which gets no crops")
+            in_loc_idx += 1
+            continue
+        # end if
+
         _logln(logs, f"- Started cropping image {in_loc_idx + 1} / {in_locs_len}")
         image_name = _split_text(_basename(in_loc))[0]
 
@@ -320,11 +816,18 @@ def _prep_and_crop(logs):
         _override_config(cmd_config, cmd_config_overrides)
         cmd_config["image_location"] = in_loc
         cmd_config["output_path"] = out_subpath
+
+        if crop_counts is not None:
+            cmd_config["crop_count"] = crop_counts[in_loc_idx]
+
         _save_json(cmd_config, cmd_config_loc)
 
         cmd_module.argv_copy = argv_copy
         cmd_module.config_loc = cmd_config_loc
         cmd_module.log_loc = log_loc
+        cmd_module.manifest_writer = manifest
+        cmd_module.hash_index = index
+        cmd_module.stats_accumulator = dataset_stats
 
         _logln(logs, f"---- The following will be the output from \"{cmd_name}\" ----")
         cmd_module.start_cropping()
@@ -335,6 +838,19 @@ def _prep_and_crop(logs):
         in_loc_idx += 1
     # end for
 
+    if manifest is not None:
+        manifest.close()
+        _logln(logs, f"Bulk manifest record count: {manifest.count}")
+    # end if
+
+    if index is not None:
+        _logln(logs, f"Bulk dropped near duplicate count: {index.duplicate_count}")
+
+    if dataset_stats is not None:
+        dataset_stats.save(stats_loc)
+        _logln(logs, f"Bulk stats crop count: {dataset_stats.crop_count}")
+    # end if
+
     info = str(
         "-\n"
         "Completed bulk cropping"
@@ -355,8 +871,14 @@ def _start_cropping():
     all_logs = [_stdout, log_file]
     err_logs = [_stderr, log_file]
 
+    if crop_type == "resize":
+        job_name = "bulk resizing"
+    else:
+        job_name = f"bulk {crop_type} cropping"
+    # end if
+
     info = str(
-        f"AIDesign-Widgets bulk {crop_type} cropping\n"
+        f"AIDesign-Widgets {job_name}\n"
         f"-"
     )
 
@@ -15,42 +15,96 @@ import typing
 from os import path as ospath
 from PIL import Image as pil_image
 
+from aidesign_widgets.libs import annotations
+from aidesign_widgets.libs import codecs
+from aidesign_widgets.libs import crops
 from aidesign_widgets.libs import defaults
+from aidesign_widgets.libs import filters
+from aidesign_widgets.libs import frames
+from aidesign_widgets.libs import manifests
+from aidesign_widgets.libs import masks
+from aidesign_widgets.libs import phashes
+from aidesign_widgets.libs import stats
+from aidesign_widgets.libs import transforms
 from aidesign_widgets.libs import utils
 
 # Aliases
 
 _abspath = ospath.abspath
+_alpha_mask_loc = masks.alpha_mask_loc
 _argv = sys.argv
 _basename = ospath.basename
+_BatchWriter = transforms.BatchWriter
+_BoxIndex = annotations.BoxIndex
+_cascade_crop = crops.cascade_crop
+_check_format = codecs.check_format
 _clamp_int = utils.clamp_int
+_CropFrameWriter = frames.CropFrameWriter
+_decode = codecs.decode
 _deepcopy = copy.deepcopy
+_DetailFilter = filters.DetailFilter
+_deg_to_rot = crops.deg_to_rot
+_dhash = phashes.dhash
+_encode = codecs.encode
 _exit = sys.exit
+_find_annotation_loc = annotations.find_annotation_loc
+_find_ext = codecs.find_ext
+_find_image_boxes = annotations.find_image_boxes
+_find_level_size = crops.find_level_size
+_find_manifest_ext = manifests.find_ext
+_find_mask_loc = masks.find_mask_loc
+_find_save_kwargs = codecs.find_save_kwargs
 _flush_logs = utils.flushlogs
 _format_exc = traceback.format_exc
+_FrameReader = frames.FrameReader
+_HashIndex = phashes.HashIndex
+_image_name_tag = masks.image_name_tag
 _IO = typing.IO
+_iter_grid_crops = crops.iter_grid_crops
+_iter_paired_crops = crops.iter_paired_crops
+_iter_pyramid = crops.iter_pyramid
 _join = ospath.join
+_load_annotations = annotations.load_annotations
 _load_json = utils.load_json
+_load_mask = masks.load_mask
 _logln = utils.logln
 _logstr = utils.logstr
 _makedirs = os.makedirs
+_ManifestWriter = manifests.ManifestWriter
+_MaskIndex = masks.MaskIndex
 _now = datetime.datetime.now
 _pil_image = pil_image
 _pil_image_open = pil_image.open
 # _print_exc = traceback.print_exc  # Debug
+_read_region = crops.read_region
+_save_image = codecs.save
+_save_json = utils.save_json
+_scale_boxes = annotations.scale_boxes
+_shift_boxes = annotations.shift_boxes
 _split_text = ospath.splitext
 _stderr = sys.stderr
+_stdin = sys.stdin
+_StatsAccumulator = stats.StatsAccumulator
 _stdout = sys.stdout
+_supported_formats = codecs.supported_formats
+_supported_manifest_formats = manifests.supported_formats
+_supported_profiles = codecs.supported_profiles
+_supported_resamples = crops.supported_resamples
 _TimedInput = utils.TimedInput
+_transform_batch_size = transforms.default_batch_size
+_transform_labels = annotations.transform_labels
 
 # -
 
 brief_usage = "widgets grid-crop"
 """Brief usage."""
+pipe_flag = "--pipe"
+"""Pipe mode flag."""
 
 usage = fr"""
 
 Usage: {brief_usage}
+Pipe mode usage: {brief_usage} {pipe_flag}
 Help: widgets help
 
 """.strip()
@@ -101,21 +155,45 @@ Aborted the image cropping process
 """.strip()
 """Info to display when the user aborts the cropping process."""
 
+pipe_stopped_info = fr"""
+
+---- The above has been logged to {{}} ----
+Cropping in pipe mode stopped
+
+""".strip()
+"""Info to display after cropping in pipe mode stops."""
+
 too_many_args_info = fr"""
 
 "{brief_usage}" gets too many arguments
-Expects 0 arguments; Gets {{}} arguments
+Expects 0 or 1 arguments; Gets {{}} arguments
 {usage}
 
 """.strip()
 """Info to display when the executable gets too many arguments."""
 
+unknown_arg_info = fr"""
+
+"{brief_usage}" gets an unknown argument: {{}}
+{usage}
+
+""".strip()
+"""Info to display when the executable gets an unknown argument."""
+
 argv_copy = None
 """Consumable copy of sys.argv."""
 config_loc = None
 """Config location."""
 log_loc = None
 """Log location."""
+manifest_writer = None
+"""External manifest writer. Used instead of the config manifest when not None."""
+hash_index = None
+"""External perceptual hash index. Used instead of a new index when not None, to drop near duplicates across runs."""
+stats_accumulator = None
+"""External stats accumulator. Used instead of a new accumulator when not None, to find the stats across runs."""
+annotation_cache = {}
+"""Loaded annotations by location. Kept across runs, so that each annotation file loads once per process."""
 
 
 def _parse_image_loc(config):
@@ -144,6 +222,77 @@ def _parse_out_path(config):
     return out_path
 
 
+def _parse_paired_image_locs(config):
+    config: dict = config
+
+    paired_image_locs_key = "paired_image_locations"
+
+    if paired_image_locs_key in config and config[paired_image_locs_key] is not None:
+        paired_image_locs = config[paired_image_locs_key]
+        paired_image_locs = [_abspath(str(loc)) for loc in paired_image_locs]
+    else:
+        paired_image_locs = []
+    # end if
+
+    return paired_image_locs
+
+
+def _parse_paired_out_paths(config, out_path, paired_count):
+    config: dict = config
+    out_path = str(out_path)
+    paired_count = int(paired_count)
+
+    paired_out_paths_key = "paired_output_paths"
+
+    if paired_out_paths_key in config and config[paired_out_paths_key] is not None:
+        paired_out_paths = config[paired_out_paths_key]
+        paired_out_paths = [_abspath(str(path)) for path in paired_out_paths]
+
+        if len(paired_out_paths) != paired_count:
+            raise ValueError(
+                f"Paired output path count {len(paired_out_paths)} differs from the paired image count {paired_count}"
+            )
+        # end if
+    else:
+        paired_out_paths = [f"{out_path}-Paired-{paired_idx + 1}" for paired_idx in range(paired_count)]
+    # end if
+
+    return paired_out_paths
+
+
+def _parse_paired_out_format(config, out_format):
+    config: dict = config
+    out_format = str(out_format)
+
+    paired_out_format_key = "paired_output_format"
+
+    if paired_out_format_key in config and config[paired_out_format_key] is not None:
+        paired_out_format = _parse_out_format({"output_format": config[paired_out_format_key]})
+    else:
+        paired_out_format = out_format
+    # end if
+
+    return paired_out_format
+
+
+def _parse_paired_resample(config):
+    config: dict = config
+
+    paired_resample_key = "paired_resample"
+
+    if paired_resample_key in config and config[paired_resample_key] is not None:
+        paired_resample = config[paired_resample_key]
+        paired_resample = str(paired_resample).lower()
+    else:
+        paired_resample = "nearest"
+    # end if
+
+    if paired_resample not in _supported_resamples:
+        raise ValueError(f"Unsupported paired resample: {paired_resample}; Supported: {_supported_resamples}")
+
+    return paired_resample
+
+
 def _parse_save_flips(config):
     config: dict = config
 
@@ -213,6 +362,67 @@ def _parse_resize_res(config):
     return resize_res
 
 
+def _parse_resize_ress(config):
+    config: dict = config
+
+    resize_res_key = "resize_resolution"
+
+    if isinstance(config[resize_res_key], list):
+        resize_ress = []
+
+        for resize_res in config[resize_res_key]:
+            if resize_res is None:
+                raise ValueError("Resize resolution list items cannot be None")
+
+            resize_res = _parse_resize_res({resize_res_key: resize_res})
+
+            if resize_res not in resize_ress:
+                resize_ress.append(resize_res)
+        # end for
+
+        if len(resize_ress) <= 0:
+            raise ValueError("Resize resolution list cannot be empty")
+    else:
+        resize_ress = [_parse_resize_res(config)]
+    # end if
+
+    return resize_ress
+
+
+def _parse_resample(config):
+    config: dict = config
+
+    resample_key = "resample"
+
+    if resample_key in config and config[resample_key] is not None:
+        resample = config[resample_key]
+        resample = str(resample).lower()
+    else:
+        resample = "bicubic"
+    # end if
+
+    if resample not in _supported_resamples:
+        raise ValueError(f"Unsupported resample: {resample}; Supported: {_supported_resamples}")
+
+    return resample
+
+
+def _parse_reducing_gap(config):
+    config: dict = config
+
+    reducing_gap_key = "reducing_gap"
+
+    if reducing_gap_key in config and config[reducing_gap_key] is not None:
+        reducing_gap = config[reducing_gap_key]
+        reducing_gap = float(reducing_gap)
+        reducing_gap = max(reducing_gap, float(1))
+    else:
+        reducing_gap = None
+    # end if
+
+    return reducing_gap
+
+
 def _parse_crop_quality(config):
     config: dict = config
 
@@ -229,6 +439,98 @@ def _parse_crop_quality(config):
     return crop_quality
 
 
+def _parse_out_format(config):
+    config: dict = config
+
+    out_format_key = "output_format"
+
+    if out_format_key in config and config[out_format_key] is not None:
+        out_format = config[out_format_key]
+        out_format = str(out_format).lower()
+    else:
+        out_format = "jpeg"
+    # end if
+
+    if out_format == "jpg":
+        out_format = "jpeg"
+
+    if not _check_format(out_format):
+        raise ValueError(f"Unusable output format: {out_format}; Supported: {_supported_formats}")
+
+    return out_format
+
+
+def _parse_encoder_profile(config):
+    config: dict = config
+
+    encoder_profile_key = "encoder_profile"
+
+    if encoder_profile_key in config and config[encoder_profile_key] is not None:
+        encoder_profile = config[encoder_profile_key]
+        encoder_profile = str(encoder_profile).lower()
+    else:
+        encoder_profile = "fast"
+    # end if
+
+    if encoder_profile not in _supported_profiles:
+        raise ValueError(f"Unsupported encoder profile: {encoder_profile}; Supported: {_supported_profiles}")
+
+    return encoder_profile
+
+
+def _parse_png_compress_level(config):
+    config: dict = config
+
+    png_compress_level_key = "png_compress_level"
+
+    if png_compress_level_key in config and config[png_compress_level_key] is not None:
+        png_compress_level = config[png_compress_level_key]
+        png_compress_level = int(png_compress_level)
+        png_compress_level = _clamp_int(png_compress_level, 0, 9)
+    else:
+        png_compress_level = None
+    # end if
+
+    return png_compress_level
+
+
+def _parse_manifest_format(config):
+    config: dict = config
+
+    manifest_format_key = "manifest_format"
+
+    if manifest_format_key in config and config[manifest_format_key] is not None:
+        manifest_format = config[manifest_format_key]
+        manifest_format = str(manifest_format).lower()
+    else:
+        manifest_format = None
+    # end if
+
+    if manifest_format is not None and manifest_format not in _supported_manifest_formats:
+        raise ValueError(f"Unsupported manifest format: {manifest_format}; Supported: {_supported_manifest_formats}")
+
+    return manifest_format
+
+
+def _parse_manifest_loc(config, out_path, manifest_format):
+    config: dict = config
+    out_path = str(out_path)
+
+    manifest_loc_key = "manifest_location"
+
+    if manifest_format is None:
+        manifest_loc = None
+    elif manifest_loc_key in config and config[manifest_loc_key] is not None:
+        manifest_loc = config[manifest_loc_key]
+        manifest_loc = str(manifest_loc)
+        manifest_loc = _abspath(manifest_loc)
+    else:
+        manifest_loc = _join(out_path, "manifest" + _find_manifest_ext(manifest_format))
+    # end if
+
+    return manifest_loc
+
+
 def _parse_start_pos(config, key):
     config: dict = config
     key = str(key)
@@ -281,198 +583,1114 @@ def _parse_max_crop_count_y(config):
     return _parse_max_crop_count(config, "max_crop_count_y")
 
 
-def _find_crop_name(image_name, pos_x, pos_y, crop_res, resize_res, flip, rot):
-    image_name = str(image_name)
-    pos_x = int(pos_x)
-    pos_y = int(pos_y)
+def _parse_stride(config, key, crop_res):
+    config: dict = config
+    key = str(key)
     crop_res = int(crop_res)
 
-    if resize_res is None:
-        resize_res = None
-    else:  # elif resize_res is not None:
-        resize_res = int(resize_res)
+    if key in config and config[key] is not None:
+        stride = config[key]
+        stride = int(stride)
+        stride = _clamp_int(stride, 1, 65535)
+    else:
+        stride = crop_res
     # end if
 
-    flip = str(flip)
-    rot = str(rot)
+    return stride
 
-    pos_tag = f"-At-{pos_x}-{pos_y}"
-    crop_tag = f"-Crop-{crop_res}"
 
-    if resize_res is None:
-        resize_tag = ""
-    else:  # elif resize_res is not None:
-        resize_tag = f"-Resize-{resize_res}"
-    # end if
+def _parse_stride_x(config, crop_res):
+    return _parse_stride(config, "stride_x", crop_res)
 
-    if flip != "":
-        flip_tag = f"-Flip-{flip}"
-    else:
-        flip_tag = ""
-    # end if
 
-    if rot != "0":
-        rot_tag = f"-Rotation-{rot}"
+def _parse_stride_y(config, crop_res):
+    return _parse_stride(config, "stride_y", crop_res)
+
+
+def _parse_scales(config):
+    config: dict = config
+
+    key = "scales"
+
+    if key in config and config[key] is not None:
+        scales = []
+
+        for scale in config[key]:
+            scale = float(scale)
+
+            if scale <= 0 or scale > 1:
+                raise ValueError(f"Scales must be in (0, 1]: {scale}")
+
+            if scale not in scales:
+                scales.append(scale)
+        # end for
+
+        if len(scales) <= 0:
+            raise ValueError("Scales cannot be empty")
+
+        scales.sort(reverse=True)
     else:
-        rot_tag = ""
+        scales = None
     # end if
 
-    now = _now()
+    return scales
 
-    timestamp = str(
-        f"-Time-{now.year:04}{now.month:02}{now.day:02}-{now.hour:02}{now.minute:02}{now.second:02}-"
-        f"{now.microsecond:06}"
-    )
 
-    ext = ".jpg"
-    name = f"{image_name}{pos_tag}{crop_tag}{resize_tag}{flip_tag}{rot_tag}{timestamp}{ext}"
-    return name
+def _parse_rois(config, params):
+    """Returns rois, a list of dicts that have the "box", "start_pos_x", "start_pos_y", "max_crop_count_x", and
+        "max_crop_count_y" keys; or None if there are no ROIs.
+    """
+    config: dict = config
+    params: dict = params
 
+    key = "rois"
 
-def _prep_and_crop(logs):
-    global config_loc
-    logs: list[_IO] = logs
+    if key in config and config[key] is not None:
+        rois = []
 
-    info = str(
-        "Started preparation\n"
-        "-"
-    )
+        for roi_config in config[key]:
+            roi_config = dict(roi_config)
+            box = tuple(int(roi_config[box_key]) for box_key in ["left", "upper", "right", "lower"])
 
-    _logln(logs, info)
+            if box[0] < 0 or box[1] < 0 or box[2] <= box[0] or box[3] <= box[1]:
+                raise ValueError(f"ROI box must be non-negative and have a positive size: {box}")
 
-    # Parse config
-    config = _load_json(config_loc)
+            roi = {"box": box}
 
-    image_loc = _parse_image_loc(config)
-    _logln(logs, f"Image location: {image_loc}")
-    out_path = _parse_out_path(config)
-    _logln(logs, f"Output path: {out_path}")
+            for param_key, config_key in [
+                ("start_pos_x", "start_position_x"), ("start_pos_y", "start_position_y")
+            ]:
+                if config_key in roi_config:
+                    roi[param_key] = _parse_start_pos(roi_config, config_key)
+                else:
+                    roi[param_key] = params[param_key]
+                # end if
+            # end for
 
-    save_flips = _parse_save_flips(config)
-    _logln(logs, f"Save flips: {save_flips}")
+            for param_key, config_key in [
+                ("max_crop_count_x", "max_crop_count_x"), ("max_crop_count_y", "max_crop_count_y")
+            ]:
+                if config_key in roi_config:
+                    roi[param_key] = _parse_max_crop_count(roi_config, config_key)
+                else:
+                    roi[param_key] = params[param_key]
+                # end if
+            # end for
 
-    if save_flips:
-        flips = ["", "x", "y", "xy"]
+            rois.append(roi)
+        # end for
     else:
-        flips = [""]
+        rois = None
     # end if
 
-    save_rots = _parse_save_rots(config)
-    _logln(logs, f"Save rotations: {save_rots}")
+    return rois
 
-    if save_rots:
-        rots = ["", "180"]
-    else:
-        rots = [""]
-    # end if
 
-    crop_res = _parse_crop_res(config)
-    _logln(logs, f"Crop resolution: {crop_res}")
-    resize_res = _parse_resize_res(config)
+def _parse_min_variance(config):
+    config: dict = config
 
-    if resize_res is None:
-        _logln(logs, "No resize, keep crop resolution")
+    min_variance_key = "min_variance"
+
+    if min_variance_key in config and config[min_variance_key] is not None:
+        min_variance = config[min_variance_key]
+        min_variance = float(min_variance)
     else:
-        _logln(logs, f"Resize resolution: {resize_res}")
+        min_variance = None
     # end if
 
-    crop_quality = _parse_crop_quality(config)
-    _logln(logs, f"Crop quality: {crop_quality}")
-    start_pos_x = _parse_start_pos_x(config)
-    _logln(logs, f"Start position X: {start_pos_x}")
-    start_pos_y = _parse_start_pos_y(config)
-    _logln(logs, f"Start position Y: {start_pos_y}")
-    max_crop_count_x = _parse_max_crop_count_x(config)
-    _logln(logs, f"Max crop count X: {max_crop_count_x}")
-    max_crop_count_y = _parse_max_crop_count_y(config)
-    _logln(logs, f"Max crop count Y: {max_crop_count_y}")
+    return min_variance
 
-    # Edit PIL max image pixels to avoid zip bomb detection false alarm
-    max_width = 65535
-    max_height = 65535
-    max_pixels = max_width * max_height
-    _pil_image.MAX_IMAGE_PIXELS = max_pixels
-    _logln(logs, f"Tweaked PIL safety max pixels:  Width: {max_width}  Height: {max_height}  Total: {max_pixels}")
 
-    # Read image
-    image = _pil_image_open(image_loc)
-    image_name = _split_text(_basename(image_loc))[0]
-    _logln(logs, "Completed loading image")
+def _parse_min_laplacian_energy(config):
+    config: dict = config
 
-    # Ensure output folder
-    _makedirs(out_path, exist_ok=True)
+    min_laplacian_energy_key = "min_laplacian_energy"
 
-    info = str(
-        "-\n"
-        "Completed preparation"
-    )
+    if min_laplacian_energy_key in config and config[min_laplacian_energy_key] is not None:
+        min_laplacian_energy = config[min_laplacian_energy_key]
+        min_laplacian_energy = float(min_laplacian_energy)
+    else:
+        min_laplacian_energy = None
+    # end if
 
-    _logln(logs, info)
+    return min_laplacian_energy
 
-    info = str(
-        "Started grid cropping\n"
-        "-"
-    )
 
-    _logln(logs, info)
+def _parse_filter_map_res(config):
+    config: dict = config
 
-    # Start actual cropping
-    count_x = 0
-    count_y = 0
-    total_count = 0
-    pos_x = start_pos_x
-    pos_y = start_pos_y
-    width, height = image.size
-    need_final_prog = False
+    filter_map_res_key = "filter_map_resolution"
 
-    while count_y < max_crop_count_y and pos_y + crop_res <= height:
-        count_x = 0
-        pos_x = start_pos_x
+    if filter_map_res_key in config and config[filter_map_res_key] is not None:
+        filter_map_res = config[filter_map_res_key]
+        filter_map_res = int(filter_map_res)
+        filter_map_res = _clamp_int(filter_map_res, 1, 65535)
+    elif filter_map_res_key in config:
+        filter_map_res = None
+    else:
+        filter_map_res = 256
+    # end if
 
-        while count_x < max_crop_count_x and pos_x + crop_res <= width:
-            box = (pos_x, pos_y, pos_x + crop_res, pos_y + crop_res)
+    return filter_map_res
 
-            for flip in flips:
-                for rot in rots:
-                    crop = image.crop(box)
 
-                    if resize_res is not None:
-                        crop = crop.resize(size=(resize_res, resize_res), resample=_pil_image.BICUBIC)
+def _parse_dedup_max_distance(config):
+    config: dict = config
 
-                    if "x" in flip:
-                        crop = crop.transpose(pil_image.FLIP_TOP_BOTTOM)
+    dedup_max_distance_key = "dedup_max_distance"
 
-                    if "y" in flip:
-                        crop = crop.transpose(pil_image.FLIP_LEFT_RIGHT)
+    if dedup_max_distance_key in config and config[dedup_max_distance_key] is not None:
+        dedup_max_distance = config[dedup_max_distance_key]
+        dedup_max_distance = int(dedup_max_distance)
 
-                    if rot == "180":
-                        crop = crop.transpose(pil_image.ROTATE_180)
+        if dedup_max_distance < 0:
+            dedup_max_distance *= -1
+    else:
+        dedup_max_distance = None
+    # end if
 
-                    name = _find_crop_name(image_name, pos_x, pos_y, crop_res, resize_res, flip, rot)
-                    loc = _join(out_path, name)
-                    crop.save(loc, format="jpeg", quality=crop_quality)
-                    total_count += 1
+    return dedup_max_distance
 
-                    if total_count == 1 or total_count % 256 == 0:
-                        _logln(logs, f"Saved {total_count} cropped images")
-                        need_final_prog = False
-                    else:
-                        need_final_prog = True
-                    # end if
-                # end for
-            # end for
 
-            count_x += 1
-            pos_x += crop_res
-        # end while
+def _parse_dedup_hash_size(config):
+    config: dict = config
 
-        count_y += 1
-        pos_y += crop_res
-    # end while
+    dedup_hash_size_key = "dedup_hash_size"
 
-    if need_final_prog:
+    if dedup_hash_size_key in config and config[dedup_hash_size_key] is not None:
+        dedup_hash_size = config[dedup_hash_size_key]
+        dedup_hash_size = int(dedup_hash_size)
+        dedup_hash_size = _clamp_int(dedup_hash_size, 2, 32)
+    else:
+        dedup_hash_size = 8
+    # end if
+
+    return dedup_hash_size
+
+
+def _parse_mask_loc(config):
+    config: dict = config
+
+    mask_loc_key = "mask_location"
+
+    if mask_loc_key in config and config[mask_loc_key] is not None:
+        mask_loc = config[mask_loc_key]
+        mask_loc = str(mask_loc)
+
+        if mask_loc != _alpha_mask_loc:
+            mask_loc = _abspath(mask_loc)
+    else:
+        mask_loc = None
+    # end if
+
+    return mask_loc
+
+
+def _parse_min_mask_coverage(config):
+    config: dict = config
+
+    min_mask_coverage_key = "min_mask_coverage"
+
+    if min_mask_coverage_key in config and config[min_mask_coverage_key] is not None:
+        min_mask_coverage = config[min_mask_coverage_key]
+        min_mask_coverage = float(min_mask_coverage)
+        min_mask_coverage = min(max(min_mask_coverage, float(0)), float(1))
+    else:
+        min_mask_coverage = 0.5
+    # end if
+
+    return min_mask_coverage
+
+
+def _parse_mask_map_res(config):
+    config: dict = config
+
+    mask_map_res_key = "mask_map_resolution"
+
+    if mask_map_res_key in config and config[mask_map_res_key] is not None:
+        mask_map_res = config[mask_map_res_key]
+        mask_map_res = int(mask_map_res)
+        mask_map_res = _clamp_int(mask_map_res, 1, 65535)
+    elif mask_map_res_key in config:
+        mask_map_res = None
+    else:
+        mask_map_res = 256
+    # end if
+
+    return mask_map_res
+
+
+def _parse_annotation_loc(config):
+    config: dict = config
+
+    annotation_loc_key = "annotation_location"
+
+    if annotation_loc_key in config and config[annotation_loc_key] is not None:
+        annotation_loc = config[annotation_loc_key]
+        annotation_loc = str(annotation_loc)
+        annotation_loc = _abspath(annotation_loc)
+    else:
+        annotation_loc = None
+    # end if
+
+    return annotation_loc
+
+
+def _parse_min_visibility(config):
+    config: dict = config
+
+    min_visibility_key = "min_visibility"
+
+    if min_visibility_key in config and config[min_visibility_key] is not None:
+        min_visibility = config[min_visibility_key]
+        min_visibility = float(min_visibility)
+        min_visibility = min(max(min_visibility, float(0)), float(1))
+    else:
+        min_visibility = float(0)
+    # end if
+
+    return min_visibility
+
+
+def _parse_pipe_buffer_count(config):
+    config: dict = config
+
+    pipe_buffer_count_key = "pipe_buffer_count"
+
+    if pipe_buffer_count_key in config and config[pipe_buffer_count_key] is not None:
+        pipe_buffer_count = config[pipe_buffer_count_key]
+        pipe_buffer_count = int(pipe_buffer_count)
+
+        if pipe_buffer_count < 1:
+            pipe_buffer_count = 1
+    else:
+        pipe_buffer_count = 16
+    # end if
+
+    return pipe_buffer_count
+
+
+def _parse_save_stats(config):
+    config: dict = config
+
+    save_stats_key = "save_stats"
+
+    if save_stats_key in config:
+        save_stats = config[save_stats_key]
+        save_stats = bool(save_stats)
+    else:
+        save_stats = False
+    # end if
+
+    return save_stats
+
+
+def _parse_stats_loc(config, out_path, save_stats):
+    config: dict = config
+    out_path = str(out_path)
+    save_stats = bool(save_stats)
+
+    stats_loc_key = "stats_location"
+
+    if not save_stats:
+        stats_loc = None
+    elif stats_loc_key in config and config[stats_loc_key] is not None:
+        stats_loc = config[stats_loc_key]
+        stats_loc = str(stats_loc)
+        stats_loc = _abspath(stats_loc)
+    else:
+        stats_loc = _join(out_path, "stats.json")
+    # end if
+
+    return stats_loc
+
+
+def _parse_transform_hook(config):
+    config: dict = config
+
+    transform_hook_key = "transform_hook"
+
+    if transform_hook_key in config and config[transform_hook_key] is not None:
+        transform_hook = config[transform_hook_key]
+        transform_hook = str(transform_hook)
+    else:
+        transform_hook = None
+    # end if
+
+    return transform_hook
+
+
+def _parse_transform_batch_size(config):
+    config: dict = config
+
+    transform_batch_size_key = "transform_batch_size"
+
+    if transform_batch_size_key in config and config[transform_batch_size_key] is not None:
+        transform_batch_size = config[transform_batch_size_key]
+        transform_batch_size = int(transform_batch_size)
+        transform_batch_size = max(transform_batch_size, 1)
+    else:
+        transform_batch_size = _transform_batch_size
+    # end if
+
+    return transform_batch_size
+
+
+def _parse_transform_worker_count(config):
+    config: dict = config
+
+    transform_worker_count_key = "transform_worker_count"
+
+    if transform_worker_count_key in config and config[transform_worker_count_key] is not None:
+        transform_worker_count = config[transform_worker_count_key]
+        transform_worker_count = int(transform_worker_count)
+        transform_worker_count = max(transform_worker_count, 1)
+    else:
+        transform_worker_count = None
+    # end if
+
+    return transform_worker_count
+
+
+def _find_crop_name(image_name, pos_x, pos_y, crop_res, resize_res, flip, rot, ext=".jpg", scale=None):
+    image_name = str(image_name)
+    pos_x = int(pos_x)
+    pos_y = int(pos_y)
+    crop_res = int(crop_res)
+
+    if resize_res is None:
+        resize_res = None
+    else:  # elif resize_res is not None:
+        resize_res = int(resize_res)
+    # end if
+
+    flip = str(flip)
+    rot = str(rot)
+
+    if scale is None:
+        scale_tag = ""
+    else:  # elif scale is not None:
+        scale_tag = f"-Scale-{float(scale):g}"
+    # end if
+
+    pos_tag = f"-At-{pos_x}-{pos_y}"
+    crop_tag = f"-Crop-{crop_res}"
+
+    if resize_res is None:
+        resize_tag = ""
+    else:  # elif resize_res is not None:
+        resize_tag = f"-Resize-{resize_res}"
+    # end if
+
+    if flip != "":
+        flip_tag = f"-Flip-{flip}"
+    else:
+        flip_tag = ""
+    # end if
+
+    if rot != "0":
+        rot_tag = f"-Rotation-{rot}"
+    else:
+        rot_tag = ""
+    # end if
+
+    now = _now()
+
+    timestamp = str(
+        f"-Time-{now.year:04}{now.month:02}{now.day:02}-{now.hour:02}{now.minute:02}{now.second:02}-"
+        f"{now.microsecond:06}"
+    )
+
+    ext = str(ext)
+    name = f"{image_name}{scale_tag}{pos_tag}{crop_tag}{resize_tag}{flip_tag}{rot_tag}{timestamp}{ext}"
+    return name
+
+
+def _find_crop_record(meta, source, loc, byte_count):
+    meta: dict = meta
+
+    record = dict(meta)
+    record["source"] = source
+    record["location"] = str(loc)
+    record["bytes"] = int(byte_count)
+    return record
+
+
+def _write_crop_records(manifest, source, saved):
+    """Writes the records of the saved crops, a list of ((meta, loc, paired_locs), byte_count, crop_stats)."""
+    manifest: _ManifestWriter = manifest
+
+    for (meta, loc, paired_locs), byte_count, crop_stats in saved:
+        record = _find_crop_record(meta, source, loc, byte_count)
+
+        if len(paired_locs) > 0:
+            record["paired_locations"] = paired_locs
+
+        if crop_stats is not None:
+            record.update(crop_stats)
+
+        manifest.write(record)
+    # end for
+
+
+def _parse_and_log_crop_params(logs, config):
+    """Returns params, the crop parameters that the file mode and the pipe mode share."""
+    logs: list[_IO] = logs
+    config: dict = config
+
+    save_flips = _parse_save_flips(config)
+    _logln(logs, f"Save flips: {save_flips}")
+
+    if save_flips:
+        flips = ["", "x", "y", "xy"]
+    else:
+        flips = [""]
+    # end if
+
+    save_rots = _parse_save_rots(config)
+    _logln(logs, f"Save rotations: {save_rots}")
+
+    if save_rots:
+        rots = ["", "180"]
+    else:
+        rots = [""]
+    # end if
+
+    crop_res = _parse_crop_res(config)
+    _logln(logs, f"Crop resolution: {crop_res}")
+    resize_ress = _parse_resize_ress(config)
+
+    if len(resize_ress) > 1:
+        resize_res = max(resize_ress)
+        _logln(logs, f"Resize resolutions: {resize_ress}; Cascaded from {resize_res}")
+    elif resize_ress[0] is None:
+        resize_res = None
+        _logln(logs, "No resize, keep crop resolution")
+    else:
+        resize_res = resize_ress[0]
+        _logln(logs, f"Resize resolution: {resize_res}")
+    # end if
+
+    resample = _parse_resample(config)
+    reducing_gap = _parse_reducing_gap(config)
+
+    if reducing_gap is None:
+        _logln(logs, f"Resample: {resample}")
+    else:
+        _logln(logs, f"Resample: {resample}  Reducing gap: {reducing_gap}")
+    # end if
+
+    crop_quality = _parse_crop_quality(config)
+    _logln(logs, f"Crop quality: {crop_quality}")
+    out_format = _parse_out_format(config)
+    _logln(logs, f"Output format: {out_format}")
+    encoder_profile = _parse_encoder_profile(config)
+    _logln(logs, f"Encoder profile: {encoder_profile}")
+    png_compress_level = _parse_png_compress_level(config)
+
+    if png_compress_level is not None:
+        _logln(logs, f"PNG compress level: {png_compress_level}")
+
+    start_pos_x = _parse_start_pos_x(config)
+    _logln(logs, f"Start position X: {start_pos_x}")
+    start_pos_y = _parse_start_pos_y(config)
+    _logln(logs, f"Start position Y: {start_pos_y}")
+    max_crop_count_x = _parse_max_crop_count_x(config)
+    _logln(logs, f"Max crop count X: {max_crop_count_x}")
+    max_crop_count_y = _parse_max_crop_count_y(config)
+    _logln(logs, f"Max crop count Y: {max_crop_count_y}")
+    stride_x = _parse_stride_x(config, crop_res)
+    _logln(logs, f"Stride X: {stride_x}")
+    stride_y = _parse_stride_y(config, crop_res)
+    _logln(logs, f"Stride Y: {stride_y}")
+    scales = _parse_scales(config)
+
+    if scales is not None:
+        _logln(logs, f"Scales: {scales}")
+
+    min_variance = _parse_min_variance(config)
+    min_laplacian_energy = _parse_min_laplacian_energy(config)
+    filter_map_res = _parse_filter_map_res(config)
+
+    if min_variance is not None:
+        _logln(logs, f"Min luminance variance: {min_variance}")
+
+    if min_laplacian_energy is not None:
+        _logln(logs, f"Min Laplacian energy: {min_laplacian_energy}")
+
+    if filter_map_res is not None:
+        _logln(logs, f"Filter map resolution: {filter_map_res}")
+
+    dedup_max_distance = _parse_dedup_max_distance(config)
+    dedup_hash_size = _parse_dedup_hash_size(config)
+
+    if dedup_max_distance is not None:
+        _logln(logs, f"Near duplicate dropping:  Max distance: {dedup_max_distance}  Hash size: {dedup_hash_size}")
+
+    mask_loc = _parse_mask_loc(config)
+    min_mask_coverage = _parse_min_mask_coverage(config)
+    mask_map_res = _parse_mask_map_res(config)
+
+    if mask_loc is not None:
+        _logln(logs, f"Mask location: {mask_loc}")
+        _logln(logs, f"Min mask coverage: {min_mask_coverage}")
+
+        if mask_map_res is not None:
+            _logln(logs, f"Mask map resolution: {mask_map_res}")
+    # end if
+
+    annotation_loc = _parse_annotation_loc(config)
+    min_visibility = _parse_min_visibility(config)
+
+    if annotation_loc is not None:
+        _logln(logs, f"Annotation location: {annotation_loc}")
+        _logln(logs, f"Min label visibility: {min_visibility}")
+    # end if
+
+    params = {
+        "flips": flips,
+        "rots": rots,
+        "crop_res": crop_res,
+        "resize_res": resize_res,
+        "resize_ress": resize_ress,
+        "resample": resample,
+        "reducing_gap": reducing_gap,
+        "out_format": out_format,
+        "ext": _find_ext(out_format),
+        "save_kwargs": _find_save_kwargs(out_format, encoder_profile, crop_quality, png_compress_level),
+        "start_pos_x": start_pos_x,
+        "start_pos_y": start_pos_y,
+        "max_crop_count_x": max_crop_count_x,
+        "max_crop_count_y": max_crop_count_y,
+        "stride_x": stride_x,
+        "stride_y": stride_y,
+        "scales": scales,
+        "min_variance": min_variance,
+        "min_laplacian_energy": min_laplacian_energy,
+        "filter_map_res": filter_map_res,
+        "dedup_max_distance": dedup_max_distance,
+        "dedup_hash_size": dedup_hash_size,
+        "mask_loc": mask_loc,
+        "min_mask_coverage": min_mask_coverage,
+        "mask_map_res": mask_map_res,
+        "annotation_loc": annotation_loc,
+        "min_visibility": min_visibility
+    }
+
+    return params
+
+
+def _make_detail_filter(image, params):
+    """Returns detail_filter, a DetailFilter; or None if there are no filter thresholds."""
+    params: dict = params
+
+    if params["min_variance"] is None and params["min_laplacian_energy"] is None:
+        detail_filter = None
+    else:
+        detail_filter = _DetailFilter(
+            image, params["min_variance"], params["min_laplacian_energy"], params["filter_map_res"]
+        )
+    # end if
+
+    return detail_filter
+
+
+def _make_mask_index(image, image_name, params, box=None, source_size=None):
+    """Returns mask_index, a MaskIndex of the image, or of its box in the source image; or None if there is no mask
+        location.
+    """
+    params: dict = params
+
+    if params["mask_loc"] is None:
+        mask_index = None
+    else:
+        mask = _load_mask(image, _find_mask_loc(params["mask_loc"], image_name), box, source_size)
+        mask_index = _MaskIndex(mask, params["crop_res"], params["min_mask_coverage"], map_res=params["mask_map_res"])
+    # end if
+
+    return mask_index
+
+
+def _make_box_index(image_name, params, scale_x=1.0, scale_y=1.0, offset_x=0, offset_y=0):
+    """Returns box_index, a BoxIndex of the boxes scaled to the level, then shifted by the offsets; or None if there
+        is no annotation location.
+    """
+    global annotation_cache
+    params: dict = params
+
+    if params["annotation_loc"] is None:
+        box_index = None
+    else:
+        annotation_loc = _find_annotation_loc(params["annotation_loc"], image_name)
+
+        if annotation_loc not in annotation_cache:
+            annotation_cache[annotation_loc] = _load_annotations(annotation_loc)
+
+        boxes = _find_image_boxes(annotation_cache[annotation_loc], image_name)
+
+        if scale_x != 1 or scale_y != 1:
+            boxes = _scale_boxes(boxes, scale_x, scale_y)
+
+        if offset_x != 0 or offset_y != 0:
+            boxes = _shift_boxes(boxes, offset_x, offset_y)
+
+        box_index = _BoxIndex(boxes, params["crop_res"])
+    # end if
+
+    return box_index
+
+
+def _save_labels(meta, loc):
+    """Saves the labels of a crop to a JSON file next to the crop."""
+    meta: dict = meta
+    loc = str(loc)
+
+    labels_loc = _split_text(loc)[0] + ".json"
+    _save_json({"labels": meta["labels"]}, labels_loc)
+
+
+def _find_hash_index(params):
+    """Returns index, the external hash index, a new HashIndex, or None if there is no dedup."""
+    global hash_index
+    params: dict = params
+
+    if hash_index is not None:
+        index = hash_index
+    elif params["dedup_max_distance"] is not None:
+        index = _HashIndex(params["dedup_max_distance"], params["dedup_hash_size"] ** 2)
+    else:
+        index = None
+    # end if
+
+    return index
+
+
+def _load_paired_images(image, image_name, paired_image_locs):
+    """Returns paired_images, the opened paired images, which have the image size."""
+    image: _pil_image.Image = image
+    paired_image_locs: list[str] = paired_image_locs
+
+    paired_images = []
+
+    for paired_image_loc in paired_image_locs:
+        paired_image_loc = paired_image_loc.replace(_image_name_tag, image_name)
+        paired_image = _pil_image_open(paired_image_loc)
+
+        if paired_image.size != image.size:
+            raise ValueError(
+                f"Paired image size {paired_image.size} differs from the image size {image.size}: {paired_image_loc}"
+            )
+        # end if
+
+        paired_images.append(paired_image)
+    # end for
+
+    return paired_images
+
+
+def _find_level_paths(path, resize_ress):
+    """Returns level_paths, the output paths of the resize resolutions, with 1 subfolder each if there are many."""
+    path = str(path)
+    resize_ress: list = resize_ress
+
+    if len(resize_ress) > 1:
+        level_paths = [_join(path, f"Resize-{resize_res}") for resize_res in resize_ress]
+    else:
+        level_paths = [path]
+    # end if
+
+    return level_paths
+
+
+def _find_level_meta(meta, resize_res, level_res):
+    """Returns level_meta, the metadata of a cascaded level of a crop."""
+    meta: dict = meta
+
+    level_meta = dict(meta)
+    level_meta["resize"] = level_res
+
+    if "labels" in meta and level_res != resize_res:
+        level_meta["labels"] = _transform_labels(meta["labels"], resize_res, level_res)
+
+    return level_meta
+
+
+def _find_levels(image, params, resample):
+    """Returns levels, the (scale, level image) pairs of the scales, built lazily; or only the image if no scales."""
+    image: _pil_image.Image = image
+    params: dict = params
+
+    if params["scales"] is None:
+        levels = iter([(None, image)])
+    else:
+        levels = _iter_pyramid(image, params["scales"], resample)
+    # end if
+
+    return levels
+
+
+def _iter_regions(image, paired_images, rois, params):
+    """Yields roi, region, paired_regions; only the whole image if there are no ROIs.
+
+    The regions are read 1 at a time, so only the source data under the ROIs gets decoded where the format allows.
+    """
+    image: _pil_image.Image = image
+    paired_images: list[_pil_image.Image] = paired_images
+    params: dict = params
+
+    if rois is None:
+        roi = {
+            "box": (0, 0, image.width, image.height),
+            "start_pos_x": params["start_pos_x"],
+            "start_pos_y": params["start_pos_y"],
+            "max_crop_count_x": params["max_crop_count_x"],
+            "max_crop_count_y": params["max_crop_count_y"]
+        }
+
+        yield roi, image, paired_images
+        return
+    # end if
+
+    for roi in rois:
+        left, upper, right, lower = roi["box"]
+        box = (left, upper, min(right, image.width), min(lower, image.height))
+
+        if box[2] <= box[0] or box[3] <= box[1]:
+            yield dict(roi, box=None), None, None
+            continue
+
+        region = _read_region(image, box)
+        paired_regions = [_read_region(paired_image, box) for paired_image in paired_images]
+        yield dict(roi, box=box), region, paired_regions
+    # end for
+
+
+def _tweak_max_pixels(logs):
+    logs: list[_IO] = logs
+
+    # Edit PIL max image pixels to avoid zip bomb detection false alarm
+    max_width = 65535
+    max_height = 65535
+    max_pixels = max_width * max_height
+    _pil_image.MAX_IMAGE_PIXELS = max_pixels
+    _logln(logs, f"Tweaked PIL safety max pixels:  Width: {max_width}  Height: {max_height}  Total: {max_pixels}")
+
+
+def _prep_and_crop(logs):
+    global config_loc
+    logs: list[_IO] = logs
+
+    info = str(
+        "Started preparation\n"
+        "-"
+    )
+
+    _logln(logs, info)
+
+    # Parse config
+    config = _load_json(config_loc)
+
+    image_loc = _parse_image_loc(config)
+    _logln(logs, f"Image location: {image_loc}")
+    out_path = _parse_out_path(config)
+    _logln(logs, f"Output path: {out_path}")
+    params = _parse_and_log_crop_params(logs, config)
+    crop_res = params["crop_res"]
+    resize_res = params["resize_res"]
+    out_format = params["out_format"]
+    ext = params["ext"]
+    save_kwargs = params["save_kwargs"]
+    rois = _parse_rois(config, params)
+
+    if rois is not None:
+        _logln(logs, f"ROI count: {len(rois)}")
+
+    manifest_format = _parse_manifest_format(config)
+    manifest_loc = _parse_manifest_loc(config, out_path, manifest_format)
+    paired_image_locs = _parse_paired_image_locs(config)
+    paired_out_paths = _parse_paired_out_paths(config, out_path, len(paired_image_locs))
+    paired_out_format = _parse_paired_out_format(config, out_format)
+    paired_ext = _find_ext(paired_out_format)
+    paired_save_kwargs = _find_save_kwargs(
+        paired_out_format, _parse_encoder_profile(config), _parse_crop_quality(config),
+        _parse_png_compress_level(config)
+    )
+    paired_resample = _parse_paired_resample(config)
+
+    for paired_image_loc, paired_out_path in zip(paired_image_locs, paired_out_paths):
+        _logln(logs, f"Paired image location: {paired_image_loc}  Output path: {paired_out_path}")
+
+    if len(paired_image_locs) > 0:
+        _logln(logs, f"Paired output format: {paired_out_format}  Resample: {paired_resample}")
+
+    _tweak_max_pixels(logs)
+
+    # Read image
+    image = _pil_image_open(image_loc)
+    image_name = _split_text(_basename(image_loc))[0]
+    _logln(logs, "Completed loading image")
+
+    paired_images = _load_paired_images(image, image_name, paired_image_locs)
+
+    if len(paired_images) > 0:
+        _logln(logs, f"Completed loading {len(paired_images)} paired images")
+
+    # Ensure output folder
+    _makedirs(out_path, exist_ok=True)
+
+    resize_ress = params["resize_ress"]
+    level_out_paths = _find_level_paths(out_path, resize_ress)
+    level_paired_out_paths = [_find_level_paths(paired_out_path, resize_ress) for paired_out_path in paired_out_paths]
+
+    for level_out_path in level_out_paths:
+        _makedirs(level_out_path, exist_ok=True)
+
+    for paired_level_out_paths in level_paired_out_paths:
+        for paired_level_out_path in paired_level_out_paths:
+            _makedirs(paired_level_out_path, exist_ok=True)
+    # end for
+
+    save_stats = _parse_save_stats(config)
+    stats_loc = _parse_stats_loc(config, out_path, save_stats)
+
+    if stats_accumulator is not None:
+        dataset_stats = stats_accumulator
+    elif save_stats:
+        dataset_stats = _StatsAccumulator()
+        _logln(logs, f"Stats location: {stats_loc}")
+    else:
+        dataset_stats = None
+    # end if
+
+    transform_hook = _parse_transform_hook(config)
+
+    if transform_hook is not None:
+        batch_writer = _BatchWriter(
+            transform_hook, out_format, save_kwargs, _parse_transform_batch_size(config),
+            _parse_transform_worker_count(config), dataset_stats is not None
+        )
+
+        _logln(
+            logs,
+            f"Transform hook: {transform_hook}  Batch size: {batch_writer.batch_size}  "
+            f"Worker count: {batch_writer.worker_count}"
+        )
+    else:
+        batch_writer = None
+    # end if
+
+    # Open manifest
+    if manifest_writer is not None:
+        manifest = manifest_writer
+        _logln(logs, f"Manifest location: {manifest.loc}")
+    elif manifest_format is not None:
+        manifest = _ManifestWriter(manifest_loc, manifest_format)
+        _logln(logs, f"Manifest location: {manifest.loc}")
+    else:
+        manifest = None
+    # end if
+
+    info = str(
+        "-\n"
+        "Completed preparation"
+    )
+
+    _logln(logs, info)
+
+    info = str(
+        "Started grid cropping\n"
+        "-"
+    )
+
+    _logln(logs, info)
+
+    # Start actual cropping
+    total_count = 0
+    filtered_count = 0
+    hidden_count = 0
+    masked_count = 0
+    need_final_prog = False
+    index = _find_hash_index(params)
+
+    if index is not None:
+        start_dup_count = index.duplicate_count
+
+    regions = _iter_regions(image, paired_images, rois, params)
+
+    for roi_idx, (roi, region, paired_regions) in enumerate(regions):
+        if rois is not None and region is None:
+            _logln(logs, f"Skipped ROI {roi_idx + 1} / {len(rois)}, which lies outside the image")
+            continue
+        elif rois is not None:
+            _logln(logs, f"Started ROI {roi_idx + 1} / {len(rois)}:  Box: {roi['box']}")
+        # end if
+
+        levels = _find_levels(region, params, params["resample"])
+        paired_levels = [_find_levels(paired_region, params, paired_resample) for paired_region in paired_regions]
+
+        for scale, level_image in levels:
+            level_paired_images = [next(paired_level)[1] for paired_level in paired_levels]
+
+            if scale is not None:
+                _logln(logs, f"Started scale {scale:g}:  Width: {level_image.width}  Height: {level_image.height}")
+
+            # The ROI offsets in the level, so that the crop positions stay in the level coordinates
+            if scale is None:
+                offset_x, offset_y = roi["box"][:2]
+                source_size = image.size
+            else:
+                offset_x = round(roi["box"][0] * scale)
+                offset_y = round(roi["box"][1] * scale)
+                source_size = _find_level_size(image.size, scale)
+            # end if
+
+            # Without ROIs, the level is the whole image level, so its own size is exact
+            if rois is None:
+                source_size = level_image.size
+
+            if rois is None:
+                mask_box = None
+            else:
+                mask_box = (offset_x, offset_y, offset_x + level_image.width, offset_y + level_image.height)
+            # end if
+
+            detail_filter = _make_detail_filter(level_image, params)
+            mask_index = _make_mask_index(level_image, image_name, params, mask_box, source_size)
+            box_index = _make_box_index(
+                image_name, params, source_size[0] / image.width, source_size[1] / image.height, -offset_x, -offset_y
+            )
+
+            image_crops = _iter_grid_crops(
+                level_image, crop_res, resize_res, roi["start_pos_x"], roi["start_pos_y"],
+                roi["max_crop_count_x"], roi["max_crop_count_y"], params["flips"], params["rots"],
+                detail_filter=detail_filter, mask=mask_index, box_index=box_index,
+                min_visibility=params["min_visibility"], stride_x=params["stride_x"], stride_y=params["stride_y"],
+                resample=params["resample"], reducing_gap=params["reducing_gap"]
+            )
+
+            image_crops = _iter_paired_crops(image_crops, level_paired_images, paired_resample)
+
+            for crop, paired_crops, meta in image_crops:
+                if index is not None and not index.check_and_add(_dhash(crop, params["dedup_hash_size"])):
+                    continue
+
+                meta["x"] += offset_x
+                meta["y"] += offset_y
+
+                level_crops = _cascade_crop(crop, resize_ress, params["resample"], params["reducing_gap"])
+                level_paired_crops = [
+                    _cascade_crop(paired_crop, resize_ress, paired_resample) for paired_crop in paired_crops
+                ]
+
+                if scale is not None:
+                    meta["scale"] = scale
+
+                for level_idx, level_res in enumerate(resize_ress):
+                    level_meta = _find_level_meta(meta, resize_res, level_res)
+                    name = _find_crop_name(
+                        image_name, meta["x"], meta["y"], crop_res, level_res, meta["flip"],
+                        _deg_to_rot(meta["rotation"]), ext, scale
+                    )
+
+                    loc = _join(level_out_paths[level_idx], name)
+                    paired_locs = []
+
+                    for paired_idx, paired_level_crops in enumerate(level_paired_crops):
+                        paired_loc = _join(
+                            level_paired_out_paths[paired_idx][level_idx], _split_text(name)[0] + paired_ext
+                        )
+
+                        _save_image(paired_level_crops[level_idx], paired_loc, paired_out_format, paired_save_kwargs)
+                        paired_locs.append(paired_loc)
+                    # end for
+
+                    if batch_writer is None:
+                        byte_count = _save_image(level_crops[level_idx], loc, out_format, save_kwargs)
+
+                        if dataset_stats is not None:
+                            level_stats = dataset_stats.add(level_crops[level_idx])
+                        else:
+                            level_stats = None
+                        # end if
+
+                        saved = [((level_meta, loc, paired_locs), byte_count, level_stats)]
+                    else:
+                        context = (level_meta, loc, paired_locs)
+                        saved = batch_writer.write(level_crops[level_idx], loc, level_meta, context)
+                    # end if
+
+                    if manifest is not None:
+                        _write_crop_records(manifest, image_loc, saved)
+
+                    if box_index is not None and (manifest is None or manifest.manifest_format == "bin"):
+                        _save_labels(level_meta, loc)
+
+                    total_count += 1
+
+                    if total_count == 1 or total_count % 256 == 0:
+                        _logln(logs, f"Saved {total_count} cropped images")
+                        need_final_prog = False
+                    else:
+                        need_final_prog = True
+                    # end if
+                # end for
+            # end for
+
+            if detail_filter is not None:
+                filtered_count += detail_filter.rejected_count
+
+            if box_index is not None:
+                hidden_count += box_index.hidden_count
+
+            if mask_index is not None:
+                masked_count += mask_index.rejected_count
+
+            # Release the level before the next one gets built
+            del level_image, level_paired_images, detail_filter, mask_index, box_index, image_crops
+        # end for
+
+        # Release the region before the next one gets read
+        del region, paired_regions, levels, paired_levels
+    # end for
+
+    if batch_writer is not None:
+        saved = batch_writer.flush()
+
+        if manifest is not None:
+            _write_crop_records(manifest, image_loc, saved)
+
+        _logln(logs, f"Transformed {batch_writer.batch_count} batches")
+
+        if dataset_stats is not None:
+            dataset_stats.merge(batch_writer.stats)
+    # end if
+
+    if dataset_stats is not None and dataset_stats is not stats_accumulator:
+        dataset_stats.save(stats_loc)
+        _logln(logs, f"Saved the stats of {dataset_stats.crop_count} cropped images")
+    # end if
+
+    if need_final_prog:
         _logln(logs, f"Saved {total_count} cropped images")
 
+    if params["mask_loc"] is not None:
+        _logln(logs, f"Skipped {masked_count} boxes outside the mask")
+
+    if params["annotation_loc"] is not None:
+        _logln(logs, f"Dropped {hidden_count} labels under the min visibility")
+
+    if params["min_variance"] is not None or params["min_laplacian_energy"] is not None:
+        _logln(logs, f"Filtered {filtered_count} blank or blurry boxes")
+
+    if index is not None:
+        _logln(logs, f"Dropped {index.duplicate_count - start_dup_count} near duplicate crops")
+
+    if manifest is not None:
+        manifest.flush()
+
+    if manifest is not None and manifest is not manifest_writer:
+        manifest.close()
+
     info = str(
         "-\n"
         "Completed grid cropping"
@@ -482,6 +1700,156 @@ def _prep_and_crop(logs):
     _flush_logs(logs)
 
 
+def _prep_and_pipe(logs):
+    global config_loc
+    logs: list[_IO] = logs
+
+    info = str(
+        "Started preparation\n"
+        "-"
+    )
+
+    _logln(logs, info)
+
+    # Parse config
+    config = _load_json(config_loc)
+
+    params = _parse_and_log_crop_params(logs, config)
+    crop_res = params["crop_res"]
+    resize_res = params["resize_res"]
+    out_format = params["out_format"]
+    ext = params["ext"]
+    save_kwargs = params["save_kwargs"]
+    resize_ress = params["resize_ress"]
+    pipe_buffer_count = _parse_pipe_buffer_count(config)
+    _logln(logs, f"Pipe buffer count: {pipe_buffer_count}")
+
+    _tweak_max_pixels(logs)
+
+    info = str(
+        "-\n"
+        "Completed preparation"
+    )
+
+    _logln(logs, info)
+
+    info = str(
+        "Started grid cropping in pipe mode\n"
+        "-"
+    )
+
+    _logln(logs, info)
+
+    # Start actual cropping
+    reader = _FrameReader(_stdin.buffer, pipe_buffer_count)
+    writer = _CropFrameWriter(_stdout.buffer, pipe_buffer_count)
+    image_idx = 0
+    total_count = 0
+    filtered_count = 0
+    hidden_count = 0
+    masked_count = 0
+    index = _find_hash_index(params)
+
+    if index is not None:
+        start_dup_count = index.duplicate_count
+
+    need_final_prog = False
+
+    for payload in reader:
+        image = _decode(payload)
+        image_name = f"Pipe-{image_idx}"
+
+        for scale, level_image in _find_levels(image, params, params["resample"]):
+            detail_filter = _make_detail_filter(level_image, params)
+            mask_index = _make_mask_index(level_image, image_name, params)
+            box_index = _make_box_index(
+                image_name, params, level_image.width / image.width, level_image.height / image.height
+            )
+
+            image_crops = _iter_grid_crops(
+                level_image, crop_res, resize_res, params["start_pos_x"], params["start_pos_y"],
+                params["max_crop_count_x"], params["max_crop_count_y"], params["flips"], params["rots"],
+                detail_filter=detail_filter, mask=mask_index, box_index=box_index,
+                min_visibility=params["min_visibility"], stride_x=params["stride_x"], stride_y=params["stride_y"],
+                resample=params["resample"], reducing_gap=params["reducing_gap"]
+            )
+
+            for crop, meta in image_crops:
+                if index is not None and not index.check_and_add(_dhash(crop, params["dedup_hash_size"])):
+                    continue
+
+                level_crops = _cascade_crop(crop, resize_ress, params["resample"], params["reducing_gap"])
+
+                if scale is not None:
+                    meta["scale"] = scale
+
+                for level_idx, level_res in enumerate(resize_ress):
+                    header = _find_level_meta(meta, resize_res, level_res)
+                    header["index"] = total_count
+                    header["source"] = image_idx
+                    header["name"] = _find_crop_name(
+                        image_name, meta["x"], meta["y"], crop_res, level_res, meta["flip"],
+                        _deg_to_rot(meta["rotation"]), ext, scale
+                    )
+                    header["format"] = out_format
+
+                    crop_payload = _encode(level_crops[level_idx], out_format, save_kwargs)
+                    writer.put(header, crop_payload)
+                    total_count += 1
+
+                    if total_count == 1 or total_count % 256 == 0:
+                        _logln(logs, f"Piped {total_count} cropped images")
+                        need_final_prog = False
+                    else:
+                        need_final_prog = True
+                    # end if
+                # end for
+            # end for
+
+            if detail_filter is not None:
+                filtered_count += detail_filter.rejected_count
+
+            if box_index is not None:
+                hidden_count += box_index.hidden_count
+
+            if mask_index is not None:
+                masked_count += mask_index.rejected_count
+
+            # Release the level before the next one gets built
+            del level_image, detail_filter, mask_index, box_index, image_crops
+        # end for
+
+        image_idx += 1
+    # end for
+
+    writer.close()
+
+    if need_final_prog:
+        _logln(logs, f"Piped {total_count} cropped images")
+
+    _logln(logs, f"Piped from {image_idx} images")
+
+    if params["mask_loc"] is not None:
+        _logln(logs, f"Skipped {masked_count} boxes outside the mask")
+
+    if params["annotation_loc"] is not None:
+        _logln(logs, f"Dropped {hidden_count} labels under the min visibility")
+
+    if params["min_variance"] is not None or params["min_laplacian_energy"] is not None:
+        _logln(logs, f"Filtered {filtered_count} blank or blurry boxes")
+
+    if index is not None:
+        _logln(logs, f"Dropped {index.duplicate_count - start_dup_count} near duplicate crops")
+
+    info = str(
+        "-\n"
+        "Completed grid cropping in pipe mode"
+    )
+
+    _logln(logs, info)
+    _flush_logs(logs)
+
+
 def start_cropping():
     """Starts the cropping."""
     global log_loc
@@ -529,6 +1897,57 @@ def start_cropping():
     log_file.close()
 
 
+def start_piping():
+    """Starts the cropping in pipe mode.
+
+    Reads the image frames from stdin and writes the crop frames to stdout.
+    Logs to stderr, because stdout carries the crop frames.
+    """
+    global log_loc
+
+    start_time = _now()
+    log_file: _IO = open(log_loc, "a+")
+    all_logs = [_stderr, log_file]
+    err_logs = [_stderr, log_file]
+
+    info = str(
+        "AIDesign-Widgets grid cropping in pipe mode\n"
+        "-"
+    )
+
+    _logln(all_logs, info)
+
+    try:
+        _prep_and_pipe(all_logs)
+    except BaseException as base_exception:
+        _logstr(err_logs, _format_exc())
+        end_time = _now()
+        exe_time = end_time - start_time
+
+        info = str(
+            f"-\n"
+            f"Execution stopped after: {exe_time} (days, hours: minutes: seconds)\n"
+            f"-"
+        )
+
+        _logln(all_logs, info)
+        log_file.close()
+        raise base_exception
+    # end try
+
+    end_time = _now()
+    exe_time = end_time - start_time
+
+    info = str(
+        f"-\n"
+        f"Execution time: {exe_time} (days, hours: minutes: seconds)\n"
+        f"-"
+    )
+
+    _logln(all_logs, info)
+    log_file.close()
+
+
 def run():
     """Runs the executable as a command."""
     global argv_copy
@@ -579,7 +1998,30 @@ def run():
         # end if
 
         _exit(0)
-    else:  # elif argv_copy_length > 0:
+    elif argv_copy_length == 1 and argv_copy[0] == pipe_flag:
+        argv_copy.pop(0)
+        config_loc = _join(defaults.app_data_path, defaults.grid_crop_config_name)
+        log_loc = _join(defaults.app_data_path, "log.txt")
+
+        try:
+            start_piping()
+        except BaseException as base_exception:
+            # _print_exc()  # Debug
+
+            if isinstance(base_exception, SystemExit):
+                exit_code = base_exception.code
+            else:
+                exit_code = 1
+
+            print(pipe_stopped_info.format(log_loc), file=_stderr)
+            _exit(exit_code)
+        # end try
+
+        _exit(0)
+    elif argv_copy_length == 1:
+        print(unknown_arg_info.format(argv_copy[0]), file=_stderr)
+        _exit(1)
+    else:  # elif argv_copy_length > 1:
         print(too_many_args_info.format(argv_copy_length), file=_stderr)
         _exit(1)
     # end if
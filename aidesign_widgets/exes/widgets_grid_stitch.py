@@ -0,0 +1,487 @@
+""""widgets grid-stitch" command executable."""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import copy
+import datetime
+import sys
+import traceback
+import typing
+
+from os import path as ospath
+from PIL import Image as pil_image
+
+from aidesign_widgets.libs import crops
+from aidesign_widgets.libs import defaults
+from aidesign_widgets.libs import stitches
+from aidesign_widgets.libs import utils
+
+# Aliases
+
+_abspath = ospath.abspath
+_argv = sys.argv
+_clamp_int = utils.clamp_int
+_deepcopy = copy.deepcopy
+_exit = sys.exit
+_find_manifest_tiles = stitches.find_manifest_tiles
+_find_name_tiles = stitches.find_name_tiles
+_flushlogs = utils.flushlogs
+_format_exc = traceback.format_exc
+_IO = typing.IO
+_iter_stitch_bands = stitches.iter_stitch_bands
+_join = ospath.join
+_load_json = utils.load_json
+_logln = utils.logln
+_logstr = utils.logstr
+_now = datetime.datetime.now
+_pil_image = pil_image
+# _print_exc = traceback.print_exc  # Debug
+_select_tiles = stitches.select_tiles
+_split_text = ospath.splitext
+_stderr = sys.stderr
+_stdout = sys.stdout
+_stitch_format_exts = stitches.format_exts
+_supported_resamples = crops.supported_resamples
+_supported_stitch_formats = stitches.supported_formats
+_TimedInput = utils.TimedInput
+
+# -
+
+brief_usage = "widgets grid-stitch"
+"""Brief usage."""
+
+usage = fr"""
+
+Usage: {brief_usage}
+Help: widgets help
+
+""".strip()
+"""Usage."""
+
+timeout = float(10)
+"""Timeout in seconds."""
+
+info = fr"""
+
+"{brief_usage}" command config:
+{{}}
+-
+Please confirm the above config file contents
+Do you want to continue? [ Y (Yes) | n (no) ]: < default: Yes, timeout: {timeout} seconds >
+
+""".strip()
+"""Primary info to display."""
+
+will_start_info = fr"""
+
+Will start stitching
+---- The following will be logged to {{}} ----
+
+""".strip()
+"""Info to display before stitching starts."""
+
+stopped_info = fr"""
+
+---- The above has been logged to {{}} ----
+Stitching stopped
+
+""".strip()
+"""Info to display after stitching stops."""
+
+completed_info = fr"""
+
+---- The above has been logged to {{}} ----
+Stitching completed
+
+""".strip()
+"""Info to display after stitching completes."""
+
+aborted_info = fr"""
+
+Aborted the image stitching process
+
+""".strip()
+"""Info to display when the user aborts the stitching process."""
+
+too_many_args_info = fr"""
+
+"{brief_usage}" gets too many arguments
+Expects 0 arguments; Gets {{}} arguments
+{usage}
+
+""".strip()
+"""Info to display when the executable gets too many arguments."""
+
+argv_copy = None
+"""Consumable copy of sys.argv."""
+config_loc = None
+"""Config location."""
+log_loc = None
+"""Log location."""
+
+
+def _parse_manifest_loc(config):
+    config: dict = config
+
+    manifest_loc_key = "manifest_location"
+
+    if manifest_loc_key in config and config[manifest_loc_key] is not None:
+        manifest_loc = config[manifest_loc_key]
+        manifest_loc = str(manifest_loc)
+        manifest_loc = _abspath(manifest_loc)
+    else:
+        manifest_loc = None
+    # end if
+
+    return manifest_loc
+
+
+def _parse_input_path(config):
+    config: dict = config
+
+    input_path_key = "input_path"
+
+    if input_path_key in config and config[input_path_key] is not None:
+        input_path = config[input_path_key]
+        input_path = str(input_path)
+        input_path = _abspath(input_path)
+    else:
+        input_path = None
+    # end if
+
+    return input_path
+
+
+def _parse_image_name(config):
+    config: dict = config
+
+    image_name_key = "image_name"
+
+    if image_name_key in config and config[image_name_key] is not None:
+        image_name = config[image_name_key]
+        image_name = str(image_name)
+    else:
+        image_name = None
+    # end if
+
+    return image_name
+
+
+def _parse_output_loc(config):
+    config: dict = config
+
+    output_loc = config["output_location"]
+
+    if output_loc is None:
+        raise ValueError("Output location cannot be None")
+
+    output_loc = str(output_loc)
+    output_loc = _abspath(output_loc)
+    return output_loc
+
+
+def _parse_output_format(config, output_loc):
+    config: dict = config
+    output_loc = str(output_loc)
+
+    output_format_key = "output_format"
+
+    if output_format_key in config and config[output_format_key] is not None:
+        output_format = config[output_format_key]
+        output_format = str(output_format).lower()
+    else:
+        output_format = "png"
+        ext = _split_text(output_loc)[1].lower()
+
+        for stitch_format in _supported_stitch_formats:
+            if ext == _stitch_format_exts[stitch_format]:
+                output_format = stitch_format
+        # end for
+    # end if
+
+    if output_format not in _supported_stitch_formats:
+        raise ValueError(f"Unsupported output format: {output_format}; Supported: {_supported_stitch_formats}")
+
+    return output_format
+
+
+def _parse_band_height(config):
+    config: dict = config
+
+    band_height_key = "band_height"
+
+    if band_height_key in config and config[band_height_key] is not None:
+        band_height = config[band_height_key]
+        band_height = int(band_height)
+        band_height = max(band_height, 1)
+    else:
+        band_height = None
+    # end if
+
+    return band_height
+
+
+def _parse_worker_count(config):
+    config: dict = config
+
+    worker_count_key = "worker_count"
+
+    if worker_count_key in config and config[worker_count_key] is not None:
+        worker_count = config[worker_count_key]
+        worker_count = int(worker_count)
+        worker_count = max(worker_count, 1)
+    else:
+        worker_count = None
+    # end if
+
+    return worker_count
+
+
+def _parse_resample(config):
+    config: dict = config
+
+    resample_key = "resample"
+
+    if resample_key in config and config[resample_key] is not None:
+        resample = config[resample_key]
+        resample = str(resample).lower()
+    else:
+        resample = "bicubic"
+    # end if
+
+    if resample not in _supported_resamples:
+        raise ValueError(f"Unsupported resample: {resample}; Supported: {_supported_resamples}")
+
+    return resample
+
+
+def _parse_compress_level(config):
+    config: dict = config
+
+    compress_level_key = "png_compress_level"
+
+    if compress_level_key in config and config[compress_level_key] is not None:
+        compress_level = config[compress_level_key]
+        compress_level = int(compress_level)
+        compress_level = _clamp_int(compress_level, 0, 9)
+    else:
+        compress_level = 6
+    # end if
+
+    return compress_level
+
+
+def _prep_and_stitch(logs):
+    global config_loc
+    logs: list[_IO] = logs
+
+    info = str(
+        "Started preparation\n"
+        "-"
+    )
+
+    _logln(logs, info)
+
+    # Parse config
+    config = _load_json(config_loc)
+
+    manifest_loc = _parse_manifest_loc(config)
+    input_path = _parse_input_path(config)
+
+    if manifest_loc is None and input_path is None:
+        raise ValueError("Manifest location and input path cannot both be None")
+
+    _logln(logs, f"Manifest location: {manifest_loc}")
+    _logln(logs, f"Input path: {input_path}")
+    image_name = _parse_image_name(config)
+    _logln(logs, f"Image name: {image_name}")
+    output_loc = _parse_output_loc(config)
+    _logln(logs, f"Output location: {output_loc}")
+    output_format = _parse_output_format(config, output_loc)
+    _logln(logs, f"Output format: {output_format}")
+    band_height = _parse_band_height(config)
+    _logln(logs, f"Band height: {band_height}")
+    worker_count = _parse_worker_count(config)
+    _logln(logs, f"Worker count: {worker_count}")
+    resample = _parse_resample(config)
+    _logln(logs, f"Resample: {resample}")
+    compress_level = _parse_compress_level(config)
+
+    if output_format == "png":
+        _logln(logs, f"PNG compress level: {compress_level}")
+
+    # Edit PIL max image pixels to avoid zip bomb detection false alarm
+    max_width = 65535
+    max_height = 65535
+    max_pixels = max_width * max_height
+    _pil_image.MAX_IMAGE_PIXELS = max_pixels
+    _logln(logs, f"Tweaked PIL safety max pixels:  Width: {max_width}  Height: {max_height}  Total: {max_pixels}")
+
+    # Find tiles
+    if manifest_loc is not None:
+        tiles = _find_manifest_tiles(manifest_loc, input_path)
+    else:
+        tiles = _find_name_tiles(input_path)
+    # end if
+
+    _logln(logs, f"Found {len(tiles)} tiles")
+    tiles = _select_tiles(tiles, image_name)
+    _logln(logs, f"Selected {len(tiles)} tiles")
+
+    info = str(
+        "-\n"
+        "Completed preparation"
+    )
+
+    _logln(logs, info)
+
+    info = str(
+        "Started stitching\n"
+        "-"
+    )
+
+    _logln(logs, info)
+
+    band_idx = 0
+    bands = _iter_stitch_bands(tiles, output_loc, output_format, band_height, worker_count, resample, compress_level)
+
+    for band_upper, band_lower, height in bands:
+        band_idx += 1
+
+        if band_idx == 1:
+            _logln(logs, f"Stitched band 1:  Rows: {band_upper} to {band_lower}  Image height: {height}")
+        elif band_idx % 16 == 0 or band_lower >= height:
+            _logln(logs, f"Stitched band {band_idx}:  Rows: {band_upper} to {band_lower}")
+            _flushlogs(logs)
+        # end if
+    # end for
+
+    info = str(
+        "-\n"
+        "Completed stitching"
+    )
+
+    _logln(logs, info)
+    _flushlogs(logs)
+
+
+def start_stitching():
+    """Starts the stitching."""
+    global log_loc
+
+    start_time = _now()
+    log_file: _IO = open(log_loc, "a+")
+    all_logs = [_stdout, log_file]
+    err_logs = [_stderr, log_file]
+
+    info = str(
+        "AIDesign-Widgets grid stitching\n"
+        "-"
+    )
+
+    _logln(all_logs, info)
+
+    try:
+        _prep_and_stitch(all_logs)
+    except BaseException as base_exception:
+        _logstr(err_logs, _format_exc())
+        end_time = _now()
+        exe_time = end_time - start_time
+
+        info = str(
+            f"-\n"
+            f"Execution stopped after: {exe_time} (days, hours: minutes: seconds)\n"
+            f"-"
+        )
+
+        _logln(all_logs, info)
+        log_file.close()
+        raise base_exception
+    # end try
+
+    end_time = _now()
+    exe_time = end_time - start_time
+
+    info = str(
+        f"-\n"
+        f"Execution time: {exe_time} (days, hours: minutes: seconds)\n"
+        f"-"
+    )
+
+    _logln(all_logs, info)
+    log_file.close()
+
+
+def run():
+    """Runs the executable as a command."""
+    global argv_copy
+    global config_loc
+    global log_loc
+    argv_copy_length = len(argv_copy)
+
+    assert argv_copy_length >= 0
+
+    if argv_copy_length == 0:
+        config_loc = _join(defaults.app_data_path, defaults.grid_stitch_config_name)
+        print(info.format(config_loc))
+
+        timed_input = _TimedInput()
+        answer = timed_input.take(timeout)
+
+        if answer is None:
+            answer = "Yes"
+            print(f"\n{answer} (timeout)")
+        elif len(answer) <= 0:
+            answer = "Yes"
+            print(f"{answer} (default)")
+        # end if
+
+        print("-")
+
+        if answer.lower() == "yes" or answer.lower() == "y":
+            log_loc = _join(defaults.app_data_path, "log.txt")
+            print(will_start_info.format(log_loc))
+
+            try:
+                start_stitching()
+            except BaseException as base_exception:
+                # _print_exc()  # Debug
+
+                if isinstance(base_exception, SystemExit):
+                    exit_code = base_exception.code
+                else:
+                    exit_code = 1
+
+                print(stopped_info.format(log_loc), file=_stderr)
+                _exit(exit_code)
+            # end try
+
+            print(completed_info.format(log_loc))
+        else:  # elif answer.lower() == "no" or answer.lower() == "n" or answer is Others:
+            print(aborted_info)
+        # end if
+
+        _exit(0)
+    else:  # elif argv_copy_length > 0:
+        print(too_many_args_info.format(argv_copy_length), file=_stderr)
+        _exit(1)
+    # end if
+
+
+def main():
+    """Starts the executable."""
+    global argv_copy
+    argv_length = len(_argv)
+
+    assert argv_length >= 1
+
+    argv_copy = _deepcopy(_argv)
+    argv_copy.pop(0)
+    run()
+
+
+if __name__ == "__main__":
+    main()
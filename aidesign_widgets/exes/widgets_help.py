@@ -43,9 +43,14 @@ info:
 grid-crop:
     When:   You want to crop a large image into small pieces, with the crop positions having a grid-like alignment.
     How-to: widgets grid-crop
+    Pipe:   widgets grid-crop --pipe < <image-frames> > <crop-frames>
+grid-stitch:
+    When:   You want to stitch the grid crops, or the model outputs of the grid crops, back into a full image.
+    How-to: widgets grid-stitch
 rand-crop:
     When:   You want to crop a large image into small pieces, with randomly picked crop positions.
     How-to: widgets rand-crop
+    Pipe:   widgets rand-crop --pipe < <image-frames> > <crop-frames>
 path-name:
     When:   You want to show a path name as an escaped string with quotes, which can be directly used in JSON.
     How-to: widgets path-name <relative-path>
@@ -59,6 +64,19 @@ bulk-crop:
     rand:
         When:   You want to start a bulk random cropping session.
         How-to: widgets bulk-crop rand
+    resize:
+        When:   You want to start a bulk resizing session, which shrinks each whole image.
+        How-to: widgets bulk-crop resize
+bench:
+    When:   You want to measure the performance trade-offs of the cropping options.
+    How-to: widgets bench <command> ...
+    ==== Commands ====
+    codec:
+        When:   You want to compare the encode time, size, and quality of the output formats and encoder profiles.
+        How-to: widgets bench codec
+    resample:
+        When:   You want to compare the resize time and quality of the resampling filters and reducing gaps.
+        How-to: widgets bench resample
 
 """.strip()
 """Primary info to display."""
@@ -0,0 +1,421 @@
+"""Annotations.
+
+Bounding box annotations of the source images, and a spatial index that finds the clipped labels of any crop box.
+
+Supported annotation formats:
+    "coco": a COCO-style JSON file that has the "images", "annotations", and "categories" lists.
+        The images are matched by their "file_name" without the extension.
+        The "bbox" of an annotation is [x, y, width, height].
+    "csv": a CSV file that has the "image", "left", "upper", "right", and "lower" columns, and an optional "label"
+        column.
+        The images are matched by their "image" value without the extension.
+        A row with an empty "image" value applies to all the images.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import array
+import csv
+import json
+import math
+
+from os import path as ospath
+
+from aidesign_widgets.libs import masks
+
+# Aliases
+
+_array = array.array
+_basename = ospath.basename
+_DictReader = csv.DictReader
+_floor = math.floor
+_jsonload = json.load
+_split_text = ospath.splitext
+
+# -
+
+supported_formats = ["coco", "csv"]
+"""Supported annotation formats."""
+
+format_exts = {
+    "coco": ".json",
+    "csv": ".csv"
+}
+"""Annotation format file extensions."""
+
+image_name_tag = masks.image_name_tag
+"""The tag in an annotation location that gets replaced with the image name."""
+
+_all_images_key = ""
+
+
+def find_annotation_loc(annotation_loc, image_name):
+    """Finds the annotation location of an image.
+
+    Args:
+        annotation_loc: the annotation location, which may have the image_name_tag
+        image_name: the image name, without the extension
+
+    Returns:
+        result: the annotation location
+    """
+    annotation_loc = str(annotation_loc)
+    image_name = str(image_name)
+
+    result = annotation_loc.replace(image_name_tag, image_name)
+    return result
+
+
+def find_format(loc):
+    """Finds the annotation format of an annotation file from its extension.
+
+    Args:
+        loc: the annotation location
+
+    Returns:
+        result: the annotation format
+    """
+    loc = str(loc)
+
+    result = None
+
+    for annotation_format in supported_formats:
+        if loc.lower().endswith(format_exts[annotation_format]):
+            result = annotation_format
+    # end for
+
+    if result is None:
+        raise ValueError(f"Unknown annotation extension: {loc}; Supported: {list(format_exts.values())}")
+
+    return result
+
+
+def _find_image_key(file_name):
+    result = _split_text(_basename(str(file_name)))[0]
+    return result
+
+
+def _add_box(boxes, image_key, box):
+    if image_key in boxes:
+        boxes[image_key].append(box)
+    else:
+        boxes[image_key] = [box]
+    # end if
+
+
+def _load_coco(loc):
+    file = open(loc, "r", encoding="utf-8")
+    data = _jsonload(file)
+    file.close()
+
+    image_keys = {}
+
+    for image in data.get("images", []):
+        image_keys[image["id"]] = _find_image_key(image["file_name"])
+    # end for
+
+    labels = {}
+
+    for category in data.get("categories", []):
+        labels[category["id"]] = str(category.get("name", category["id"]))
+    # end for
+
+    result = {}
+
+    for annotation in data.get("annotations", []):
+        image_key = image_keys.get(annotation["image_id"], _all_images_key)
+        left, upper, width, height = [float(val) for val in annotation["bbox"]]
+        label = labels.get(annotation.get("category_id"), "")
+        _add_box(result, image_key, (left, upper, left + width, upper + height, label))
+    # end for
+
+    return result
+
+
+def _load_csv(loc):
+    file = open(loc, "r", encoding="utf-8", newline="")
+    result = {}
+
+    for row in _DictReader(file):
+        image_key = row.get("image") or _all_images_key
+
+        if image_key != _all_images_key:
+            image_key = _find_image_key(image_key)
+
+        box = (float(row["left"]), float(row["upper"]), float(row["right"]), float(row["lower"]), row.get("label", ""))
+        _add_box(result, image_key, box)
+    # end for
+
+    file.close()
+    return result
+
+
+def load_annotations(loc):
+    """Loads an annotation file of any supported format.
+
+    Args:
+        loc: the annotation location
+
+    Returns:
+        result: the boxes of each image, a dict that maps each image name, without the extension, to a list of
+            (left, upper, right, lower, label) tuples; the "" key holds the boxes that apply to all the images
+    """
+    loc = str(loc)
+
+    annotation_format = find_format(loc)
+
+    if annotation_format == "coco":
+        result = _load_coco(loc)
+    else:  # elif annotation_format == "csv":
+        result = _load_csv(loc)
+    # end if
+
+    return result
+
+
+def find_image_boxes(annotations, image_name):
+    """Finds the boxes of an image.
+
+    Args:
+        annotations: the loaded annotations, from load_annotations
+        image_name: the image name, without the extension
+
+    Returns:
+        result: the boxes, a list of (left, upper, right, lower, label) tuples
+    """
+    annotations: dict = annotations
+    image_name = str(image_name)
+
+    result = list(annotations.get(_all_images_key, []))
+    result.extend(annotations.get(image_name, []))
+    return result
+
+
+def scale_boxes(boxes, scale_x, scale_y):
+    """Scales some boxes, like the boxes of an image to the boxes of its pyramid level.
+
+    Args:
+        boxes: the boxes, a list of (left, upper, right, lower, label) tuples
+        scale_x: the X scale
+        scale_y: the Y scale
+
+    Returns:
+        result: the scaled boxes, a new list
+    """
+    boxes = list(boxes)
+    scale_x = float(scale_x)
+    scale_y = float(scale_y)
+
+    result = []
+
+    for left, upper, right, lower, label in boxes:
+        result.append((left * scale_x, upper * scale_y, right * scale_x, lower * scale_y, label))
+
+    return result
+
+
+def shift_boxes(boxes, offset_x, offset_y):
+    """Shifts some boxes, like the boxes of an image to the boxes of its region.
+
+    Args:
+        boxes: the boxes, a list of (left, upper, right, lower, label) tuples
+        offset_x: the X offset to add
+        offset_y: the Y offset to add
+
+    Returns:
+        result: the shifted boxes, a new list
+    """
+    boxes = list(boxes)
+    offset_x = float(offset_x)
+    offset_y = float(offset_y)
+
+    result = []
+
+    for left, upper, right, lower, label in boxes:
+        result.append((left + offset_x, upper + offset_y, right + offset_x, lower + offset_y, label))
+
+    return result
+
+
+class BoxIndex:
+    """Spatial index of bounding boxes.
+
+    Buckets the boxes by the uniform grid cells they touch, so that a crop box query only visits the boxes in the
+        cells it touches, instead of all the boxes.
+    """
+
+    def __init__(self, boxes, cell_size):
+        """Inits self with the given args.
+
+        Args:
+            boxes: the boxes, a list of (left, upper, right, lower, label) tuples
+            cell_size: the grid cell size, usually the crop resolution
+        """
+        boxes = list(boxes)
+        cell_size = max(int(cell_size), 1)
+
+        self.cell_size = cell_size
+        """Grid cell size."""
+        self.hidden_count = 0
+        """Count of the labels dropped for their low visibility."""
+
+        self._lefts = _array("d")
+        self._uppers = _array("d")
+        self._rights = _array("d")
+        self._lowers = _array("d")
+        self._labels = []
+        self._cells: dict[tuple[int, int], list[int]] = {}
+
+        for box in boxes:
+            left, upper, right, lower, label = box
+
+            if right <= left or lower <= upper:
+                continue
+
+            box_idx = len(self._labels)
+            self._lefts.append(left)
+            self._uppers.append(upper)
+            self._rights.append(right)
+            self._lowers.append(lower)
+            self._labels.append(str(label))
+
+            for cell_y in self._find_cell_range(upper, lower):
+                for cell_x in self._find_cell_range(left, right):
+                    key = (cell_x, cell_y)
+
+                    if key in self._cells:
+                        self._cells[key].append(box_idx)
+                    else:
+                        self._cells[key] = [box_idx]
+                    # end if
+                # end for
+            # end for
+        # end for
+
+    def __len__(self):
+        """Finds the box count.
+
+        Returns:
+            result: the box count
+        """
+        result = len(self._labels)
+        return result
+
+    def _find_cell_range(self, start, end):
+        result = range(_floor(start / self.cell_size), _floor(end / self.cell_size) + 1)
+        return result
+
+    def find_labels(self, box, min_visibility=0.0):
+        """Finds the labels of a crop box.
+
+        Args:
+            box: the crop box, (left, upper, right, lower)
+            min_visibility: the min fraction of a labeled box area that lies in the crop box
+
+        Returns:
+            result: the labels, a list of dicts that have the "label", "left", "upper", "right", "lower", and
+                "visibility" keys; the label boxes are clipped to the crop box, and relative to its top left corner
+        """
+        crop_left, crop_upper, crop_right, crop_lower = box
+        min_visibility = float(min_visibility)
+
+        box_idxs = set()
+
+        for cell_y in self._find_cell_range(crop_upper, crop_lower - 1):
+            for cell_x in self._find_cell_range(crop_left, crop_right - 1):
+                box_idxs.update(self._cells.get((cell_x, cell_y), []))
+            # end for
+        # end for
+
+        result = []
+
+        for box_idx in sorted(box_idxs):
+            left = self._lefts[box_idx]
+            upper = self._uppers[box_idx]
+            right = self._rights[box_idx]
+            lower = self._lowers[box_idx]
+
+            inter_left = max(left, crop_left)
+            inter_upper = max(upper, crop_upper)
+            inter_right = min(right, crop_right)
+            inter_lower = min(lower, crop_lower)
+
+            if inter_right <= inter_left or inter_lower <= inter_upper:
+                continue
+
+            inter_area = (inter_right - inter_left) * (inter_lower - inter_upper)
+            visibility = inter_area / ((right - left) * (lower - upper))
+
+            if visibility < min_visibility:
+                self.hidden_count += 1
+                continue
+            # end if
+
+            label = {
+                "label": self._labels[box_idx],
+                "left": inter_left - crop_left,
+                "upper": inter_upper - crop_upper,
+                "right": inter_right - crop_left,
+                "lower": inter_lower - crop_upper,
+                "visibility": round(visibility, 4)
+            }
+
+            result.append(label)
+        # end for
+
+        return result
+
+
+def transform_labels(labels, crop_res, resize_res=None, flip="", rot=""):
+    """Transforms the labels of a crop box the same way as crops.make_crop transforms the crop.
+
+    Args:
+        labels: the labels, from BoxIndex.find_labels
+        crop_res: the crop resolution
+        resize_res: the resize resolution, or None to keep the crop resolution
+        flip: the flip, one of crops.supported_flips
+        rot: the rotation, one of crops.supported_rots
+
+    Returns:
+        result: the transformed labels, a new list
+    """
+    labels = list(labels)
+    crop_res = int(crop_res)
+    flip = str(flip)
+    rot = str(rot)
+
+    if resize_res is None:
+        size = crop_res
+    else:
+        size = int(resize_res)
+    # end if
+
+    scale = size / crop_res
+    flip_x = ("x" in flip) != (rot == "180")
+    flip_y = ("y" in flip) != (rot == "180")
+    result = []
+
+    for label in labels:
+        left = label["left"] * scale
+        upper = label["upper"] * scale
+        right = label["right"] * scale
+        lower = label["lower"] * scale
+
+        if flip_x:
+            upper, lower = size - lower, size - upper
+
+        if flip_y:
+            left, right = size - right, size - left
+
+        new_label = dict(label)
+        new_label["left"] = round(left, 2)
+        new_label["upper"] = round(upper, 2)
+        new_label["right"] = round(right, 2)
+        new_label["lower"] = round(lower, 2)
+        result.append(new_label)
+    # end for
+
+    return result
@@ -0,0 +1,298 @@
+"""Codecs.
+
+Output image formats and encoder profiles.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import io
+import math
+
+from PIL import features as pil_features
+from PIL import Image as pil_image
+from PIL import ImageChops as pil_image_chops
+from PIL import ImageStat as pil_image_stat
+
+# Aliases
+
+_BytesIO = io.BytesIO
+_check_feature = pil_features.check
+_difference = pil_image_chops.difference
+_log10 = math.log10
+_pil_image = pil_image
+_Stat = pil_image_stat.Stat
+
+# -
+
+supported_formats = ["jpeg", "png", "webp", "ppm"]
+"""Supported output formats."""
+supported_profiles = ["fast", "balanced", "archival"]
+"""Supported encoder profiles."""
+
+format_exts = {
+    "jpeg": ".jpg",
+    "png": ".png",
+    "webp": ".webp",
+    "ppm": ".ppm"
+}
+"""Output format file extensions."""
+
+_format_modes = {
+    "jpeg": ["L", "RGB", "CMYK"],
+    "png": ["1", "L", "LA", "P", "RGB", "RGBA"],
+    "webp": ["RGB", "RGBA"],
+    "ppm": ["1", "L", "RGB"]
+}
+
+_jpeg_profiles = {
+    # subsampling 2 is 4:2:0; subsampling 0 is 4:4:4
+    "fast": {"optimize": False, "progressive": False, "subsampling": 2},
+    "balanced": {"optimize": True, "progressive": False, "subsampling": 2},
+    "archival": {"optimize": True, "progressive": True, "subsampling": 0}
+}
+
+_png_profiles = {
+    "fast": {"optimize": False, "compress_level": 1},
+    "balanced": {"optimize": False, "compress_level": 6},
+    "archival": {"optimize": True, "compress_level": 9}
+}
+
+_webp_profiles = {
+    "fast": {"method": 0},
+    "balanced": {"method": 4},
+    "archival": {"method": 6}
+}
+
+
+def check_format(out_format):
+    """Checks if the output format is usable with the installed PIL.
+
+    Args:
+        out_format: the output format
+
+    Returns:
+        result: whether the output format is usable
+    """
+    out_format = str(out_format)
+
+    if out_format not in supported_formats:
+        result = False
+    elif out_format == "webp":
+        result = bool(_check_feature("webp"))
+    else:
+        result = True
+    # end if
+
+    return result
+
+
+def find_ext(out_format):
+    """Finds the file extension of an output format.
+
+    Args:
+        out_format: the output format
+
+    Returns:
+        result: the file extension, with the leading dot
+    """
+    out_format = str(out_format)
+
+    result = format_exts[out_format]
+    return result
+
+
+def find_save_kwargs(out_format, profile, quality=95, compress_level=None):
+    """Finds the PIL save keyword arguments of an output format and an encoder profile.
+
+    Args:
+        out_format: the output format
+        profile: the encoder profile
+        quality: the JPEG or WebP quality
+        compress_level: the PNG compress level, or None to use the profile default
+
+    Returns:
+        result: the keyword arguments
+    """
+    out_format = str(out_format)
+    profile = str(profile)
+    quality = int(quality)
+
+    if compress_level is not None:
+        compress_level = int(compress_level)
+
+    if out_format not in supported_formats:
+        raise ValueError(f"Unsupported output format: {out_format}; Supported: {supported_formats}")
+
+    if profile not in supported_profiles:
+        raise ValueError(f"Unsupported encoder profile: {profile}; Supported: {supported_profiles}")
+
+    if out_format == "jpeg":
+        result = dict(_jpeg_profiles[profile])
+        result["quality"] = quality
+    elif out_format == "png":
+        result = dict(_png_profiles[profile])
+
+        if compress_level is not None:
+            result["compress_level"] = compress_level
+    elif out_format == "webp":
+        result = dict(_webp_profiles[profile])
+        result["quality"] = quality
+    else:  # elif out_format == "ppm":
+        result = {}
+    # end if
+
+    return result
+
+
+def fit_mode(image, out_format):
+    """Converts an image to a mode that the output format can encode, if necessary.
+
+    Args:
+        image: the image
+        out_format: the output format
+
+    Returns:
+        result: the converted image, or the image itself if no conversion is needed
+    """
+    image: _pil_image.Image = image
+    out_format = str(out_format)
+
+    modes = _format_modes[out_format]
+
+    if image.mode in modes:
+        result = image
+    elif "A" in image.mode and "RGBA" in modes:
+        result = image.convert("RGBA")
+    else:
+        result = image.convert("RGB")
+    # end if
+
+    return result
+
+
+def encode(image, out_format, save_kwargs):
+    """Encodes an image to bytes.
+
+    Args:
+        image: the image
+        out_format: the output format
+        save_kwargs: the PIL save keyword arguments
+
+    Returns:
+        result: the encoded bytes
+    """
+    image: _pil_image.Image = image
+    out_format = str(out_format)
+    save_kwargs = dict(save_kwargs)
+
+    image = fit_mode(image, out_format)
+    buffer = _BytesIO()
+    image.save(buffer, format=out_format, **save_kwargs)
+
+    result = buffer.getvalue()
+    return result
+
+
+def save(image, loc, out_format, save_kwargs):
+    """Encodes an image and saves it to a file.
+
+    Args:
+        image: the image
+        loc: the file location
+        out_format: the output format
+        save_kwargs: the PIL save keyword arguments
+
+    Returns:
+        result: the saved byte count
+    """
+    loc = str(loc)
+
+    data = encode(image, out_format, save_kwargs)
+
+    file = open(loc, "wb")
+    file.write(data)
+    file.close()
+
+    result = len(data)
+    return result
+
+
+def decode(data):
+    """Decodes an image from bytes.
+
+    Args:
+        data: the encoded bytes
+
+    Returns:
+        result: the decoded image, fully loaded
+    """
+    data = bytes(data)
+
+    result = _pil_image.open(_BytesIO(data))
+    result.load()
+    return result
+
+
+def find_mse(image1, image2):
+    """Finds the mean squared error (MSE) between 2 8-bit images of the same size.
+
+    Args:
+        image1: image 1
+        image2: image 2
+
+    Returns:
+        result: the MSE, averaged over the RGB channels
+    """
+    image1: _pil_image.Image = image1
+    image2: _pil_image.Image = image2
+
+    if image1.mode != "RGB":
+        image1 = image1.convert("RGB")
+
+    if image2.mode != "RGB":
+        image2 = image2.convert("RGB")
+
+    diff = _difference(image1, image2)
+    rmss = _Stat(diff).rms
+
+    result = sum(rms ** 2 for rms in rmss) / len(rmss)
+    return result
+
+
+def mse_to_psnr(mse):
+    """Converts a mean squared error (MSE) of 8-bit images to a peak signal-to-noise ratio (PSNR).
+
+    Args:
+        mse: the MSE
+
+    Returns:
+        result: the PSNR in decibels, or math.inf if the MSE is 0
+    """
+    mse = float(mse)
+
+    if mse <= 0:
+        result = math.inf
+    else:
+        result = 10 * _log10(255 ** 2 / mse)
+    # end if
+
+    return result
+
+
+def find_psnr(image1, image2):
+    """Finds the peak signal-to-noise ratio (PSNR) between 2 8-bit images of the same size.
+
+    Args:
+        image1: image 1
+        image2: image 2
+
+    Returns:
+        result: the PSNR in decibels, or math.inf if the images are identical
+    """
+    mse = find_mse(image1, image2)
+
+    result = mse_to_psnr(mse)
+    return result
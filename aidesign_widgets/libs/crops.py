@@ -0,0 +1,848 @@
+"""Crops.
+
+In-memory crop generators.
+The generators lazily yield the crops and their metadata, without encoding or disk I/O.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import math
+import os
+import random
+import sys
+
+from PIL import Image as pil_image
+
+from aidesign_widgets.libs import annotations
+from aidesign_widgets.libs import plans
+from aidesign_widgets.libs import samplers
+
+# Aliases
+
+_ceil = math.ceil
+_find_flip_rot = plans.find_flip_rot
+_find_scale_range = plans.find_scale_range
+_find_stride = plans.find_stride
+_floor = math.floor
+_fromarray = pil_image.fromarray
+_getmodebands = pil_image.getmodebands
+_ImportanceSampler = samplers.ImportanceSampler
+_log2 = math.log2
+_maxsize = sys.maxsize
+_PathLike = os.PathLike
+_pil_image = pil_image
+_plan_grid_crops = plans.plan_grid_crops
+_plan_rand_crops = plans.plan_rand_crops
+_Random = random.Random
+_transform_labels = annotations.transform_labels
+
+# -
+
+supported_flips = plans.supported_flips
+"""Supported flips."""
+supported_rots = plans.supported_rots
+"""Supported rotations."""
+supported_resamples = ["nearest", "box", "bilinear", "bicubic", "lanczos"]
+"""Supported resize resampling filters.
+
+"nearest" keeps the exact source values, which suits the label maps.
+"box" averages the source pixels in each target pixel; an exact integer downscale takes the PIL reduce fast path.
+"""
+
+_resample_filters = {
+    "nearest": _pil_image.NEAREST,
+    "box": _pil_image.BOX,
+    "bilinear": _pil_image.BILINEAR,
+    "bicubic": _pil_image.BICUBIC,
+    "lanczos": _pil_image.LANCZOS
+}
+
+_array_modes = ["L", "LA", "RGB", "RGBA", "CMYK", "YCbCr", "LAB", "HSV"]
+_band_count_modes = {1: "L", 2: "LA", 3: "RGB", 4: "RGBA"}
+_raw_pixel_bytes = {"L": 1, "RGB": 3, "BGR": 3, "RGBA": 4, "BGRA": 4, "RGBX": 4, "BGRX": 4, "CMYK": 4}
+
+
+def open_image(source):
+    """Opens an image source.
+
+    Args:
+        source: a PIL image, an array that has the "__array_interface__" attribute, or an image location
+
+    Returns:
+        result: the PIL image
+    """
+    if isinstance(source, _pil_image.Image):
+        result = source
+    elif isinstance(source, (str, _PathLike)):
+        result = _pil_image.open(source)
+    elif hasattr(source, "__array_interface__"):
+        result = _fromarray(source)
+    else:
+        raise TypeError(f"Unsupported image source type: {type(source)}")
+    # end if
+
+    return result
+
+
+def to_array(crop):
+    """Converts a crop to a buffer-protocol array.
+
+    The array is a memoryview of unsigned bytes that has the shape (height, width, band_count).
+    Libraries like NumPy can wrap it without copying, for example with numpy.asarray(array).
+
+    Args:
+        crop: the crop, a PIL image
+
+    Returns:
+        result: the array
+    """
+    crop: _pil_image.Image = crop
+
+    if crop.mode not in _array_modes:
+        crop = crop.convert("RGB")
+
+    width, height = crop.size
+    band_count = len(crop.getbands())
+    data = crop.tobytes()
+
+    result = memoryview(data).cast("B", (height, width, band_count))
+    return result
+
+
+def from_array(array, mode=None):
+    """Converts a buffer-protocol array back to a crop.
+
+    Args:
+        array: the array, an object that supports the buffer protocol and has unsigned bytes in the shape
+            (height, width, band_count) or (height, width), for example the result of to_array or a NumPy array
+        mode: an optional crop mode; None means to choose the mode by the band count
+
+    Returns:
+        result: the crop, a PIL image
+    """
+    array = memoryview(array)
+
+    if array.itemsize != 1:
+        raise ValueError(f"Unsupported array item size: {array.itemsize}; Expects: 1")
+
+    if array.ndim == 2:
+        height, width = array.shape
+        band_count = 1
+    elif array.ndim == 3:
+        height, width, band_count = array.shape
+    else:
+        raise ValueError(f"Unsupported array dimension count: {array.ndim}; Expects: 2 or 3")
+    # end if
+
+    if mode is None or _getmodebands(mode) != band_count:
+        if band_count not in _band_count_modes:
+            raise ValueError(f"Unsupported array band count: {band_count}; Supported: {list(_band_count_modes)}")
+
+        mode = _band_count_modes[band_count]
+    # end if
+
+    result = _pil_image.frombytes(mode, (width, height), array.tobytes())
+    return result
+
+
+def rot_to_deg(rot):
+    """Converts a rotation to degrees.
+
+    Args:
+        rot: the rotation, one of supported_rots
+
+    Returns:
+        result: the degrees
+    """
+    rot = str(rot)
+
+    if rot == "":
+        result = 0
+    else:
+        result = int(rot)
+    # end if
+
+    return result
+
+
+def deg_to_rot(deg):
+    """Converts degrees to a rotation.
+
+    Args:
+        deg: the degrees
+
+    Returns:
+        result: the rotation, one of supported_rots
+    """
+    deg = int(deg)
+
+    if deg == 0:
+        result = ""
+    else:
+        result = str(deg)
+    # end if
+
+    return result
+
+
+def find_reducing_gap(reducing_gap):
+    """Finds a reducing gap.
+
+    Args:
+        reducing_gap: the reducing gap, or None
+
+    Returns:
+        result: the reducing gap, a float no less than 1; or None
+    """
+    if reducing_gap is None:
+        result = None
+    else:
+        result = max(float(reducing_gap), float(1))
+    # end if
+
+    return result
+
+
+def resize_image(image, size, resample="bicubic", reducing_gap=None):
+    """Resizes an image, with the integer factor fast paths.
+
+    An exact integer downscale with the "box" resample takes the PIL reduce box filter alone.
+    Otherwise, with a reducing gap, PIL reduces the image by an integer factor first, and then resizes it the rest of
+        the way with the resample, so that the resample works on at most about reducing_gap times the target size.
+    The "nearest" resample always resizes in 1 step, which keeps the exact source values.
+
+    Args:
+        image: the PIL image
+        size: the target size, (width, height)
+        resample: the resampling filter, one of supported_resamples
+        reducing_gap: the reducing gap, a number no less than 1; or None to resize in 1 step at full precision
+
+    Returns:
+        result: the resized image
+    """
+    image: _pil_image.Image = image
+    width, height = [int(side) for side in size]
+    resample = str(resample)
+    reducing_gap = find_reducing_gap(reducing_gap)
+
+    if resample not in supported_resamples:
+        raise ValueError(f"Unsupported resample: {resample}; Supported: {supported_resamples}")
+
+    factor = image.width // width
+
+    exact_reduce = (
+        resample == "box" and factor > 1 and image.width == width * factor and image.height == height * factor
+    )
+
+    if exact_reduce:
+        result = image.reduce(factor)
+    elif resample == "nearest":
+        result = image.resize(size=(width, height), resample=_resample_filters[resample])
+    else:
+        result = image.resize(size=(width, height), resample=_resample_filters[resample], reducing_gap=reducing_gap)
+    # end if
+
+    return result
+
+
+def find_fit_size(size, short_side=None, box=None, upscale=False):
+    """Finds the size that an image resizes to, keeping its aspect ratio.
+
+    Args:
+        size: the image size, (width, height)
+        short_side: the target short side, or None
+        box: the target box, (width, height), in which either side can be None to leave it unbounded; or None
+        upscale: whether to enlarge the images that are smaller than the target
+
+    Returns:
+        result: the fit size, (width, height); the box takes priority over the short side
+    """
+    width, height = [int(side) for side in size]
+    upscale = bool(upscale)
+
+    if box is not None:
+        box_width, box_height = box
+        scales = []
+
+        if box_width is not None:
+            scales.append(int(box_width) / width)
+
+        if box_height is not None:
+            scales.append(int(box_height) / height)
+
+        if len(scales) <= 0:
+            raise ValueError("The box width and the box height cannot both be None")
+
+        scale = min(scales)
+    elif short_side is not None:
+        scale = int(short_side) / min(width, height)
+    else:
+        raise ValueError("The short side and the box cannot both be None")
+    # end if
+
+    if not upscale:
+        scale = min(scale, 1)
+
+    result = (max(round(width * scale), 1), max(round(height * scale), 1))
+    return result
+
+
+def draft_image(image, size):
+    """Lets a JPEG image decode at a reduced DCT scale, before it loads.
+
+    PIL picks the smallest 1/1, 1/2, 1/4, or 1/8 scale that still covers the size, so the decode skips most of the
+        work of a large downscale, and the resize after it stays exact.
+    Other formats ignore the draft.
+
+    Args:
+        image: the PIL image, not loaded yet
+        size: the target size, (width, height)
+
+    Returns:
+        result: the image itself
+    """
+    image: _pil_image.Image = image
+    width, height = [int(side) for side in size]
+
+    if image.format == "JPEG":
+        image.draft(image.mode, (width, height))
+
+    result = image
+    return result
+
+
+def _find_raw_layout(image):
+    """Returns offset, stride, pixel_bytes, rawmode, orientation; or None if the image data is not 1 raw tile."""
+    tile = getattr(image, "tile", None)
+
+    if tile is None or len(tile) != 1 or getattr(image, "fp", None) is None:
+        return None
+
+    codec_name, extents, offset, args = tile[0]
+
+    if codec_name != "raw" or tuple(extents) != (0, 0) + image.size:
+        return None
+
+    if isinstance(args, tuple):
+        rawmode = args[0]
+        stride = args[1] if len(args) > 1 else 0
+        orientation = args[2] if len(args) > 2 else 1
+    else:
+        rawmode = args
+        stride = 0
+        orientation = 1
+    # end if
+
+    if rawmode not in _raw_pixel_bytes or orientation not in (1, -1):
+        return None
+
+    pixel_bytes = _raw_pixel_bytes[rawmode]
+
+    if stride == 0:
+        stride = image.width * pixel_bytes
+
+    return offset, stride, pixel_bytes, rawmode, orientation
+
+
+def read_region(image, box):
+    """Reads a region of an image.
+
+    If the image is not loaded yet, and its data is 1 uncompressed raw tile, like in the PPM, the BMP, and the
+        uncompressed TIFF files, only the bytes of the region get read and decoded.
+    Otherwise, the image gets loaded once, and the region is cropped from it.
+
+    Args:
+        image: the PIL image
+        box: the region box, (left, upper, right, lower), inside the image
+
+    Returns:
+        result: the region, a new PIL image
+    """
+    image: _pil_image.Image = image
+    left, upper, right, lower = [int(val) for val in box]
+
+    layout = _find_raw_layout(image)
+
+    if layout is None:
+        result = image.crop((left, upper, right, lower))
+        return result
+
+    offset, stride, pixel_bytes, rawmode, orientation = layout
+    row_bytes = (right - left) * pixel_bytes
+
+    if orientation == 1:
+        file_rows = range(upper, lower)
+    else:  # elif orientation == -1:
+        # The bottom-up rows get read bottom-up, and the decoder flips them back
+        file_rows = range(image.height - lower, image.height - upper)
+    # end if
+
+    chunks = []
+
+    for file_row in file_rows:
+        image.fp.seek(offset + file_row * stride + left * pixel_bytes)
+        chunks.append(image.fp.read(row_bytes))
+    # end for
+
+    result = _pil_image.frombytes(
+        image.mode, (right - left, lower - upper), b"".join(chunks), "raw", rawmode, row_bytes, orientation
+    )
+
+    return result
+
+
+def make_crop(image, box, resize_res=None, flip="", rot="", resample="bicubic", reducing_gap=None):
+    """Crops, resizes, flips, and rotates an image.
+
+    Args:
+        image: the PIL image
+        box: the crop box, (left, upper, right, lower)
+        resize_res: the resize resolution, or None to keep the crop resolution
+        flip: the flip, one of supported_flips
+        rot: the rotation, one of supported_rots
+        resample: the resize resampling filter, one of supported_resamples
+        reducing_gap: the resize reducing gap, or None; see resize_image
+
+    Returns:
+        result: the crop
+    """
+    image: _pil_image.Image = image
+    box = tuple(box)
+    flip = str(flip)
+    rot = str(rot)
+    resample = str(resample)
+
+    crop = image.crop(box)
+
+    if resize_res is not None:
+        crop = resize_image(crop, (resize_res, resize_res), resample, reducing_gap)
+
+    if "x" in flip:
+        crop = crop.transpose(_pil_image.FLIP_TOP_BOTTOM)
+
+    if "y" in flip:
+        crop = crop.transpose(_pil_image.FLIP_LEFT_RIGHT)
+
+    if rot == "180":
+        crop = crop.transpose(_pil_image.ROTATE_180)
+
+    result = crop
+    return result
+
+
+def cascade_crop(crop, resize_ress, resample="bicubic", reducing_gap=None):
+    """Downsamples a crop to some resize resolutions in a cascade.
+
+    Goes from the largest resolution to the smallest, and makes each level from the previous one instead of from the
+        crop, so that each level costs only a fraction of the one before it.
+    An exact integer step uses the PIL reduce box filter, except for the "nearest" resample, which keeps the exact
+        source values.
+
+    Args:
+        crop: the crop, a PIL image, usually at the largest resize resolution
+        resize_ress: the resize resolutions, a list; None keeps the crop size
+        resample: the resampling filter of the non-integer steps, one of supported_resamples
+        reducing_gap: the reducing gap of the non-integer steps, or None; see resize_image
+
+    Returns:
+        result: the crops, a list aligned with resize_ress
+    """
+    crop: _pil_image.Image = crop
+    resize_ress = list(resize_ress)
+    resample = str(resample)
+
+    levels = {}
+    prev = crop
+
+    for resize_res in sorted(set(res for res in resize_ress if res is not None), reverse=True):
+        prev_res = prev.width
+
+        if resize_res == prev_res:
+            level = prev
+        elif resample != "nearest" and resize_res < prev_res and prev_res % resize_res == 0:
+            level = prev.reduce(prev_res // resize_res)
+        else:
+            level = resize_image(prev, (resize_res, resize_res), resample, reducing_gap)
+        # end if
+
+        levels[resize_res] = level
+        prev = level
+    # end for
+
+    levels[None] = crop
+    result = [levels[resize_res] for resize_res in resize_ress]
+    return result
+
+
+def find_level_size(size, scale):
+    """Finds the size of a pyramid level.
+
+    An exact integer reduction, like a scale of 0.25, rounds the sides up, like the PIL reduce does; any other scale
+        rounds the sides to the nearest.
+
+    Args:
+        size: the source size, (width, height)
+        scale: the level scale, in (0, 1]
+
+    Returns:
+        result: the level size, (width, height); each side is at least 1
+    """
+    width, height = size
+    scale = float(scale)
+
+    factor = round(1 / scale)
+
+    if factor > 1 and abs(1 / scale - factor) < 1e-6:
+        result = (_ceil(width / factor), _ceil(height / factor))
+    else:
+        result = (max(round(width * scale), 1), max(round(height * scale), 1))
+    # end if
+
+    return result
+
+
+def iter_pyramid(image, scales, resample="bicubic"):
+    """Iterates through the levels of an image pyramid.
+
+    Goes from the largest scale to the smallest, and makes each level from the previous one instead of from the
+        image, so that each level costs only a fraction of the one before it.
+    An exact integer step, like a 2 times reduction, uses the PIL reduce box filter, except for the "nearest" resample,
+        which keeps the exact source values.
+    Any other step resizes the previous level in a single pass.
+    Each level has the find_level_size size of its scale.
+    Only the latest level is kept, so a level is released once the caller moves on to the next one.
+
+    Args:
+        image: the PIL image
+        scales: the level scales, a list of numbers in (0, 1]; 1 yields the image itself
+        resample: the resampling filter, one of supported_resamples
+
+    Yields:
+        scale: the level scale
+        level: the level image
+    """
+    image: _pil_image.Image = image
+    scales = sorted(set(float(scale) for scale in scales), reverse=True)
+    resample = str(resample)
+
+    prev_scale = float(1)
+    prev = image
+
+    for scale in scales:
+        step = prev_scale / scale
+        factor = round(step)
+        size = find_level_size(image.size, scale)
+
+        # A reduce after a non-integer step can land 1 pixel off the level size, so it falls back to a resize then
+        exact_reduce = (
+            factor > 1 and abs(step - factor) < 1e-6
+            and size == (_ceil(prev.width / factor), _ceil(prev.height / factor))
+        )
+
+        if scale == prev_scale:
+            level = prev
+        elif exact_reduce and resample != "nearest":
+            level = prev.reduce(factor)
+        else:
+            level = prev.resize(size=size, resample=_resample_filters[resample])
+        # end if
+
+        prev = level
+        prev_scale = scale
+        yield scale, level
+    # end for
+
+
+def _find_level_idx(size, resize_res, level_count):
+    # The smallest power of 2 level that still has at least resize_res pixels across the window
+    result = min(max(_floor(_log2(size / resize_res)), 0), level_count - 1)
+    return result
+
+
+def _find_level_box(level, level_idx, box):
+    left, upper, right, _ = box
+    factor = 2 ** level_idx
+    size = max(round((right - left) / factor), 1)
+    level_left = min(left // factor, level.width - size)
+    level_upper = min(upper // factor, level.height - size)
+
+    result = (level_left, level_upper, level_left + size, level_upper + size)
+    return result
+
+
+def _find_meta(idx, pos_x, pos_y, crop_res, resize_res, flip, rot):
+    meta = {
+        "index": int(idx),
+        "x": int(pos_x),
+        "y": int(pos_y),
+        "width": int(crop_res),
+        "height": int(crop_res),
+        "resize": resize_res,
+        "flip": str(flip),
+        "rotation": rot_to_deg(rot)
+    }
+
+    return meta
+
+
+def iter_grid_crops(
+    source, crop_res, resize_res=None, start_pos_x=0, start_pos_y=0, max_crop_count_x=None, max_crop_count_y=None,
+    flips=None, rots=None, as_array=False, detail_filter=None, mask=None, box_index=None, min_visibility=0.0,
+    stride_x=None, stride_y=None, resample="bicubic", reducing_gap=None
+):
+    """Iterates through the grid crops of an image.
+
+    The crop positions have a grid-like alignment.
+    Each position yields one crop for each flip and rotation combination.
+    With the strides less than the crop resolution, the crops overlap; all of them are cut from the same decoded image.
+
+    Args:
+        source: a PIL image, an array that has the "__array_interface__" attribute, or an image location
+        crop_res: the crop resolution
+        resize_res: the resize resolution, or None to keep the crop resolution
+        start_pos_x: the X-axis start position
+        start_pos_y: the Y-axis start position
+        max_crop_count_x: the X-axis max crop count, or None for no limit
+        max_crop_count_y: the Y-axis max crop count, or None for no limit
+        flips: the flips, a list of supported_flips items, or None for [""]
+        rots: the rotations, a list of supported_rots items, or None for [""]
+        as_array: whether to yield the crops as buffer-protocol arrays instead of PIL images
+        detail_filter: the filters.DetailFilter to skip the rejected boxes with, or None to keep all the boxes;
+            each box is checked once for all its variants
+        mask: the masks.MaskIndex to skip the boxes outside the mask with, or None to keep all the boxes;
+            each box is checked once for all its variants
+        box_index: the annotations.BoxIndex to find the labels of each crop with, or None for no labels
+        min_visibility: the min fraction of a labeled box area that lies in the crop box
+        stride_x: the X-axis stride, or None for the crop resolution
+        stride_y: the Y-axis stride, or None for the crop resolution
+        resample: the resize resampling filter, one of supported_resamples
+        reducing_gap: the resize reducing gap, or None; see resize_image
+
+    Yields:
+        crop: the crop, a PIL image or an array
+        meta: the crop metadata, a dict that has the "index", "x", "y", "width", "height", "resize", "flip",
+            "rotation", "stride_x", and "stride_y" keys; also the "labels" key if box_index is not None
+    """
+    image = open_image(source)
+    crop_res = int(crop_res)
+
+    if resize_res is not None:
+        resize_res = int(resize_res)
+
+    as_array = bool(as_array)
+    stride_x = _find_stride(stride_x, crop_res)
+    stride_y = _find_stride(stride_y, crop_res)
+    last_box = None
+    last_passed = True
+    last_labels = []
+
+    width, height = image.size
+
+    plan = _plan_grid_crops(
+        width, height, crop_res, start_pos_x, start_pos_y, max_crop_count_x, max_crop_count_y, flips, rots,
+        stride_x=stride_x, stride_y=stride_y
+    )
+
+    # Decode once up front, so that the overlapping crops all read from the same pixel buffer
+    image.load()
+
+    for plan_idx in range(len(plan)):
+        pos_x = plan.xs[plan_idx]
+        pos_y = plan.ys[plan_idx]
+        flip, rot = _find_flip_rot(plan.variants[plan_idx])
+
+        box = (pos_x, pos_y, pos_x + crop_res, pos_y + crop_res)
+
+        if box != last_box:
+            last_box = box
+            last_passed = mask is None or mask.check(box)
+
+            if last_passed and detail_filter is not None:
+                last_passed = detail_filter.check(box)
+
+            if last_passed and box_index is not None:
+                last_labels = box_index.find_labels(box, min_visibility)
+        # end if
+
+        if not last_passed:
+            continue
+
+        crop = make_crop(image, box, resize_res, flip, rot, resample, reducing_gap)
+
+        if as_array:
+            crop = to_array(crop)
+
+        meta = _find_meta(plan.idxs[plan_idx], pos_x, pos_y, crop_res, resize_res, flip, rot)
+        meta["stride_x"] = stride_x
+        meta["stride_y"] = stride_y
+
+        if box_index is not None:
+            meta["labels"] = _transform_labels(last_labels, crop_res, resize_res, flip, rot)
+
+        yield crop, meta
+    # end for
+
+
+def iter_rand_crops(
+    source, crop_res, resize_res=None, crop_count=1, seed=None, flips=None, rots=None, as_array=False, rand=None,
+    row_major=True, unique=False, min_distance=0, max_overlap=None, importance_mode=None, importance_map_res=256,
+    detail_filter=None, mask=None, box_index=None, min_visibility=0.0, scale_range=None, resample="bicubic",
+    reducing_gap=None
+):
+    """Iterates through the random crops of an image.
+
+    The crop positions, flips, and rotations are randomly picked, all up front.
+    By default, the crops come in the row-major order of their boxes, for the cache locality of the source reads.
+    The "index" metadata is always the draw index.
+    With a scale range, the image pyramid of 2 times reductions is built once, and each crop comes from the level
+        nearest its window scale, so that each crop costs about the same, no matter how large its window is.
+
+    Args:
+        source: a PIL image, an array that has the "__array_interface__" attribute, or an image location
+        crop_res: the crop resolution
+        resize_res: the resize resolution, or None to keep the crop resolution
+        crop_count: the crop count
+        seed: the random seed, or None for an automatic seed; ignored if rand is not None
+        flips: the flips to pick from, a list of supported_flips items, or None for [""]
+        rots: the rotations to pick from, a list of supported_rots items, or None for [""]
+        as_array: whether to yield the crops as buffer-protocol arrays instead of PIL images
+        rand: the random.Random instance to use, or None to create one with the seed
+        row_major: whether to yield the crops in the row-major order of their boxes instead of the draw order
+        unique: whether to draw without replacement from the distinct (X position, Y position, flip, rotation)
+            combinations; if so, the crop count is clamped to plans.find_rand_space_size
+        min_distance: the min Euclidean distance between 2 crop positions
+        max_overlap: the max intersection area of 2 crops, as a fraction of the crop area; or None for no limit
+            With either constraint, fewer crops than the crop count come out when the constraints saturate.
+        importance_mode: the importance sampling mode, one of samplers.supported_importance_modes, or None to draw
+            the positions uniformly; ignored if unique takes effect
+        importance_map_res: the max width and height of the importance detail map
+        detail_filter: the filters.DetailFilter to skip the rejected boxes with, or None to keep all the boxes
+        mask: the masks.MaskIndex to draw the positions from, or None to draw from all the positions;
+            if not None, unique and importance_mode are ignored; 0 crops come out if the mask has no valid positions
+        box_index: the annotations.BoxIndex to find the labels of each crop with, or None for no labels
+        min_visibility: the min fraction of a labeled box area that lies in the crop box
+        scale_range: the (min scale, max scale) range of the window sizes, as multiples of the crop resolution; or
+            None to keep the crop resolution; see plans.plan_rand_crops
+            If not None, a None resize_res becomes the crop resolution, so that all the crops have the same size.
+        resample: the resize resampling filter, one of supported_resamples
+        reducing_gap: the resize reducing gap, or None; see resize_image
+
+    Yields:
+        crop: the crop, a PIL image or an array
+        meta: the crop metadata, a dict that has the "index", "x", "y", "width", "height", "resize", "flip", and
+            "rotation" keys; also the "labels" key if box_index is not None; "width" and "height" are the window size
+    """
+    image = open_image(source)
+    crop_res = int(crop_res)
+    scale_range = _find_scale_range(scale_range)
+
+    if scale_range is not None and resize_res is None:
+        resize_res = crop_res
+
+    if resize_res is not None:
+        resize_res = int(resize_res)
+
+    as_array = bool(as_array)
+
+    if rand is None:
+        rand = _Random(seed)
+
+    if importance_mode is None or mask is not None:
+        importance = None
+    else:
+        importance = _ImportanceSampler(image, crop_res, importance_mode, importance_map_res)
+    # end if
+
+    width, height = image.size
+
+    plan = _plan_rand_crops(
+        width, height, crop_res, crop_count, rand, flips, rots, row_major=row_major, unique=unique,
+        min_distance=min_distance, max_overlap=max_overlap, importance=importance, mask=mask, scale_range=scale_range
+    )
+
+    if scale_range is None or len(plan) <= 0:
+        levels = [image]
+    else:
+        level_count = _find_level_idx(max(plan.sizes), resize_res, _maxsize) + 1
+        level_scales = [0.5 ** level_idx for level_idx in range(level_count)]
+        levels = [level for _, level in iter_pyramid(image, level_scales, resample)]
+    # end if
+
+    for plan_idx in range(len(plan)):
+        pos_x = plan.xs[plan_idx]
+        pos_y = plan.ys[plan_idx]
+        size = plan.sizes[plan_idx]
+        flip, rot = _find_flip_rot(plan.variants[plan_idx])
+
+        box = (pos_x, pos_y, pos_x + size, pos_y + size)
+
+        if detail_filter is not None and not detail_filter.check(box):
+            continue
+
+        if len(levels) > 1:
+            level_idx = _find_level_idx(size, resize_res, len(levels))
+            level = levels[level_idx]
+            level_box = _find_level_box(level, level_idx, box)
+            crop = make_crop(level, level_box, resize_res, flip, rot, resample, reducing_gap)
+        else:
+            crop = make_crop(image, box, resize_res, flip, rot, resample, reducing_gap)
+        # end if
+
+        if as_array:
+            crop = to_array(crop)
+
+        meta = _find_meta(plan.idxs[plan_idx], pos_x, pos_y, size, resize_res, flip, rot)
+
+        if box_index is not None:
+            labels = box_index.find_labels(box, min_visibility)
+            meta["labels"] = _transform_labels(labels, size, resize_res, flip, rot)
+        # end if
+
+        yield crop, meta
+    # end for
+
+
+def iter_paired_crops(image_crops, sources, resample="nearest", as_array=False):
+    """Iterates through the aligned crops of some paired sources, along with some crops.
+
+    Applies the box, the resize, the flip, and the rotation of each crop to all the paired sources in the same loop.
+    So, the crop positions are sampled only once, and each paired source is decoded only once.
+
+    Args:
+        image_crops: the crops, an iterable of (crop, meta) pairs, like iter_grid_crops and iter_rand_crops yield
+        sources: the paired sources, a list of PIL images, arrays, or image locations; each source must have the size
+            of the image that the crops come from
+        resample: the resize resampling filter of the paired crops, one of supported_resamples
+        as_array: whether to yield the paired crops as buffer-protocol arrays instead of PIL images
+
+    Yields:
+        crop: the crop
+        paired_crops: the paired crops, a list that has 1 crop per paired source
+        meta: the crop metadata
+    """
+    images = [open_image(source) for source in sources]
+    resample = str(resample)
+    as_array = bool(as_array)
+
+    if resample not in supported_resamples:
+        raise ValueError(f"Unsupported resample: {resample}; Supported: {supported_resamples}")
+
+    for crop, meta in image_crops:
+        box = (meta["x"], meta["y"], meta["x"] + meta["width"], meta["y"] + meta["height"])
+        rot = deg_to_rot(meta["rotation"])
+        paired_crops = []
+
+        for image in images:
+            paired_crop = make_crop(image, box, meta["resize"], meta["flip"], rot, resample)
+
+            if as_array:
+                paired_crop = to_array(paired_crop)
+
+            paired_crops.append(paired_crop)
+        # end for
+
+        yield crop, paired_crops, meta
+    # end for
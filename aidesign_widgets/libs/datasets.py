@@ -0,0 +1,619 @@
+"""Datasets.
+
+Virtual crop datasets.
+A virtual crop dataset keeps only a crop plan and regenerates each crop from its source image on access.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import array
+import collections
+import random
+import threading
+
+from PIL import Image as pil_image
+
+from aidesign_widgets.libs import crops
+from aidesign_widgets.libs import manifests
+from aidesign_widgets.libs import plans
+from aidesign_widgets.libs import samplers
+
+# Aliases
+
+_array = array.array
+_cascade_crop = crops.cascade_crop
+_CropPlan = plans.CropPlan
+_find_manifest_format = manifests.find_format
+_find_reducing_gap = crops.find_reducing_gap
+_find_variant = plans.find_variant
+_ImportanceSampler = samplers.ImportanceSampler
+_iter_pyramid = crops.iter_pyramid
+_load_bin_manifest = manifests.load_bin_manifest
+_load_manifest = manifests.load_manifest
+_Lock = threading.Lock
+_make_crop = crops.make_crop
+_open_image = crops.open_image
+_OrderedDict = collections.OrderedDict
+_pil_image = pil_image
+_plan_grid_crops = plans.plan_grid_crops
+_plan_rand_crops = plans.plan_rand_crops
+_Random = random.Random
+_to_array = crops.to_array
+
+# -
+
+default_max_cache_bytes = 512 * 1024 * 1024
+"""Default max byte size of the decoded source cache."""
+
+
+def find_image_size(source):
+    """Finds the size of an image source without decoding its pixels.
+
+    Args:
+        source: a PIL image, an array that has the "__array_interface__" attribute, or an image location
+
+    Returns:
+        result: width, height
+    """
+    image = _open_image(source)
+    result = image.size
+
+    if image is not source and hasattr(image, "close"):
+        image.close()
+
+    return result
+
+
+def _find_byte_count(image):
+    image: _pil_image.Image = image
+
+    result = image.width * image.height * len(image.getbands())
+    return result
+
+
+class CropDataset:
+    """Virtual crop dataset.
+
+    Holds a crop plan instead of the crop pixels.
+    Each access crops, resizes, flips, and rotates the planned box of a decoded source.
+    With levels, each plan entry has its own (scale, resize resolution) pair, like the multi-scale and the cascaded
+        crop runs make; the boxes are cut from the pyramid level of the scale, and the resizes go through the same
+        cascade as the crop commands, so that the regenerated crops match the saved ones.
+    The decoded sources and pyramid levels are kept in a least-recently-used cache, bounded by their decoded byte size.
+    """
+
+    def __init__(
+        self, sources, plan, resize_res=None, max_cache_bytes=default_max_cache_bytes, as_array=False,
+        resample="bicubic", reducing_gap=None, levels=None, level_idxs=None
+    ):
+        """Inits self with the given args.
+
+        Args:
+            sources: the sources, a list of PIL images, arrays that have the "__array_interface__" attribute, or image
+                locations
+            plan: the crop plan, whose source indices point into sources
+            resize_res: the resize resolution, or None to keep the crop resolutions
+            max_cache_bytes: the max decoded byte size of the cached sources; the latest source is always kept
+            as_array: whether to return the crops as buffer-protocol arrays instead of PIL images
+            resample: the resize resampling filter, one of crops.supported_resamples
+            reducing_gap: the resize reducing gap, or None; see crops.resize_image
+            levels: the (scale, resize resolution) pairs of the plan entries, or None for [(None, resize_res)];
+                a scale is in (0, 1], or None for the source itself
+            level_idxs: the level index of each plan entry, an array aligned with the plan; or None for all 0s
+        """
+        if resize_res is not None:
+            resize_res = int(resize_res)
+
+        if levels is None:
+            levels = [(None, resize_res)]
+
+        levels = [
+            (None if scale is None else float(scale), None if level_res is None else int(level_res))
+            for scale, level_res in levels
+        ]
+
+        max_cache_bytes = int(max_cache_bytes)
+        as_array = bool(as_array)
+        resample = str(resample)
+        reducing_gap = _find_reducing_gap(reducing_gap)
+
+        self.sources = list(sources)
+        """Sources."""
+        self.plan: _CropPlan = plan
+        """Crop plan."""
+        self.resize_res = resize_res
+        """Resize resolution."""
+        self.max_cache_bytes = max_cache_bytes
+        """Max decoded byte size of the cached sources."""
+        self.as_array = as_array
+        """Whether to return the crops as arrays."""
+        self.resample = resample
+        """Resize resampling filter."""
+        self.reducing_gap = reducing_gap
+        """Resize reducing gap."""
+        self.levels = levels
+        """(Scale, resize resolution) pairs of the plan entries."""
+        self.level_idxs = level_idxs
+        """Level index of each plan entry, or None for all 0s."""
+        self.cache_bytes = 0
+        """Decoded byte size of the cached sources and levels."""
+
+        # The pyramid scales and the cascade resolutions of all the levels, largest first, like the crop commands go
+        self._scales = sorted(set(scale for scale, _ in levels if scale is not None), reverse=True)
+        self._cascade_ress = sorted(set(level_res for _, level_res in levels if level_res is not None), reverse=True)
+        self._cache = _OrderedDict()
+        self._lock = _Lock()
+
+    def __len__(self):
+        """Finds the crop count.
+
+        Returns:
+            result: the crop count
+        """
+        result = len(self.plan)
+        return result
+
+    def _find_cached(self, key):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                result = self._cache[key]
+            else:
+                result = None
+            # end if
+        # end with
+
+        return result
+
+    def _add_cached(self, key, image):
+        byte_count = _find_byte_count(image)
+
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = image
+                self.cache_bytes += byte_count
+
+            while self.cache_bytes > self.max_cache_bytes and len(self._cache) > 1:
+                _, old_image = self._cache.popitem(last=False)
+                self.cache_bytes -= _find_byte_count(old_image)
+            # end while
+
+            result = self._cache.get(key, image)
+        # end with
+
+        return result
+
+    def _load_source(self, source_idx):
+        result = self._find_cached((source_idx, None))
+
+        if result is None:
+            image: _pil_image.Image = _open_image(self.sources[source_idx])
+            image.load()
+            result = self._add_cached((source_idx, None), image)
+        # end if
+
+        return result
+
+    def _load_level(self, source_idx, scale):
+        if scale is None:
+            result = self._load_source(source_idx)
+            return result
+
+        result = self._find_cached((source_idx, scale))
+
+        if result is None:
+            image = self._load_source(source_idx)
+            scales = [level_scale for level_scale in self._scales if level_scale >= scale]
+
+            # Each level comes from the one before it, so the whole chain down to the scale is walked
+            for _, level in _iter_pyramid(image, scales, self.resample):
+                result = level
+
+            if result is not image:
+                result = self._add_cached((source_idx, scale), result)
+        # end if
+
+        return result
+
+    def clear_cache(self):
+        """Clears the decoded source cache."""
+        with self._lock:
+            self._cache.clear()
+            self.cache_bytes = 0
+        # end with
+
+    def __getitem__(self, idx):
+        """Regenerates a crop.
+
+        Args:
+            idx: the crop index; negative indices count from the end
+
+        Returns:
+            crop: the crop, a PIL image or an array
+            meta: the crop metadata, a dict that has the "source", "index", "x", "y", "width", "height", "resize",
+                "flip", "rotation", and "scale" keys
+        """
+        idx = int(idx)
+        count = len(self.plan)
+
+        if idx < 0:
+            idx += count
+
+        if idx < 0 or idx >= count:
+            raise IndexError(f"Crop index out of range: {idx}; Crop count: {count}")
+
+        plan_meta = self.plan.find_meta(idx)
+
+        if self.level_idxs is None:
+            scale, resize_res = self.levels[0]
+        else:
+            scale, resize_res = self.levels[self.level_idxs[idx]]
+        # end if
+
+        image = self._load_level(plan_meta["source_index"], scale)
+
+        pos_x = plan_meta["x"]
+        pos_y = plan_meta["y"]
+        box = (pos_x, pos_y, pos_x + plan_meta["width"], pos_y + plan_meta["height"])
+        flip = plan_meta["flip"]
+        rot = crops.deg_to_rot(plan_meta["rotation"])
+
+        if resize_res is None:
+            crop = _make_crop(image, box, None, flip, rot, self.resample, self.reducing_gap)
+        else:
+            # Like the crop commands, resize to the largest resolution first, and then cascade down to this one
+            cascade_ress = [level_res for level_res in self._cascade_ress if level_res >= resize_res]
+            crop = _make_crop(image, box, cascade_ress[0], flip, rot, self.resample, self.reducing_gap)
+
+            if len(cascade_ress) > 1:
+                crop = _cascade_crop(crop, cascade_ress, self.resample, self.reducing_gap)[-1]
+        # end if
+
+        if self.as_array:
+            crop = _to_array(crop)
+
+        meta = {
+            "index": plan_meta["index"],
+            "source": plan_meta["source_index"],
+            "x": pos_x,
+            "y": pos_y,
+            "width": plan_meta["width"],
+            "height": plan_meta["height"],
+            "resize": resize_res,
+            "flip": flip,
+            "rotation": plan_meta["rotation"],
+            "scale": scale
+        }
+
+        return crop, meta
+
+    def __iter__(self):
+        """Iterates through the crops in plan order.
+
+        Yields:
+            crop: the crop, a PIL image or an array
+            meta: the crop metadata
+        """
+        for idx in range(len(self.plan)):
+            yield self[idx]
+        # end for
+
+
+def grid_dataset(
+    sources, crop_res, resize_res=None, start_pos_x=0, start_pos_y=0, max_crop_count_x=None, max_crop_count_y=None,
+    flips=None, rots=None, max_cache_bytes=default_max_cache_bytes, as_array=False, stride_x=None, stride_y=None,
+    resample="bicubic", reducing_gap=None
+):
+    """Creates a virtual crop dataset with the grid crops of some sources.
+
+    Only the source sizes are read while planning.
+
+    Args:
+        sources: the sources, a list of PIL images, arrays that have the "__array_interface__" attribute, or image
+            locations
+        crop_res: the crop resolution
+        resize_res: the resize resolution, or None to keep the crop resolution
+        start_pos_x: the X-axis start position
+        start_pos_y: the Y-axis start position
+        max_crop_count_x: the X-axis max crop count, or None for no limit
+        max_crop_count_y: the Y-axis max crop count, or None for no limit
+        flips: the flips, a list of crops.supported_flips items, or None for [""]
+        rots: the rotations, a list of crops.supported_rots items, or None for [""]
+        max_cache_bytes: the max decoded byte size of the cached sources
+        as_array: whether to return the crops as buffer-protocol arrays instead of PIL images
+        stride_x: the X-axis stride, or None for the crop resolution
+        stride_y: the Y-axis stride, or None for the crop resolution
+        resample: the resize resampling filter, one of crops.supported_resamples
+        reducing_gap: the resize reducing gap, or None; see crops.resize_image
+
+    Returns:
+        result: the dataset
+    """
+    sources = list(sources)
+
+    plan = _CropPlan()
+
+    for source_idx, source in enumerate(sources):
+        width, height = find_image_size(source)
+
+        _plan_grid_crops(
+            width, height, crop_res, start_pos_x, start_pos_y, max_crop_count_x, max_crop_count_y, flips, rots,
+            source_idx, plan, stride_x, stride_y
+        )
+    # end for
+
+    result = CropDataset(sources, plan, resize_res, max_cache_bytes, as_array, resample, reducing_gap)
+    return result
+
+
+def rand_dataset(
+    sources, crop_res, resize_res=None, crop_count=1, seed=None, flips=None, rots=None,
+    max_cache_bytes=default_max_cache_bytes, as_array=False, unique=False, min_distance=0, max_overlap=None,
+    importance_mode=None, importance_map_res=256, scale_range=None, resample="bicubic", reducing_gap=None
+):
+    """Creates a virtual crop dataset with the random crops of some sources.
+
+    The positions and variants are drawn once while planning, so every access to a crop gives the same pixels.
+
+    Args:
+        sources: the sources, a list of PIL images, arrays that have the "__array_interface__" attribute, or image
+            locations
+        crop_res: the crop resolution
+        resize_res: the resize resolution, or None to keep the crop resolution
+        crop_count: the crop count of each source
+        seed: the random seed, or None for an automatic seed
+        flips: the flips to pick from, a list of crops.supported_flips items, or None for [""]
+        rots: the rotations to pick from, a list of crops.supported_rots items, or None for [""]
+        max_cache_bytes: the max decoded byte size of the cached sources
+        as_array: whether to return the crops as buffer-protocol arrays instead of PIL images
+        unique: whether to draw the crops of each source without replacement
+        min_distance: the min Euclidean distance between 2 crop positions of a source
+        max_overlap: the max intersection area of 2 crops of a source, as a fraction of the crop area; or None
+        importance_mode: the importance sampling mode, one of samplers.supported_importance_modes, or None;
+            if not None, each source is decoded once while planning, to find its detail map
+        importance_map_res: the max width and height of the importance detail maps
+        scale_range: the (min scale, max scale) range of the window sizes, as multiples of the crop resolution; or
+            None to keep the crop resolution; if not None, a None resize_res becomes the crop resolution
+        resample: the resize resampling filter, one of crops.supported_resamples
+        reducing_gap: the resize reducing gap, or None; see crops.resize_image
+
+    Returns:
+        result: the dataset
+    """
+    sources = list(sources)
+
+    rand = _Random(seed)
+    plan = _CropPlan()
+
+    if scale_range is not None and resize_res is None:
+        resize_res = crop_res
+
+    for source_idx, source in enumerate(sources):
+        if importance_mode is None:
+            width, height = find_image_size(source)
+            importance = None
+        else:
+            image = _open_image(source)
+            width, height = image.size
+            importance = _ImportanceSampler(image, crop_res, importance_mode, importance_map_res)
+        # end if
+
+        _plan_rand_crops(
+            width, height, crop_res, crop_count, rand, flips, rots, source_idx, plan, unique=unique,
+            min_distance=min_distance, max_overlap=max_overlap, importance=importance, scale_range=scale_range
+        )
+    # end for
+
+    result = CropDataset(sources, plan, resize_res, max_cache_bytes, as_array, resample, reducing_gap)
+    return result
+
+
+def _config_flips_rots(config, flip_key, rot_key):
+    if flip_key in config and config[flip_key] is not None and bool(config[flip_key]):
+        flips = ["", "x", "y", "xy"]
+    else:
+        flips = [""]
+    # end if
+
+    if rot_key in config and config[rot_key] is not None and bool(config[rot_key]):
+        rots = ["", "180"]
+    else:
+        rots = [""]
+    # end if
+
+    return flips, rots
+
+
+def _config_resize_res(config):
+    resize_res = config["resize_resolution"]
+
+    if isinstance(resize_res, list):
+        raise ValueError(f"A dataset takes 1 resize resolution, not a list: {resize_res}; Create 1 dataset for each")
+
+    return resize_res
+
+
+def grid_config_dataset(config, sources=None, max_cache_bytes=default_max_cache_bytes, as_array=False):
+    """Creates a virtual crop dataset from a grid crop config.
+
+    Args:
+        config: the grid crop config, a dict
+        sources: the sources, or None to use the image location in the config
+        max_cache_bytes: the max decoded byte size of the cached sources
+        as_array: whether to return the crops as buffer-protocol arrays instead of PIL images
+
+    Returns:
+        result: the dataset
+    """
+    config: dict = config
+
+    if sources is None:
+        sources = [config["image_location"]]
+
+    flips, rots = _config_flips_rots(config, "save_flips", "save_rotations")
+
+    result = grid_dataset(
+        sources, config["crop_resolution"], _config_resize_res(config), config["start_position_x"],
+        config["start_position_y"], config["max_crop_count_x"], config["max_crop_count_y"], flips, rots,
+        max_cache_bytes, as_array, config.get("stride_x"), config.get("stride_y"), config.get("resample") or "bicubic",
+        config.get("reducing_gap")
+    )
+
+    return result
+
+
+def rand_config_dataset(config, sources=None, max_cache_bytes=default_max_cache_bytes, as_array=False):
+    """Creates a virtual crop dataset from a random crop config.
+
+    Args:
+        config: the random crop config, a dict
+        sources: the sources, or None to use the image location in the config
+        max_cache_bytes: the max decoded byte size of the cached sources
+        as_array: whether to return the crops as buffer-protocol arrays instead of PIL images
+
+    Returns:
+        result: the dataset
+    """
+    config: dict = config
+
+    if sources is None:
+        sources = [config["image_location"]]
+
+    flips, rots = _config_flips_rots(config, "random_flipping", "random_rotating")
+
+    result = rand_dataset(
+        sources, config["crop_resolution"], _config_resize_res(config), config["crop_count"],
+        config["manual_seed"], flips, rots, max_cache_bytes, as_array, bool(config.get("unique_positions")),
+        config.get("min_distance") or 0, config.get("max_overlap"), config.get("importance_mode"),
+        config.get("importance_map_resolution") or 256, config.get("scale_jitter_range"),
+        config.get("resample") or "bicubic", config.get("reducing_gap")
+    )
+
+    return result
+
+
+def _int_or_none(val):
+    if val is None or val == "":
+        result = None
+    else:
+        result = int(val)
+    # end if
+
+    return result
+
+
+def _float_or_none(val):
+    if val is None or val == "":
+        result = None
+    else:
+        result = float(val)
+    # end if
+
+    return result
+
+
+def _find_level_idx(levels, level_idxs, scale, resize_res):
+    levels: list = levels
+    level_idxs: dict = level_idxs
+
+    level = (scale, resize_res)
+
+    if level not in level_idxs:
+        level_idxs[level] = len(levels)
+        levels.append(level)
+    # end if
+
+    result = level_idxs[level]
+    return result
+
+
+def manifest_dataset(
+    loc, max_cache_bytes=default_max_cache_bytes, as_array=False, resample="bicubic", reducing_gap=None
+):
+    """Creates a virtual crop dataset from a crop manifest.
+
+    The dataset regenerates the manifest crops in manifest order.
+    Each record keeps its own scale and resize resolution, so the multi-scale and the cascaded runs regenerate from
+        the same pyramid levels and resize cascade as the crop commands.
+    The scale jittered random crops are cut from the full resolution source instead of a pyramid level, so their
+        pixels may differ slightly from the saved crops.
+
+    Args:
+        loc: the manifest location
+        max_cache_bytes: the max decoded byte size of the cached sources
+        as_array: whether to return the crops as buffer-protocol arrays instead of PIL images
+        resample: the resampling filter of the run, one of crops.supported_resamples
+        reducing_gap: the reducing gap of the run, or None; see crops.resize_image
+
+    Returns:
+        result: the dataset
+    """
+    loc = str(loc)
+
+    plan = _CropPlan()
+    levels = []
+    level_idxs = {}
+    plan_level_idxs = _array("I")
+
+    if _find_manifest_format(loc) == "bin":
+        manifest = _load_bin_manifest(loc)
+        sources = manifest.sources
+        columns = manifest.columns
+        flips = manifests.bin_flips
+
+        for idx in range(len(manifest)):
+            rot = crops.deg_to_rot(columns["rotation"][idx])
+            variant = _find_variant(flips[columns["flip"][idx]], rot)
+
+            plan.append(
+                columns["source"][idx], columns["index"][idx], columns["x"][idx], columns["y"][idx],
+                columns["width"][idx], variant
+            )
+
+            resize_res = columns["resize"][idx]
+            resize_res = None if resize_res < 0 else resize_res
+
+            # The older bin manifests have no scale column
+            scale = columns["scale"][idx] if "scale" in columns else -1
+            scale = None if scale < 0 else scale
+
+            plan_level_idxs.append(_find_level_idx(levels, level_idxs, scale, resize_res))
+        # end for
+    else:
+        records = _load_manifest(loc)
+        sources = []
+        source_idxs = {}
+
+        for record in records:
+            source = str(record["source"])
+
+            if source not in source_idxs:
+                source_idxs[source] = len(sources)
+                sources.append(source)
+            # end if
+
+            rot = crops.deg_to_rot(record["rotation"])
+            variant = _find_variant(record["flip"], rot)
+
+            plan.append(
+                source_idxs[source], int(record["index"]), int(record["x"]), int(record["y"]), int(record["width"]),
+                variant
+            )
+
+            resize_res = _int_or_none(record["resize"])
+            scale = _float_or_none(record.get("scale"))
+            plan_level_idxs.append(_find_level_idx(levels, level_idxs, scale, resize_res))
+        # end for
+    # end if
+
+    if len(levels) <= 0:
+        levels = None
+
+    result = CropDataset(
+        sources, plan, None, max_cache_bytes, as_array, resample, reducing_gap, levels, plan_level_idxs
+    )
+
+    return result
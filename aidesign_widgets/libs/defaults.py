@@ -29,10 +29,14 @@ app_data_path = _join(_repo_path, "aidesign_widgets_app_data")
 """Command configs path."""
 grid_crop_config_name = "grid_crop_config.json"
 """"grid-crop" config name."""
+grid_stitch_config_name = "grid_stitch_config.json"
+""""grid-stitch" config name."""
 rand_crop_config_name = "rand_crop_config.json"
 """"rand-crop" config name."""
 bulk_crop_config_name = "bulk_crop_config.json"
 """"bulk-crop" config name."""
+bench_config_name = "bench_config.json"
+""""bench" config name."""
 
 bulk_crop_backups_path = _join(app_data_path, "bulk_crop_backups")
 """"bulk-crop" backup path."""
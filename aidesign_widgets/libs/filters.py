@@ -0,0 +1,151 @@
+"""Filters.
+
+Crop box filters that reject the blank and the blurry boxes before cropping.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import math
+
+from PIL import Image as pil_image
+from PIL import ImageFilter as pil_image_filter
+
+from aidesign_widgets.libs import integrals
+
+# Aliases
+
+_ceil = math.ceil
+_from_image = integrals.from_image
+_IntegralImage = integrals.IntegralImage
+_Kernel = pil_image_filter.Kernel
+_pil_image = pil_image
+
+# -
+
+_laplacian_offset = 128
+_laplacian_kernel = _Kernel((3, 3), [0, 1, 0, 1, -4, 1, 0, 1, 0], scale=1, offset=_laplacian_offset)
+
+
+class DetailFilter:
+    """Detail filter of crop boxes.
+
+    Computes the integral images of the luminance, its square, and the squared Laplacian response once per image.
+    Then, finds the luminance variance and the Laplacian energy of any box in O(1) time.
+    A box passes if both of them reach their thresholds.
+    """
+
+    def __init__(self, image, min_variance=None, min_laplacian_energy=None, map_res=256):
+        """Inits self with the given args.
+
+        Args:
+            image: the PIL image
+            min_variance: the min luminance variance, or None for no limit
+            min_laplacian_energy: the min mean squared Laplacian response, or None for no limit;
+                the responses are clipped to [-128, 127]
+            map_res: the max width and height of the luminance map the statistics come from, or None to use the
+                full resolution
+        """
+        image: _pil_image.Image = image
+
+        if min_variance is not None:
+            min_variance = float(min_variance)
+
+        if min_laplacian_energy is not None:
+            min_laplacian_energy = float(min_laplacian_energy)
+
+        width, height = image.size
+
+        if map_res is None:
+            scale = 1
+        else:
+            scale = max(_ceil(max(width, height) / int(map_res)), 1)
+        # end if
+
+        gray = image.convert("L")
+
+        if scale > 1:
+            gray = gray.reduce(scale)
+
+        self.min_variance = min_variance
+        """Min luminance variance."""
+        self.min_laplacian_energy = min_laplacian_energy
+        """Min Laplacian energy."""
+        self.scale = scale
+        """Luminance map scale, the image pixel count per map pixel along each axis."""
+        self.rejected_count = 0
+        """Rejected box count."""
+
+        self._sums: _IntegralImage = None
+        self._sq_sums: _IntegralImage = None
+        self._lap_sq_sums: _IntegralImage = None
+
+        if min_variance is not None:
+            self._sums = _from_image(gray)
+            self._sq_sums = _from_image(gray, squared=True)
+        # end if
+
+        if min_laplacian_energy is not None:
+            lap_vals = [val - _laplacian_offset for val in gray.filter(_laplacian_kernel).tobytes()]
+            lap_sq_vals = [val * val for val in lap_vals]
+            self._lap_sq_sums = _IntegralImage(lap_sq_vals, gray.width, gray.height)
+        # end if
+
+    def find_stats(self, box):
+        """Finds the luminance variance and the Laplacian energy of a box.
+
+        Args:
+            box: the box, (left, upper, right, lower)
+
+        Returns:
+            variance: the luminance variance, or None if there is no variance threshold
+            laplacian_energy: the Laplacian energy, or None if there is no Laplacian energy threshold
+        """
+        left, upper, right, lower = box
+        scale = self.scale
+        left = left // scale
+        upper = upper // scale
+        right = max(right // scale, left + 1)
+        lower = max(lower // scale, upper + 1)
+        pixel_count = (right - left) * (lower - upper)
+
+        if self._sums is None:
+            variance = None
+        else:
+            mean = self._sums.box_sum(left, upper, right, lower) / pixel_count
+            sq_mean = self._sq_sums.box_sum(left, upper, right, lower) / pixel_count
+            variance = sq_mean - mean * mean
+        # end if
+
+        if self._lap_sq_sums is None:
+            laplacian_energy = None
+        else:
+            laplacian_energy = self._lap_sq_sums.box_sum(left, upper, right, lower) / pixel_count
+        # end if
+
+        return variance, laplacian_energy
+
+    def check(self, box):
+        """Checks whether a box passes, and counts it if it is rejected.
+
+        Args:
+            box: the box, (left, upper, right, lower)
+
+        Returns:
+            result: whether the box passes
+        """
+        variance, laplacian_energy = self.find_stats(box)
+        result = True
+
+        if variance is not None and variance < self.min_variance:
+            result = False
+
+        if laplacian_energy is not None and laplacian_energy < self.min_laplacian_energy:
+            result = False
+
+        if not result:
+            self.rejected_count += 1
+
+        return result
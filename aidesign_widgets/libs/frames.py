@@ -0,0 +1,282 @@
+"""Frames.
+
+Length-prefixed frames for streaming images through pipes.
+
+Image frame layout:
+    8 bytes: the payload length, a big-endian unsigned integer
+    N bytes: the payload, an encoded image
+
+Crop frame layout:
+    4 bytes: the header length, a big-endian unsigned integer
+    M bytes: the header, a UTF-8 JSON object
+    8 bytes: the payload length, a big-endian unsigned integer
+    N bytes: the payload, an encoded crop
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import json
+import queue
+import struct
+import threading
+import typing
+
+# Aliases
+
+_IO = typing.IO
+_jsondumps = json.dumps
+_jsonloads = json.loads
+_Queue = queue.Queue
+_Struct = struct.Struct
+_Thread = threading.Thread
+
+# -
+
+_payload_len_struct = _Struct(">Q")
+_header_len_struct = _Struct(">I")
+_end = object()
+
+
+def _read_exact(stream, size):
+    """Returns the bytes read, or None if the stream ends before the first byte."""
+    stream: _IO = stream
+    size = int(size)
+
+    chunks = []
+    remaining = size
+
+    while remaining > 0:
+        chunk = stream.read(remaining)
+
+        if chunk is None or len(chunk) <= 0:
+            break
+
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    # end while
+
+    if remaining == size and size > 0:
+        result = None
+    elif remaining > 0:
+        raise EOFError(f"Stream ended in the middle of a frame: expects {size} bytes; Gets {size - remaining} bytes")
+    else:
+        result = b"".join(chunks)
+    # end if
+
+    return result
+
+
+def read_frame(stream):
+    """Reads an image frame from a binary stream.
+
+    Args:
+        stream: the binary stream
+
+    Returns:
+        result: the payload, or None if the stream has ended
+    """
+    stream: _IO = stream
+
+    len_bytes = _read_exact(stream, _payload_len_struct.size)
+
+    if len_bytes is None:
+        result = None
+    else:
+        payload_len, = _payload_len_struct.unpack(len_bytes)
+        result = _read_exact(stream, payload_len)
+
+        if result is None:
+            result = b""
+    # end if
+
+    return result
+
+
+def write_frame(stream, payload):
+    """Writes an image frame to a binary stream.
+
+    Args:
+        stream: the binary stream
+        payload: the payload, an encoded image
+    """
+    stream: _IO = stream
+    payload = bytes(payload)
+
+    stream.write(_payload_len_struct.pack(len(payload)))
+    stream.write(payload)
+
+
+def read_crop_frame(stream):
+    """Reads a crop frame from a binary stream.
+
+    Args:
+        stream: the binary stream
+
+    Returns:
+        result: header, payload; or None if the stream has ended
+    """
+    stream: _IO = stream
+
+    len_bytes = _read_exact(stream, _header_len_struct.size)
+
+    if len_bytes is None:
+        result = None
+    else:
+        header_len, = _header_len_struct.unpack(len_bytes)
+        header_bytes = _read_exact(stream, header_len)
+        header = _jsonloads(header_bytes.decode("utf-8"))
+        payload = read_frame(stream)
+
+        if payload is None:
+            raise EOFError("Stream ended between a crop frame header and its payload")
+
+        result = header, payload
+    # end if
+
+    return result
+
+
+def write_crop_frame(stream, header, payload):
+    """Writes a crop frame to a binary stream.
+
+    Args:
+        stream: the binary stream
+        header: the header, a JSON serializable dict
+        payload: the payload, an encoded crop
+    """
+    stream: _IO = stream
+    header: dict = header
+
+    header_bytes = _jsondumps(header).encode("utf-8")
+    stream.write(_header_len_struct.pack(len(header_bytes)))
+    stream.write(header_bytes)
+    write_frame(stream, payload)
+
+
+class FrameReader:
+    """Frame reader.
+
+    Reads the image frames of a stream on a background thread into a bounded buffer.
+    When the buffer is full, the reading pauses, which pushes back on the writer of the stream.
+    """
+
+    def __init__(self, stream, buffer_count=16):
+        """Inits self with the given args.
+
+        Args:
+            stream: the binary stream
+            buffer_count: the max count of the buffered frames
+        """
+        buffer_count = int(buffer_count)
+
+        if buffer_count < 1:
+            buffer_count = 1
+
+        self._stream: _IO = stream
+        self._queue = _Queue(maxsize=buffer_count)
+        self._thread = _Thread(target=self._read_all, daemon=True)
+        self._thread.start()
+
+    def _read_all(self):
+        try:
+            while True:
+                payload = read_frame(self._stream)
+
+                if payload is None:
+                    break
+
+                self._queue.put(payload)
+            # end while
+
+            self._queue.put(_end)
+        except BaseException as base_exception:
+            self._queue.put(base_exception)
+        # end try
+
+    def __iter__(self):
+        """Iterates through the frames.
+
+        Yields:
+            payload: the payload of a frame
+        """
+        while True:
+            item = self._queue.get()
+
+            if item is _end:
+                break
+
+            if isinstance(item, BaseException):
+                raise item
+
+            yield item
+        # end while
+
+
+class CropFrameWriter:
+    """Crop frame writer.
+
+    Writes the crop frames to a stream on a background thread from a bounded buffer.
+    When the buffer is full, the writing blocks the producer, which pushes back on the cropping.
+    """
+
+    def __init__(self, stream, buffer_count=16):
+        """Inits self with the given args.
+
+        Args:
+            stream: the binary stream
+            buffer_count: the max count of the buffered frames
+        """
+        buffer_count = int(buffer_count)
+
+        if buffer_count < 1:
+            buffer_count = 1
+
+        self._stream: _IO = stream
+        self._queue = _Queue(maxsize=buffer_count)
+        self._exception = None
+        self._thread = _Thread(target=self._write_all, daemon=True)
+        self._thread.start()
+
+    def _write_all(self):
+        try:
+            while True:
+                item = self._queue.get()
+
+                if item is _end:
+                    break
+
+                header, payload = item
+                write_crop_frame(self._stream, header, payload)
+            # end while
+
+            self._stream.flush()
+        except BaseException as base_exception:
+            self._exception = base_exception
+
+            # Keep draining so that the producer never blocks forever
+            while self._queue.get() is not _end:
+                pass
+        # end try
+
+    def put(self, header, payload):
+        """Puts a crop frame into the buffer.
+
+        Args:
+            header: the header, a JSON serializable dict
+            payload: the payload, an encoded crop
+        """
+        if self._exception is not None:
+            raise self._exception
+
+        self._queue.put((header, payload))
+
+    def close(self):
+        """Writes all the buffered frames and stops the writing thread."""
+        self._queue.put(_end)
+        self._thread.join()
+
+        if self._exception is not None:
+            raise self._exception
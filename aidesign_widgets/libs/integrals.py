@@ -0,0 +1,121 @@
+"""Integral images.
+
+An integral image, also known as a summed-area table, gives the sum of the values in any box in O(1) time.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import array
+import itertools
+
+from PIL import Image as pil_image
+
+# Aliases
+
+_accumulate = itertools.accumulate
+_array = array.array
+_pil_image = pil_image
+
+# -
+
+
+class IntegralImage:
+    """Integral image.
+
+    Keeps the (width + 1) by (height + 1) table of the box sums that start at the top left corner.
+    """
+
+    def __init__(self, values, width, height, typecode="q"):
+        """Inits self with the given args.
+
+        Args:
+            values: the values, a flat row-major sequence of width * height numbers
+            width: the width
+            height: the height
+            typecode: the array typecode of the table, "q" for integers or "d" for floats
+        """
+        width = int(width)
+        height = int(height)
+        typecode = str(typecode)
+
+        self.width = width
+        """Width."""
+        self.height = height
+        """Height."""
+
+        table = _array(typecode, [0]) * (width + 1)
+        prev_row = table[0:width + 1]
+
+        for y in range(height):
+            row = _accumulate(values[y * width:(y + 1) * width], initial=0)
+            row = [val + prev_val for val, prev_val in zip(row, prev_row)]
+            table.extend(row)
+            prev_row = row
+        # end for
+
+        self.table = table
+        """Table."""
+
+    def box_sum(self, left, upper, right, lower):
+        """Finds the sum of the values in a box.
+
+        Args:
+            left: the inclusive left bound
+            upper: the inclusive upper bound
+            right: the exclusive right bound
+            lower: the exclusive lower bound
+
+        Returns:
+            result: the sum
+        """
+        table = self.table
+        stride = self.width + 1
+        upper_row = upper * stride
+        lower_row = lower * stride
+
+        result = table[lower_row + right] - table[upper_row + right]
+        result += table[upper_row + left] - table[lower_row + left]
+        return result
+
+
+def from_image(image, squared=False):
+    """Creates an integral image from the first band of a PIL image.
+
+    Args:
+        image: the PIL image; an "F" mode image gives a float table, other modes give an integer table;
+            the single-band modes other than "L", "I", and "F" are converted to "L"
+        squared: whether to sum the squares of the values instead of the values
+
+    Returns:
+        result: the integral image
+    """
+    image: _pil_image.Image = image
+    squared = bool(squared)
+
+    if len(image.getbands()) > 1:
+        image = image.getchannel(0)
+
+    if image.mode == "F":
+        typecode = "d"
+        values = _array("f", image.tobytes())
+    elif image.mode == "I":
+        typecode = "q"
+        values = _array("i", image.tobytes())
+    else:
+        typecode = "q"
+
+        if image.mode != "L":
+            image = image.convert("L")
+
+        values = image.tobytes()
+    # end if
+
+    if squared:
+        values = [val * val for val in values]
+
+    width, height = image.size
+    result = IntegralImage(values, width, height, typecode)
+    return result
@@ -0,0 +1,423 @@
+"""Crop manifests.
+
+A crop manifest has one record per saved crop.
+A record tells the source image, the crop box, the resize resolution, the variant, the output location, and the byte
+    size of a crop.
+
+Supported manifest formats:
+    "jsonl": one JSON object per line.
+    "csv": one CSV row per record, with a header row.
+    "bin": a compact binary form for runs with a very large number of crops.
+        The numeric fields are fixed-width little-endian int64 rows, which load into arrays in one go; the "scale"
+            field is a float64 in the same row width.
+        The source locations and the output locations are kept in 2 companion text files, one item per line.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import array
+import csv
+import json
+import struct
+import sys
+import typing
+
+# Aliases
+
+_array = array.array
+_byteorder = sys.byteorder
+_DictReader = csv.DictReader
+_DictWriter = csv.DictWriter
+_IO = typing.IO
+_jsondumps = json.dumps
+_jsonloads = json.loads
+_Struct = struct.Struct
+
+# -
+
+supported_formats = ["jsonl", "csv", "bin"]
+"""Supported manifest formats."""
+
+format_exts = {
+    "jsonl": ".jsonl",
+    "csv": ".csv",
+    "bin": ".bin"
+}
+"""Manifest format file extensions."""
+
+csv_fields = [
+    "index", "source", "x", "y", "width", "height", "resize", "flip", "rotation", "location", "bytes", "stride_x",
+    "stride_y", "scale", "resize_width", "resize_height", "labels", "paired_locations", "brightness", "mean", "std"
+]
+"""CSV manifest header fields.
+
+A CSV manifest always has all these columns; a record leaves the fields it has no value for empty.
+"""
+
+bin_fields = [
+    "index", "source", "x", "y", "width", "height", "resize", "flip", "rotation", "bytes", "stride_x", "stride_y",
+    "scale"
+]
+"""Binary manifest numeric fields.
+
+In a binary manifest, "source" is an index into the sources file, "flip" is an index into bin_flips, and "resize",
+    "stride_x", "stride_y", and "scale" are -1 when the record has no such value.
+"""
+bin_float_fields = ["scale"]
+"""Binary manifest float64 fields; the other fields are int64."""
+bin_optional_fields = ["resize", "stride_x", "stride_y", "scale"]
+"""Binary manifest fields that are -1 when the record has no such value."""
+bin_flips = ["", "x", "y", "xy"]
+"""Binary manifest flip codes."""
+
+bin_magic = b"AIDWMAN1"
+"""Binary manifest magic bytes."""
+bin_sources_suffix = ".sources.txt"
+"""Binary manifest sources file name suffix."""
+bin_locations_suffix = ".locations.txt"
+"""Binary manifest locations file name suffix."""
+
+_bin_header_struct = _Struct("<I")
+
+
+def find_ext(manifest_format):
+    """Finds the file extension of a manifest format.
+
+    Args:
+        manifest_format: the manifest format
+
+    Returns:
+        result: the file extension, with the leading dot
+    """
+    manifest_format = str(manifest_format)
+
+    result = format_exts[manifest_format]
+    return result
+
+
+def find_format(loc):
+    """Finds the manifest format of a manifest file from its extension.
+
+    Args:
+        loc: the manifest location
+
+    Returns:
+        result: the manifest format
+    """
+    loc = str(loc)
+
+    result = None
+
+    for manifest_format in supported_formats:
+        if loc.endswith(format_exts[manifest_format]):
+            result = manifest_format
+    # end for
+
+    if result is None:
+        raise ValueError(f"Unknown manifest extension: {loc}; Supported: {list(format_exts.values())}")
+
+    return result
+
+
+class ManifestWriter:
+    """Manifest writer.
+
+    Streams the crop records to a manifest file while cropping.
+    """
+
+    def __init__(self, loc, manifest_format):
+        """Inits self with the given args.
+
+        Args:
+            loc: the manifest location
+            manifest_format: the manifest format
+        """
+        loc = str(loc)
+        manifest_format = str(manifest_format)
+
+        if manifest_format not in supported_formats:
+            raise ValueError(f"Unsupported manifest format: {manifest_format}; Supported: {supported_formats}")
+
+        self.loc = loc
+        """Manifest location."""
+        self.manifest_format = manifest_format
+        """Manifest format."""
+        self.count = 0
+        """Written record count."""
+
+        self._csv_writer = None
+        self._source_idxs = {}
+        self._sources_file = None
+        self._locations_file = None
+        self._row_struct = None
+
+        if manifest_format == "bin":
+            self._file: _IO = open(loc, "wb")
+            self._sources_file: _IO = open(loc + bin_sources_suffix, "w", encoding="utf-8")
+            self._locations_file: _IO = open(loc + bin_locations_suffix, "w", encoding="utf-8")
+            row_format = "".join("d" if field in bin_float_fields else "q" for field in bin_fields)
+            self._row_struct = _Struct("<" + row_format)
+
+            header = _jsondumps(
+                {"fields": bin_fields, "float_fields": bin_float_fields, "flips": bin_flips}
+            ).encode("utf-8")
+            self._file.write(bin_magic)
+            self._file.write(_bin_header_struct.pack(len(header)))
+            self._file.write(header)
+        else:
+            self._file: _IO = open(loc, "w", encoding="utf-8", newline="")
+        # end if
+
+    def _write_jsonl(self, record):
+        line = _jsondumps(record)
+        self._file.write(line + "\n")
+
+    def _write_csv(self, record):
+        if self._csv_writer is None:
+            self._csv_writer = _DictWriter(self._file, fieldnames=csv_fields)
+            self._csv_writer.writeheader()
+
+        extra_keys = [key for key in record if key not in csv_fields]
+
+        if len(extra_keys) > 0:
+            raise ValueError(f"Unknown CSV manifest fields: {extra_keys}; Supported: {csv_fields}")
+
+        row = {}
+
+        for key in record:
+            val = record[key]
+
+            if isinstance(val, (list, dict)):
+                val = _jsondumps(val)
+            elif val is None:
+                val = ""
+            # end if
+
+            row[key] = val
+        # end for
+
+        self._csv_writer.writerow(row)
+
+    def _write_bin(self, record):
+        source = str(record["source"])
+
+        if source not in self._source_idxs:
+            self._source_idxs[source] = len(self._source_idxs)
+            self._sources_file.write(source + "\n")
+
+        vals = []
+
+        for field in bin_fields:
+            if field == "source":
+                val = self._source_idxs[source]
+            elif field == "flip":
+                val = bin_flips.index(str(record["flip"]))
+            elif field in bin_optional_fields and (field not in record or record[field] is None):
+                val = -1
+            elif field in bin_float_fields:
+                val = float(record[field])
+            else:
+                val = int(record[field])
+            # end if
+
+            vals.append(val)
+        # end for
+
+        self._file.write(self._row_struct.pack(*vals))
+        self._locations_file.write(str(record["location"]) + "\n")
+
+    def write(self, record):
+        """Writes a crop record.
+
+        Args:
+            record: the crop record, a dict that has at least the "index", "source", "x", "y", "width", "height",
+                "resize", "flip", "rotation", "location", and "bytes" keys; and optionally the "stride_x", "stride_y",
+                and "scale" keys; a CSV manifest takes only the keys in csv_fields
+        """
+        record: dict = record
+
+        if self.manifest_format == "jsonl":
+            self._write_jsonl(record)
+        elif self.manifest_format == "csv":
+            self._write_csv(record)
+        else:  # elif self.manifest_format == "bin":
+            self._write_bin(record)
+        # end if
+
+        self.count += 1
+
+    def flush(self):
+        """Flushes the manifest files."""
+        self._file.flush()
+
+        if self._sources_file is not None:
+            self._sources_file.flush()
+
+        if self._locations_file is not None:
+            self._locations_file.flush()
+
+    def close(self):
+        """Closes the manifest files."""
+        self._file.close()
+
+        if self._sources_file is not None:
+            self._sources_file.close()
+
+        if self._locations_file is not None:
+            self._locations_file.close()
+
+
+class BinManifest:
+    """Binary manifest, loaded as arrays."""
+
+    def __init__(self, columns, sources, locations):
+        """Inits self with the given args.
+
+        Args:
+            columns: the numeric columns, a dict that maps each field in bin_fields to an int64 array, or a float64
+                array for the fields in bin_float_fields
+            sources: the source locations
+            locations: the output locations
+        """
+        self.columns: dict[str, _array] = dict(columns)
+        """Numeric columns."""
+        self.sources: list[str] = list(sources)
+        """Source locations."""
+        self.locations: list[str] = list(locations)
+        """Output locations."""
+
+    def __len__(self):
+        """Finds the record count.
+
+        Returns:
+            result: the record count
+        """
+        result = len(self.locations)
+        return result
+
+    def record(self, idx):
+        """Finds a record as a dict.
+
+        Args:
+            idx: the record index
+
+        Returns:
+            result: the record
+        """
+        idx = int(idx)
+
+        result = {}
+
+        for field in self.columns:
+            result[field] = self.columns[field][idx]
+        # end for
+
+        result["source"] = self.sources[result["source"]]
+        result["flip"] = bin_flips[result["flip"]]
+
+        for field in bin_optional_fields:
+            if field in result and result[field] < 0:
+                result[field] = None
+        # end for
+
+        result["location"] = self.locations[idx]
+        return result
+
+
+def _load_lines(loc):
+    file = open(loc, "r", encoding="utf-8")
+    result = file.read().splitlines()
+    file.close()
+    return result
+
+
+def load_bin_manifest(loc):
+    """Loads a binary manifest as arrays.
+
+    Args:
+        loc: the manifest location
+
+    Returns:
+        result: the binary manifest
+    """
+    loc = str(loc)
+
+    file = open(loc, "rb")
+    data = file.read()
+    file.close()
+
+    magic_len = len(bin_magic)
+
+    if data[:magic_len] != bin_magic:
+        raise ValueError(f"Not a binary manifest: {loc}")
+
+    header_len_end = magic_len + _bin_header_struct.size
+    header_len, = _bin_header_struct.unpack(data[magic_len:header_len_end])
+    header = _jsonloads(data[header_len_end:header_len_end + header_len].decode("utf-8"))
+    fields = list(header["fields"])
+    float_fields = list(header.get("float_fields", []))
+
+    rows = _array("q")
+    rows.frombytes(data[header_len_end + header_len:])
+
+    if _byteorder == "big":
+        rows.byteswap()
+
+    field_count = len(fields)
+    columns = {}
+
+    for field_idx, field in enumerate(fields):
+        column = rows[field_idx::field_count]
+
+        if field in float_fields:
+            column = _array("d", column.tobytes())
+
+        columns[field] = column
+    # end for
+
+    sources = _load_lines(loc + bin_sources_suffix)
+    locations = _load_lines(loc + bin_locations_suffix)
+
+    result = BinManifest(columns, sources, locations)
+    return result
+
+
+def load_manifest(loc):
+    """Loads a manifest of any supported format as a list of records.
+
+    Args:
+        loc: the manifest location
+
+    Returns:
+        result: the records, a list of dicts; the values loaded from a CSV manifest are strings
+    """
+    loc = str(loc)
+
+    manifest_format = find_format(loc)
+    result = []
+
+    if manifest_format == "jsonl":
+        for line in _load_lines(loc):
+            if len(line) > 0:
+                result.append(_jsonloads(line))
+        # end for
+    elif manifest_format == "csv":
+        file = open(loc, "r", encoding="utf-8", newline="")
+
+        for row in _DictReader(file):
+            result.append(dict(row))
+        # end for
+
+        file.close()
+    else:  # elif manifest_format == "bin":
+        manifest = load_bin_manifest(loc)
+
+        for idx in range(len(manifest)):
+            result.append(manifest.record(idx))
+        # end for
+    # end if
+
+    return result
@@ -0,0 +1,281 @@
+"""Masks.
+
+Mask-guided crop box checks and position samplers.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import array
+import math
+import random
+
+from PIL import Image as pil_image
+
+from aidesign_widgets.libs import integrals
+
+# Aliases
+
+_array = array.array
+_ceil = math.ceil
+_from_image = integrals.from_image
+_pil_image = pil_image
+
+# -
+
+alpha_mask_loc = "alpha"
+"""The mask location that means the alpha channel of the image."""
+image_name_tag = "{image_name}"
+"""The tag in a mask location that gets replaced with the image name."""
+
+
+def find_mask_loc(mask_loc, image_name):
+    """Finds the mask location of an image.
+
+    Args:
+        mask_loc: the mask location, which may have the image_name_tag
+        image_name: the image name, without the extension
+
+    Returns:
+        result: the mask location
+    """
+    mask_loc = str(mask_loc)
+    image_name = str(image_name)
+
+    result = mask_loc.replace(image_name_tag, image_name)
+    return result
+
+
+def load_mask(image, mask_loc, box=None, source_size=None):
+    """Loads the mask of an image.
+
+    Args:
+        image: the PIL image
+        mask_loc: the mask location, or alpha_mask_loc to use the alpha channel of the image
+        box: the box of the image in its source image, (left, upper, right, lower), if the image is a region of the
+            source image that the mask covers; or None
+        source_size: the source image size, (width, height), if the box is not None
+
+    Returns:
+        result: the mask, an "L" mode PIL image that has the image size
+    """
+    image: _pil_image.Image = image
+    mask_loc = str(mask_loc)
+
+    if mask_loc == alpha_mask_loc:
+        if "A" not in image.getbands():
+            raise ValueError(f"Image has no alpha channel; Bands: {image.getbands()}")
+
+        result = image.getchannel("A")
+    else:
+        result = _pil_image.open(mask_loc).convert("L")
+    # end if
+
+    if box is not None and mask_loc != alpha_mask_loc:
+        # Only resample the mask pixels of the region
+        scale_x = result.width / source_size[0]
+        scale_y = result.height / source_size[1]
+        left, upper, right, lower = box
+        mask_box = (left * scale_x, upper * scale_y, right * scale_x, lower * scale_y)
+        result = result.resize(image.size, resample=_pil_image.NEAREST, box=mask_box)
+    elif result.size != image.size:
+        result = result.resize(image.size, resample=_pil_image.NEAREST)
+    # end if
+
+    return result
+
+
+class MaskIndex:
+    """Mask index.
+
+    Computes the integral image of the binarized mask once, so that the mask coverage of any box takes 4 lookups.
+    With a map resolution, the integral image comes from the binarized mask reduced to that resolution, where each map
+        pixel keeps the covered fraction of its image pixels; the boxes are scaled to the map for the lookups.
+    Also keeps the valid positions on a lattice, so that the random draws only pick among the valid positions, with no
+        blind rejection loops.
+    """
+
+    def __init__(self, mask, crop_res, min_coverage=0.5, stride=None, threshold=128, map_res=256):
+        """Inits self with the given args.
+
+        Args:
+            mask: the mask, a PIL image; the first band is used
+            crop_res: the crop resolution
+            min_coverage: the min fraction of the box pixels that the mask covers
+            stride: the lattice stride of the valid positions, or None for max(crop_res // 16, 1)
+            threshold: the min mask value of a covered pixel
+            map_res: the max width and height of the coverage map the lookups come from, or None to use the full
+                resolution
+        """
+        mask: _pil_image.Image = mask
+        crop_res = int(crop_res)
+        min_coverage = float(min_coverage)
+
+        if stride is None:
+            stride = max(crop_res // 16, 1)
+
+        stride = max(int(stride), 1)
+        threshold = int(threshold)
+
+        if len(mask.getbands()) > 1:
+            mask = mask.getchannel(0)
+
+        width, height = mask.size
+
+        if map_res is None:
+            scale = 1
+        else:
+            scale = max(_ceil(max(width, height) / int(map_res)), 1)
+        # end if
+
+        binary = mask.convert("L").point([255 if val >= threshold else 0 for val in range(256)])
+
+        if scale > 1:
+            binary = binary.reduce(scale)
+
+        self.crop_res = crop_res
+        """Crop resolution."""
+        self.min_coverage = min_coverage
+        """Min mask coverage fraction."""
+        self.stride = stride
+        """Lattice stride of the valid positions."""
+        self.scale = scale
+        """Coverage map scale, the image pixel count per map pixel along each axis."""
+        self.rejected_count = 0
+        """Rejected box count."""
+
+        self._sums = _from_image(binary)
+        self._max_pos_x = width - crop_res
+        self._max_pos_y = height - crop_res
+        self._valid_xs = None
+        self._valid_ys = None
+
+    def find_coverage(self, box):
+        """Finds the mask coverage of a box.
+
+        Args:
+            box: the box, (left, upper, right, lower)
+
+        Returns:
+            result: the fraction of the box pixels that the mask covers
+        """
+        covered, pixel_count = self._find_covered(box)
+
+        result = covered / pixel_count
+        return result
+
+    def _find_covered(self, box):
+        # Finds the covered pixel count and the pixel count of a box on the coverage map, in 255ths of a map pixel;
+        # The map box covers the whole box, so that a box that reaches past the mask edge never looks fully covered
+        left, upper, right, lower = box
+        scale = self.scale
+        left = left // scale
+        upper = upper // scale
+        right = max(_ceil(right / scale), left + 1)
+        lower = max(_ceil(lower / scale), upper + 1)
+
+        covered = self._sums.box_sum(left, upper, right, lower)
+        pixel_count = 255 * (right - left) * (lower - upper)
+        return covered, pixel_count
+
+    def _covers(self, pos_x, pos_y):
+        crop_res = self.crop_res
+        covered, pixel_count = self._find_covered((pos_x, pos_y, pos_x + crop_res, pos_y + crop_res))
+        result = covered >= self.min_coverage * pixel_count
+        return result
+
+    def check(self, box):
+        """Checks whether the mask covers enough of a box, and counts the box if it is rejected.
+
+        Args:
+            box: the box, (left, upper, right, lower)
+
+        Returns:
+            result: whether the box passes
+        """
+        covered, pixel_count = self._find_covered(box)
+        result = covered >= self.min_coverage * pixel_count
+
+        if not result:
+            self.rejected_count += 1
+
+        return result
+
+    def _find_valid(self):
+        if self._valid_xs is None:
+            valid_xs = _array("I")
+            valid_ys = _array("I")
+
+            if self._max_pos_x >= 0 and self._max_pos_y >= 0:
+                for pos_y in range(0, self._max_pos_y + 1, self.stride):
+                    for pos_x in range(0, self._max_pos_x + 1, self.stride):
+                        if self._covers(pos_x, pos_y):
+                            valid_xs.append(pos_x)
+                            valid_ys.append(pos_y)
+                        # end if
+                    # end for
+                # end for
+            # end if
+
+            self._valid_xs = valid_xs
+            self._valid_ys = valid_ys
+        # end if
+
+    def find_valid_count(self):
+        """Finds the count of the valid lattice positions.
+
+        Returns:
+            result: the count
+        """
+        self._find_valid()
+        result = len(self._valid_xs)
+        return result
+
+    def draw(self, rand, count):
+        """Draws some valid crop positions.
+
+        Picks the lattice positions uniformly, and jitters each within its lattice cell.
+        A jittered position that is not valid falls back to its lattice position, which is valid.
+
+        Args:
+            rand: the random.Random instance to use
+            count: the position count; 0 positions come out if there are no valid positions
+
+        Returns:
+            xs: the X positions, a list
+            ys: the Y positions, a list
+        """
+        rand: random.Random = rand
+        count = int(count)
+
+        self._find_valid()
+        valid_count = len(self._valid_xs)
+
+        if valid_count <= 0:
+            count = 0
+
+        xs = []
+        ys = []
+        stride = self.stride
+
+        for valid_idx in rand.choices(range(valid_count), k=count):
+            pos_x = self._valid_xs[valid_idx]
+            pos_y = self._valid_ys[valid_idx]
+
+            if stride > 1:
+                jitter_x = min(pos_x + rand.randrange(stride), self._max_pos_x)
+                jitter_y = min(pos_y + rand.randrange(stride), self._max_pos_y)
+
+                if self._covers(jitter_x, jitter_y):
+                    pos_x = jitter_x
+                    pos_y = jitter_y
+                # end if
+            # end if
+
+            xs.append(pos_x)
+            ys.append(pos_y)
+        # end for
+
+        return xs, ys
@@ -0,0 +1,208 @@
+"""Perceptual hashes.
+
+Difference hashes (dHashes) of crops, and an index for the near-duplicate queries of the hashes.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import itertools
+
+from PIL import Image as pil_image
+
+# Aliases
+
+_combinations = itertools.combinations
+_pil_image = pil_image
+
+# -
+
+
+def dhash(image, hash_size=8):
+    """Finds the difference hash of an image.
+
+    Shrinks the image to hash_size + 1 by hash_size grayscale pixels, and keeps 1 bit per horizontal neighbor pair,
+        which tells whether the left pixel is brighter than the right one.
+
+    Args:
+        image: the PIL image
+        hash_size: the hash size; the hash has hash_size * hash_size bits
+
+    Returns:
+        result: the hash, an int
+    """
+    image: _pil_image.Image = image
+    hash_size = int(hash_size)
+
+    small = image.convert("L").resize((hash_size + 1, hash_size), resample=_pil_image.BILINEAR)
+    vals = small.tobytes()
+    row_len = hash_size + 1
+    result = 0
+
+    for y in range(hash_size):
+        row = vals[y * row_len:(y + 1) * row_len]
+
+        for x in range(hash_size):
+            result = (result << 1) | (row[x] > row[x + 1])
+        # end for
+    # end for
+
+    return result
+
+
+def hamming_distance(hash1, hash2):
+    """Finds the Hamming distance between 2 hashes.
+
+    Args:
+        hash1: the 1st hash
+        hash2: the 2nd hash
+
+    Returns:
+        result: the count of the differing bits
+    """
+    result = bin(hash1 ^ hash2).count("1")
+    return result
+
+
+class HashIndex:
+    """Multi-index hash index.
+
+    Splits each hash into chunk_count chunks, and keeps 1 hash table per chunk position.
+    By the pigeonhole principle, a hash within max_distance bits of a query differs from the query by at most
+        max_distance // chunk_count bits in at least 1 chunk.
+    So, a query only probes the chunk values within that radius, and checks only the hashes in those buckets.
+    With the chunks long enough, the buckets stay small, which keeps each query sublinear in the hash count.
+    """
+
+    def __init__(self, max_distance, bit_count=64, chunk_count=None):
+        """Inits self with the given args.
+
+        Args:
+            max_distance: the max Hamming distance of a near duplicate
+            bit_count: the bit count of each hash
+            chunk_count: the chunk count, or None for about 21 bits per chunk, which suits millions of hashes
+        """
+        max_distance = int(max_distance)
+        bit_count = int(bit_count)
+
+        if chunk_count is None:
+            chunk_count = bit_count // 21
+
+        chunk_count = int(chunk_count)
+
+        if max_distance < 0:
+            max_distance = 0
+
+        chunk_count = min(max(chunk_count, 1), bit_count)
+
+        self.max_distance = max_distance
+        """Max Hamming distance of a near duplicate."""
+        self.count = 0
+        """Added hash count."""
+        self.duplicate_count = 0
+        """Found near duplicate count."""
+
+        self._radius = max_distance // chunk_count
+        self._chunk_shapes = []
+        shift = 0
+
+        for chunk_idx in range(chunk_count):
+            chunk_bit_count = bit_count // chunk_count + int(chunk_idx < bit_count % chunk_count)
+            self._chunk_shapes.append((shift, chunk_bit_count))
+            shift += chunk_bit_count
+        # end for
+
+        self._flip_masks = []
+
+        for shift, chunk_bit_count in self._chunk_shapes:
+            masks = []
+
+            for flip_count in range(self._radius + 1):
+                for bit_idxs in _combinations(range(chunk_bit_count), flip_count):
+                    mask = 0
+
+                    for bit_idx in bit_idxs:
+                        mask |= 1 << bit_idx
+                    # end for
+
+                    masks.append(mask)
+                # end for
+            # end for
+
+            self._flip_masks.append(masks)
+        # end for
+
+        self._tables: list[dict[int, list[int]]] = [{} for _ in range(chunk_count)]
+
+    def _find_chunks(self, hash_val):
+        result = [(hash_val >> shift) & ((1 << chunk_bit_count) - 1) for shift, chunk_bit_count in self._chunk_shapes]
+        return result
+
+    def find_near(self, hash_val):
+        """Finds an added hash within the max distance of a hash.
+
+        Args:
+            hash_val: the hash
+
+        Returns:
+            result: the near hash, or None if there is not any
+        """
+        chunks = self._find_chunks(hash_val)
+        result = None
+
+        for table, chunk, masks in zip(self._tables, chunks, self._flip_masks):
+            for mask in masks:
+                bucket = table.get(chunk ^ mask)
+
+                if bucket is None:
+                    continue
+
+                for other in bucket:
+                    if hamming_distance(hash_val, other) <= self.max_distance:
+                        result = other
+                        return result
+                    # end if
+                # end for
+            # end for
+        # end for
+
+        return result
+
+    def add(self, hash_val):
+        """Adds a hash.
+
+        Args:
+            hash_val: the hash
+        """
+        chunks = self._find_chunks(hash_val)
+
+        for table, chunk in zip(self._tables, chunks):
+            if chunk in table:
+                table[chunk].append(hash_val)
+            else:
+                table[chunk] = [hash_val]
+            # end if
+        # end for
+
+        self.count += 1
+
+    def check_and_add(self, hash_val):
+        """Checks whether a hash is new, and adds it if so.
+
+        Args:
+            hash_val: the hash
+
+        Returns:
+            result: True if the hash is new; False if it is a near duplicate, which is counted but not added
+        """
+        if self.find_near(hash_val) is None:
+            self.add(hash_val)
+            result = True
+        else:
+            self.duplicate_count += 1
+            result = False
+        # end if
+
+        return result
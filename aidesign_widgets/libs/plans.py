@@ -0,0 +1,563 @@
+"""Crop plans.
+
+A crop plan holds the crop boxes and variants of one or more sources in compact arrays, without any pixels.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import array
+import math
+import random
+import sys
+
+from aidesign_widgets.libs import samplers
+
+# Aliases
+
+_array = array.array
+_exp = math.exp
+_log = math.log
+_maxsize = sys.maxsize
+_Random = random.Random
+_sample_spaced_positions = samplers.sample_spaced_positions
+_sample_unique = samplers.sample_unique
+
+# -
+
+supported_flips = ["", "x", "y", "xy"]
+"""Supported flips."""
+supported_rots = ["", "180"]
+"""Supported rotations."""
+
+
+def find_variant(flip, rot):
+    """Finds the variant code of a flip and rotation combination.
+
+    Args:
+        flip: the flip, one of supported_flips
+        rot: the rotation, one of supported_rots
+
+    Returns:
+        result: the variant code
+    """
+    flip = str(flip)
+    rot = str(rot)
+
+    result = supported_flips.index(flip) * len(supported_rots) + supported_rots.index(rot)
+    return result
+
+
+def find_flip_rot(variant):
+    """Finds the flip and rotation combination of a variant code.
+
+    Args:
+        variant: the variant code
+
+    Returns:
+        flip: the flip, one of supported_flips
+        rot: the rotation, one of supported_rots
+    """
+    variant = int(variant)
+
+    flip_idx, rot_idx = divmod(variant, len(supported_rots))
+    flip = supported_flips[flip_idx]
+    rot = supported_rots[rot_idx]
+    return flip, rot
+
+
+class CropPlan:
+    """Crop plan.
+
+    Holds the source index, the original index, the X and Y positions, the size, and the variant code of each crop in
+        compact arrays.
+    """
+
+    def __init__(self):
+        """Inits self."""
+        self.source_idxs = _array("I")
+        """Source indices."""
+        self.idxs = _array("I")
+        """Original indices, like the grid order or the random draw order."""
+        self.xs = _array("I")
+        """X positions."""
+        self.ys = _array("I")
+        """Y positions."""
+        self.sizes = _array("I")
+        """Crop sizes."""
+        self.variants = _array("B")
+        """Variant codes."""
+
+    def __len__(self):
+        """Finds the crop count.
+
+        Returns:
+            result: the crop count
+        """
+        result = len(self.xs)
+        return result
+
+    def append(self, source_idx, idx, x, y, size, variant):
+        """Appends a crop.
+
+        Args:
+            source_idx: the source index
+            idx: the original index
+            x: the X position
+            y: the Y position
+            size: the crop size
+            variant: the variant code
+        """
+        self.source_idxs.append(source_idx)
+        self.idxs.append(idx)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.sizes.append(size)
+        self.variants.append(variant)
+
+    def extend(self, source_idxs, idxs, xs, ys, sizes, variants):
+        """Appends some crops, given as columns.
+
+        Args:
+            source_idxs: the source indices
+            idxs: the original indices
+            xs: the X positions
+            ys: the Y positions
+            sizes: the crop sizes
+            variants: the variant codes
+        """
+        self.source_idxs.extend(source_idxs)
+        self.idxs.extend(idxs)
+        self.xs.extend(xs)
+        self.ys.extend(ys)
+        self.sizes.extend(sizes)
+        self.variants.extend(variants)
+
+    def sort_row_major(self, start=0):
+        """Sorts some crops into the row-major order of their boxes.
+
+        The crops are sorted by source index, then by Y position, then by X position.
+        Crops with the same box keep their relative order.
+
+        Args:
+            start: the index of the first crop to sort; the crops before it keep their places
+        """
+        start = int(start)
+
+        source_idxs = self.source_idxs
+        xs = self.xs
+        ys = self.ys
+        order = sorted(range(start, len(xs)), key=lambda idx: (source_idxs[idx], ys[idx], xs[idx]))
+
+        for column in (self.source_idxs, self.idxs, self.xs, self.ys, self.sizes, self.variants):
+            column[start:] = _array(column.typecode, [column[idx] for idx in order])
+        # end for
+
+    def find_meta(self, plan_idx):
+        """Finds the metadata of a crop.
+
+        Args:
+            plan_idx: the index of the crop in this plan
+
+        Returns:
+            result: the metadata, a dict that has the "source_index", "index", "x", "y", "width", "height", "flip",
+                and "rotation" keys
+        """
+        plan_idx = int(plan_idx)
+
+        flip, rot = find_flip_rot(self.variants[plan_idx])
+        size = self.sizes[plan_idx]
+
+        if rot == "":
+            rot_deg = 0
+        else:
+            rot_deg = int(rot)
+        # end if
+
+        result = {
+            "source_index": self.source_idxs[plan_idx],
+            "index": self.idxs[plan_idx],
+            "x": self.xs[plan_idx],
+            "y": self.ys[plan_idx],
+            "width": size,
+            "height": size,
+            "flip": flip,
+            "rotation": rot_deg
+        }
+
+        return result
+
+
+def find_stride(stride, crop_res):
+    """Finds a grid stride.
+
+    Args:
+        stride: the stride, or None for the crop resolution
+        crop_res: the crop resolution
+
+    Returns:
+        result: the stride, at least 1
+    """
+    if stride is None:
+        stride = crop_res
+
+    result = max(int(stride), 1)
+    return result
+
+
+def plan_grid_crops(
+    width, height, crop_res, start_pos_x=0, start_pos_y=0, max_crop_count_x=None, max_crop_count_y=None, flips=None,
+    rots=None, source_idx=0, plan=None, stride_x=None, stride_y=None
+):
+    """Plans the grid crops of an image.
+
+    With the strides less than the crop resolution, the neighbor crops overlap, like sliding windows.
+
+    Args:
+        width: the image width
+        height: the image height
+        crop_res: the crop resolution
+        start_pos_x: the X-axis start position
+        start_pos_y: the Y-axis start position
+        max_crop_count_x: the X-axis max crop count, or None for no limit
+        max_crop_count_y: the Y-axis max crop count, or None for no limit
+        flips: the flips, a list of supported_flips items, or None for [""]
+        rots: the rotations, a list of supported_rots items, or None for [""]
+        source_idx: the source index
+        plan: the plan to append to, or None to create one
+        stride_x: the X-axis stride, or None for the crop resolution
+        stride_y: the Y-axis stride, or None for the crop resolution
+
+    Returns:
+        result: the plan
+    """
+    width = int(width)
+    height = int(height)
+    crop_res = int(crop_res)
+    start_pos_x = int(start_pos_x)
+    start_pos_y = int(start_pos_y)
+    stride_x = find_stride(stride_x, crop_res)
+    stride_y = find_stride(stride_y, crop_res)
+
+    if max_crop_count_x is None:
+        max_crop_count_x = _maxsize
+
+    if max_crop_count_y is None:
+        max_crop_count_y = _maxsize
+
+    if flips is None:
+        flips = [""]
+
+    if rots is None:
+        rots = [""]
+
+    source_idx = int(source_idx)
+
+    if plan is None:
+        plan = CropPlan()
+
+    plan: CropPlan
+    variants = [find_variant(flip, rot) for flip in flips for rot in rots]
+
+    idx = 0
+    count_y = 0
+    pos_y = start_pos_y
+
+    while count_y < max_crop_count_y and pos_y + crop_res <= height:
+        count_x = 0
+        pos_x = start_pos_x
+
+        while count_x < max_crop_count_x and pos_x + crop_res <= width:
+            for variant in variants:
+                plan.append(source_idx, idx, pos_x, pos_y, crop_res, variant)
+                idx += 1
+            # end for
+
+            count_x += 1
+            pos_x += stride_x
+        # end while
+
+        count_y += 1
+        pos_y += stride_y
+    # end while
+
+    result = plan
+    return result
+
+
+def find_rand_space_size(width, height, crop_res, flips=None, rots=None):
+    """Finds the count of the distinct random crops of an image.
+
+    Args:
+        width: the image width
+        height: the image height
+        crop_res: the crop resolution
+        flips: the flips to pick from, a list of supported_flips items, or None for [""]
+        rots: the rotations to pick from, a list of supported_rots items, or None for [""]
+
+    Returns:
+        result: the count of the distinct (X position, Y position, flip, rotation) combinations
+    """
+    width = int(width)
+    height = int(height)
+    crop_res = int(crop_res)
+
+    if flips is None:
+        flips = [""]
+
+    if rots is None:
+        rots = [""]
+
+    pos_count_x = max(width - crop_res + 1, 0)
+    pos_count_y = max(height - crop_res + 1, 0)
+
+    result = pos_count_x * pos_count_y * len(flips) * len(rots)
+    return result
+
+
+def allocate_counts(weights, total_count):
+    """Allocates a total count in proportion to some weights.
+
+    Uses the largest remainder method, so the counts always sum to the total count, unless all the weights are 0.
+
+    Args:
+        weights: the weights, a list of non-negative numbers
+        total_count: the total count
+
+    Returns:
+        result: the counts, a list of ints; the ties of the remainders go to the earlier items
+    """
+    weights = [max(float(weight), float(0)) for weight in weights]
+    total_count = abs(int(total_count))
+
+    weight_sum = sum(weights)
+
+    if weight_sum <= 0:
+        result = [0] * len(weights)
+        return result
+
+    shares = [weight * total_count / weight_sum for weight in weights]
+    result = [int(share) for share in shares]
+    remainders = sorted(range(len(shares)), key=lambda idx: result[idx] - shares[idx])
+
+    for idx in remainders[:total_count - sum(result)]:
+        result[idx] += 1
+
+    return result
+
+
+def find_scale_range(scale_range):
+    """Finds a window scale range.
+
+    Args:
+        scale_range: the (min scale, max scale) range, or None
+
+    Returns:
+        result: the range, a (min scale, max scale) tuple of positive floats; or None
+    """
+    if scale_range is None:
+        result = None
+    else:
+        min_scale, max_scale = [float(scale) for scale in scale_range]
+
+        if min_scale <= 0 or max_scale < min_scale:
+            raise ValueError(f"Scale range must be positive and in ascending order: {scale_range}")
+
+        result = (min_scale, max_scale)
+    # end if
+
+    return result
+
+
+def _jitter_sizes(rand, width, height, crop_res, xs, ys, variants, scale_range, unique=False, mask=None):
+    # The drawn crop_res windows already pass the unique and mask checks, so a jittered window that fails them falls
+    # back to its drawn window; a fallback window sits at its own drawn position, which no other window repeats
+    min_log = _log(scale_range[0])
+    max_log = _log(scale_range[1])
+    max_size = min(width, height)
+    sizes = []
+    jittered_xs = []
+    jittered_ys = []
+    windows = set()
+
+    for pos_x, pos_y, variant in zip(xs, ys, variants):
+        size = round(crop_res * _exp(rand.uniform(min_log, max_log)))
+        size = min(max(size, 1), max_size)
+
+        # Keep the center of the drawn crop_res window
+        offset = (crop_res - size) // 2
+        jittered_x = min(max(pos_x + offset, 0), width - size)
+        jittered_y = min(max(pos_y + offset, 0), height - size)
+        window = (jittered_x, jittered_y, size, variant)
+
+        if unique and window in windows:
+            passed = False
+        elif mask is not None:
+            box = (jittered_x, jittered_y, jittered_x + size, jittered_y + size)
+            passed = mask.find_coverage(box) >= mask.min_coverage
+        else:
+            passed = True
+        # end if
+
+        if not passed:
+            jittered_x, jittered_y, size = pos_x, pos_y, crop_res
+            window = (pos_x, pos_y, crop_res, variant)
+        # end if
+
+        windows.add(window)
+        jittered_xs.append(jittered_x)
+        jittered_ys.append(jittered_y)
+        sizes.append(size)
+    # end for
+
+    return jittered_xs, jittered_ys, sizes
+
+
+def plan_rand_crops(
+    width, height, crop_res, crop_count, rand=None, flips=None, rots=None, source_idx=0, plan=None, row_major=True,
+    unique=False, min_distance=0, max_overlap=None, importance=None, mask=None, scale_range=None
+):
+    """Plans the random crops of an image.
+
+    All the positions and variants are drawn up front, one batched draw per column.
+    The original indices keep the draw order.
+
+    Args:
+        width: the image width
+        height: the image height
+        crop_res: the crop resolution
+        crop_count: the crop count
+        rand: the random.Random instance to use, or None to create one with an automatic seed
+        flips: the flips to pick from, a list of supported_flips items, or None for [""]
+        rots: the rotations to pick from, a list of supported_rots items, or None for [""]
+        source_idx: the source index
+        plan: the plan to append to, or None to create one
+        row_major: whether to sort the new crops into the row-major order of their boxes
+        unique: whether to draw without replacement from the distinct (X position, Y position, flip, rotation)
+            combinations; if so, the crop count is clamped to find_rand_space_size
+        min_distance: the min Euclidean distance between 2 crop positions
+        max_overlap: the max intersection area of 2 crops, as a fraction of the crop area; or None for no limit
+            If min_distance is positive or max_overlap is not None, the positions come from
+            samplers.sample_spaced_positions, which may plan fewer crops than the crop count when the constraints
+            saturate; unique is then ignored.
+        importance: the samplers.ImportanceSampler to draw the positions with, or None to draw them uniformly;
+            ignored if unique takes effect
+        mask: the masks.MaskIndex to draw the positions with, or None; if not None, only the valid positions of the
+            mask are drawn, and importance and unique are ignored
+        scale_range: the (min scale, max scale) range of the window sizes, as multiples of the crop resolution; or
+            None to keep the crop resolution
+            The scales are drawn log-uniformly, 1 per crop, after the positions.
+            Each window keeps the center of its drawn crop resolution window, and is clamped into the image.
+            A window that repeats an earlier window while unique takes effect, or that the mask does not cover
+                enough, keeps its drawn crop resolution window instead.
+            min_distance and max_overlap apply to the drawn crop resolution windows only.
+
+    Returns:
+        result: the plan
+    """
+    width = int(width)
+    height = int(height)
+    crop_res = int(crop_res)
+    crop_count = int(crop_count)
+
+    if rand is None:
+        rand = _Random()
+
+    rand: random.Random
+
+    if flips is None:
+        flips = [""]
+
+    if rots is None:
+        rots = [""]
+
+    source_idx = int(source_idx)
+
+    if plan is None:
+        plan = CropPlan()
+
+    plan: CropPlan
+    row_major = bool(row_major)
+    unique = bool(unique)
+    min_distance = float(min_distance)
+
+    if max_overlap is not None:
+        max_overlap = float(max_overlap)
+
+    scale_range = find_scale_range(scale_range)
+
+    # max_pos_x and max_pos_y are inclusive
+    max_pos_x = width - crop_res
+    max_pos_y = height - crop_res
+
+    if max_pos_x < 0 or max_pos_y < 0:
+        crop_count = 0
+
+    start = len(plan)
+
+    if mask is not None:
+        drawer = mask
+    else:
+        drawer = importance
+    # end if
+
+    if min_distance > 0 or max_overlap is not None:
+        xs, ys = _sample_spaced_positions(
+            rand, max_pos_x, max_pos_y, crop_count, crop_res, min_distance, max_overlap, drawer=drawer
+        )
+
+        crop_count = len(xs)
+        flip_picks = rand.choices(flips, k=crop_count)
+        rot_picks = rand.choices(rots, k=crop_count)
+        variants = [find_variant(flip, rot) for flip, rot in zip(flip_picks, rot_picks)]
+    elif unique and mask is None:
+        variants_by_code = [find_variant(flip, rot) for flip in flips for rot in rots]
+        variant_count = len(variants_by_code)
+        pos_count_x = max_pos_x + 1
+        space_size = find_rand_space_size(width, height, crop_res, flips, rots)
+        codes = _sample_unique(rand, space_size, crop_count)
+        crop_count = len(codes)
+
+        xs = []
+        ys = []
+        variants = []
+
+        for code in codes:
+            pos_code, variant_code = divmod(code, variant_count)
+            pos_y, pos_x = divmod(pos_code, pos_count_x)
+            xs.append(pos_x)
+            ys.append(pos_y)
+            variants.append(variants_by_code[variant_code])
+        # end for
+    else:
+        if drawer is None:
+            xs = rand.choices(range(max_pos_x + 1), k=crop_count)
+            ys = rand.choices(range(max_pos_y + 1), k=crop_count)
+        else:
+            xs, ys = drawer.draw(rand, crop_count)
+            crop_count = len(xs)
+        # end if
+
+        flip_picks = rand.choices(flips, k=crop_count)
+        rot_picks = rand.choices(rots, k=crop_count)
+        variants = [find_variant(flip, rot) for flip, rot in zip(flip_picks, rot_picks)]
+    # end if
+
+    if scale_range is None:
+        sizes = [crop_res] * crop_count
+    else:
+        unique_windows = unique and mask is None and min_distance <= 0 and max_overlap is None
+        xs, ys, sizes = _jitter_sizes(
+            rand, width, height, crop_res, xs, ys, variants, scale_range, unique=unique_windows, mask=mask
+        )
+    # end if
+
+    plan.extend([source_idx] * crop_count, range(crop_count), xs, ys, sizes, variants)
+
+    if row_major:
+        plan.sort_row_major(start)
+
+    result = plan
+    return result
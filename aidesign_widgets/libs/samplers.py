@@ -0,0 +1,356 @@
+"""Samplers.
+
+Random samplers for picking crop positions.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import itertools
+import math
+import random
+
+from PIL import Image as pil_image
+from PIL import ImageFilter as pil_image_filter
+
+from aidesign_widgets.libs import integrals
+
+# Aliases
+
+_accumulate = itertools.accumulate
+_ceil = math.ceil
+_FIND_EDGES = pil_image_filter.FIND_EDGES
+_from_image = integrals.from_image
+_pil_image = pil_image
+
+# -
+
+supported_importance_modes = ["edges", "variance"]
+"""Supported importance sampling modes.
+
+"edges": scores a crop window by the sum of its edge responses.
+"variance": scores a crop window by its luminance variance.
+"""
+
+
+def sample_unique(rand, population_size, count):
+    """Samples some distinct integers in [0, population_size) without replacement.
+
+    Uses the Floyd algorithm, which keeps only the picked integers in memory, not the population.
+
+    Args:
+        rand: the random.Random instance to use
+        population_size: the population size
+        count: the sample count; clamped to the population size
+
+    Returns:
+        result: the picked integers, a list
+    """
+    rand: random.Random = rand
+    population_size = int(population_size)
+    count = int(count)
+
+    if count > population_size:
+        count = population_size
+
+    if count < 0:
+        count = 0
+
+    picked = set()
+    result = []
+
+    for upper in range(population_size - count, population_size):
+        val = rand.randint(0, upper)
+
+        if val in picked:
+            val = upper
+
+        picked.add(val)
+        result.append(val)
+    # end for
+
+    return result
+
+
+class SpatialHash:
+    """Spatial hash grid of points.
+
+    Buckets the points by square cells, so that a nearness check only visits the 3 by 3 cells around a point.
+    """
+
+    def __init__(self, cell_size):
+        """Inits self with the given args.
+
+        Args:
+            cell_size: the cell size; the nearness checks must not reach beyond it
+        """
+        cell_size = int(cell_size)
+
+        if cell_size < 1:
+            cell_size = 1
+
+        self.cell_size = cell_size
+        """Cell size."""
+        self._cells: dict[tuple[int, int], list[tuple[int, int]]] = {}
+
+    def add(self, x, y):
+        """Adds a point.
+
+        Args:
+            x: the X position
+            y: the Y position
+        """
+        key = (x // self.cell_size, y // self.cell_size)
+
+        if key in self._cells:
+            self._cells[key].append((x, y))
+        else:
+            self._cells[key] = [(x, y)]
+        # end if
+
+    def iter_near(self, x, y):
+        """Iterates through the points in the 3 by 3 cells around a position.
+
+        Args:
+            x: the X position
+            y: the Y position
+
+        Yields:
+            point: the X and Y positions of a point
+        """
+        cell_x = x // self.cell_size
+        cell_y = y // self.cell_size
+
+        for key_y in range(cell_y - 1, cell_y + 2):
+            for key_x in range(cell_x - 1, cell_x + 2):
+                key = (key_x, key_y)
+
+                if key in self._cells:
+                    yield from self._cells[key]
+            # end for
+        # end for
+
+
+def sample_spaced_positions(
+    rand, max_pos_x, max_pos_y, count, crop_res, min_distance=0, max_overlap=None, max_misses=1024, drawer=None
+):
+    """Samples some crop positions that keep a min distance and a max overlap between each other.
+
+    Uses dart throwing, with the accepted positions kept in a spatial hash grid.
+    Each candidate is checked against the nearby accepted positions only, which takes O(1) expected time.
+    The sampling stops early when the constraints saturate, that is, when max_misses candidates in a row are rejected.
+
+    Args:
+        rand: the random.Random instance to use
+        max_pos_x: the inclusive max X position
+        max_pos_y: the inclusive max Y position
+        count: the position count
+        crop_res: the crop resolution
+        min_distance: the min Euclidean distance between 2 positions
+        max_overlap: the max intersection area of 2 crops, as a fraction of the crop area; or None for no limit
+        max_misses: the max count of the rejected candidates in a row
+        drawer: the sampler to draw the candidates with, like an ImportanceSampler or a masks.MaskIndex; or None to
+            draw them uniformly
+
+    Returns:
+        xs: the X positions, a list
+        ys: the Y positions, a list
+    """
+    rand: random.Random = rand
+    max_pos_x = int(max_pos_x)
+    max_pos_y = int(max_pos_y)
+    count = int(count)
+    crop_res = int(crop_res)
+    min_distance = float(min_distance)
+
+    if max_overlap is not None:
+        max_overlap = float(max_overlap)
+
+    max_misses = int(max_misses)
+
+    reach = min_distance
+
+    if max_overlap is not None and max_overlap < 1:
+        reach = max(reach, crop_res)
+
+    min_distance_sq = min_distance * min_distance
+    max_inter_area = None
+
+    if max_overlap is not None:
+        max_inter_area = max_overlap * crop_res * crop_res
+
+    grid = SpatialHash(int(reach) + 1)
+    xs = []
+    ys = []
+    misses = 0
+
+    while len(xs) < count and misses < max_misses and max_pos_x >= 0 and max_pos_y >= 0:
+        if drawer is None:
+            x = rand.randint(0, max_pos_x)
+            y = rand.randint(0, max_pos_y)
+        else:
+            drawn_xs, drawn_ys = drawer.draw(rand, 1)
+
+            if len(drawn_xs) <= 0:
+                break
+
+            x = drawn_xs[0]
+            y = drawn_ys[0]
+        # end if
+
+        accepted = True
+
+        for near_x, near_y in grid.iter_near(x, y):
+            dx = abs(x - near_x)
+            dy = abs(y - near_y)
+
+            if dx * dx + dy * dy < min_distance_sq:
+                accepted = False
+                break
+
+            if max_inter_area is not None and dx < crop_res and dy < crop_res:
+                if (crop_res - dx) * (crop_res - dy) > max_inter_area:
+                    accepted = False
+                    break
+            # end if
+        # end for
+
+        if accepted:
+            grid.add(x, y)
+            xs.append(x)
+            ys.append(y)
+            misses = 0
+        else:
+            misses += 1
+        # end if
+    # end while
+
+    return xs, ys
+
+
+class ImportanceSampler:
+    """Importance sampler of crop positions.
+
+    Computes a downsampled detail map of an image and its summed-area tables once.
+    Then, scores every crop window of the map in O(1) time each, and draws the positions in proportion to the scores
+        through a cumulative distribution lookup.
+    """
+
+    def __init__(self, image, crop_res, mode="edges", map_res=256):
+        """Inits self with the given args.
+
+        Args:
+            image: the PIL image
+            crop_res: the crop resolution
+            mode: the importance mode, one of supported_importance_modes
+            map_res: the max width and height of the detail map
+        """
+        image: _pil_image.Image = image
+        crop_res = int(crop_res)
+        mode = str(mode)
+        map_res = int(map_res)
+
+        if mode not in supported_importance_modes:
+            raise ValueError(f"Unsupported importance mode: {mode}; Supported: {supported_importance_modes}")
+
+        if map_res < 1:
+            map_res = 1
+
+        width, height = image.size
+        scale = max(_ceil(max(width, height) / map_res), 1)
+        gray = image.convert("L")
+
+        if scale > 1:
+            gray = gray.reduce(scale)
+
+        map_width, map_height = gray.size
+        # Rounds up like MaskIndex, so that the map window covers the whole crop window
+        win = max(_ceil(crop_res / scale), 1)
+
+        self.scale = scale
+        """Detail map scale, the image pixel count per detail map pixel along each axis."""
+        self.max_pos_x = width - crop_res
+        """Inclusive max X position."""
+        self.max_pos_y = height - crop_res
+        """Inclusive max Y position."""
+        self.col_count = max(map_width - win + 1, 0)
+        """Crop window column count in the detail map."""
+        self.row_count = max(map_height - win + 1, 0)
+        """Crop window row count in the detail map."""
+
+        if self.max_pos_x < 0 or self.max_pos_y < 0:
+            self.col_count = 0
+            self.row_count = 0
+        # end if
+
+        if mode == "edges":
+            sums = _from_image(gray.filter(_FIND_EDGES))
+            sq_sums = None
+        else:  # elif mode == "variance":
+            sums = _from_image(gray)
+            sq_sums = _from_image(gray, squared=True)
+        # end if
+
+        pixel_count = win * win
+        scores = []
+
+        for row in range(self.row_count):
+            for col in range(self.col_count):
+                val_sum = sums.box_sum(col, row, col + win, row + win)
+
+                if sq_sums is None:
+                    score = val_sum
+                else:
+                    # pixel_count squared times the variance
+                    score = pixel_count * sq_sums.box_sum(col, row, col + win, row + win) - val_sum * val_sum
+                # end if
+
+                scores.append(score)
+            # end for
+        # end for
+
+        self.cum_scores = list(_accumulate(scores))
+        """Cumulative window scores, in row-major window order."""
+
+    def draw(self, rand, count):
+        """Draws some crop positions, in proportion to their window scores.
+
+        Falls back to uniform draws when all the windows score 0.
+
+        Args:
+            rand: the random.Random instance to use
+            count: the position count
+
+        Returns:
+            xs: the X positions, a list
+            ys: the Y positions, a list
+        """
+        rand: random.Random = rand
+        count = int(count)
+
+        window_count = len(self.cum_scores)
+
+        if window_count <= 0:
+            count = 0
+
+        if count > 0 and self.cum_scores[-1] > 0:
+            win_idxs = rand.choices(range(window_count), cum_weights=self.cum_scores, k=count)
+        else:
+            win_idxs = rand.choices(range(window_count), k=count)
+        # end if
+
+        xs = []
+        ys = []
+        scale = self.scale
+
+        for win_idx in win_idxs:
+            row, col = divmod(win_idx, self.col_count)
+            left = min(col * scale, self.max_pos_x)
+            upper = min(row * scale, self.max_pos_y)
+            xs.append(left + rand.randrange(min(scale, self.max_pos_x - left + 1)))
+            ys.append(upper + rand.randrange(min(scale, self.max_pos_y - upper + 1)))
+        # end for
+
+        return xs, ys
@@ -0,0 +1,264 @@
+"""Stats.
+
+Streaming crop statistics.
+The crop commands find the per-crop statistics while the crop pixels are in memory, and merge them into the dataset
+    statistics, so that the normalization and filtering steps need no extra read-decode pass over the saved crops.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import math
+import operator
+
+from PIL import Image as pil_image
+
+from aidesign_widgets.libs import utils
+
+# Aliases
+
+_add = operator.add
+_mul = operator.mul
+_pil_image = pil_image
+_save_json = utils.save_json
+_sqrt = math.sqrt
+
+# -
+
+_stat_modes = ["L", "LA", "RGB", "RGBA", "CMYK"]
+_luma_weights = {
+    "L": [1.0],
+    "LA": [1.0, 0.0],
+    "RGB": [0.299, 0.587, 0.114],
+    "RGBA": [0.299, 0.587, 0.114, 0.0]
+}
+_vals = list(range(256))
+_squares = [val * val for val in _vals]
+
+
+def merge_moments(count1, mean1, m2_1, count2, mean2, m2_2):
+    """Merges 2 sets of moments with the pairwise update of Chan et al., which stays numerically stable.
+
+    Args:
+        count1: the sample count of the 1st set
+        mean1: the mean of the 1st set
+        m2_1: the sum of the squared differences from the mean of the 1st set
+        count2: the sample count of the 2nd set
+        mean2: the mean of the 2nd set
+        m2_2: the sum of the squared differences from the mean of the 2nd set
+
+    Returns:
+        result: the merged count, mean, m2
+    """
+    count = count1 + count2
+
+    if count <= 0:
+        result = 0, float(0), float(0)
+        return result
+
+    delta = mean2 - mean1
+    mean = mean1 + delta * count2 / count
+    m2 = m2_1 + m2_2 + delta * delta * count1 * count2 / count
+
+    result = count, mean, m2
+    return result
+
+
+class _ModeStats:
+    def __init__(self, mode):
+        mode = str(mode)
+
+        bands = list(_pil_image.new(mode, (1, 1)).getbands())
+        band_count = len(bands)
+
+        self.mode = mode
+        self.bands = bands
+        self.crop_count = 0
+        self.pixel_count = 0
+        self.means = [float(0)] * band_count
+        self.m2s = [float(0)] * band_count
+        self.histogram = [0] * (256 * band_count)
+
+    def merge(self, other):
+        other: _ModeStats = other
+
+        for band_idx in range(len(self.bands)):
+            _, self.means[band_idx], self.m2s[band_idx] = merge_moments(
+                self.pixel_count, self.means[band_idx], self.m2s[band_idx],
+                other.pixel_count, other.means[band_idx], other.m2s[band_idx]
+            )
+        # end for
+
+        self.crop_count += other.crop_count
+        self.pixel_count += other.pixel_count
+        self.histogram = list(map(_add, self.histogram, other.histogram))
+
+    def to_dict(self):
+        if self.pixel_count > 0:
+            stds = [_sqrt(m2 / self.pixel_count) for m2 in self.m2s]
+        else:
+            stds = [float(0)] * len(self.bands)
+        # end if
+
+        histograms = [self.histogram[band_idx * 256: (band_idx + 1) * 256] for band_idx in range(len(self.bands))]
+
+        result = {
+            "bands": self.bands,
+            "crop_count": self.crop_count,
+            "pixel_count": self.pixel_count,
+            "mean": self.means,
+            "std": stds,
+            "histograms": histograms
+        }
+
+        return result
+
+
+class StatsAccumulator:
+    """Stats accumulator.
+
+    Accumulates the per-band pixel means, standard deviations, and histograms of the crops, for each crop mode; and
+        the brightness mean and standard deviation over the crops.
+    Each crop takes 1 PIL histogram pass; The accumulators merge with the pairwise update of Chan et al., so that the
+        accumulators of the parallel workers merge into the same result as a single pass.
+    """
+
+    def __init__(self):
+        """Inits self."""
+        self.crop_count = 0
+        """Accumulated crop count."""
+
+        self._brightness_mean = float(0)
+        self._brightness_m2 = float(0)
+        self._mode_stats = {}
+
+    def add(self, crop):
+        """Adds a crop.
+
+        Args:
+            crop: the crop, a PIL image
+
+        Returns:
+            result: the crop stats, a dict that has the "brightness", "mean", and "std" keys
+        """
+        crop: _pil_image.Image = crop
+
+        if crop.mode == "1":
+            crop = crop.convert("L")
+        elif crop.mode not in _stat_modes:
+            crop = crop.convert("RGB")
+        # end if
+
+        if crop.mode not in self._mode_stats:
+            self._mode_stats[crop.mode] = _ModeStats(crop.mode)
+
+        mode_stats: _ModeStats = self._mode_stats[crop.mode]
+        histogram = crop.histogram()
+        pixel_count = crop.width * crop.height
+        means = []
+        stds = []
+
+        for band_idx in range(len(mode_stats.bands)):
+            band_histogram = histogram[band_idx * 256: (band_idx + 1) * 256]
+
+            # The integer sums keep the per-crop moments exact
+            total = sum(map(_mul, _vals, band_histogram))
+            square_total = sum(map(_mul, _squares, band_histogram))
+
+            if pixel_count > 0:
+                mean = total / pixel_count
+                m2 = (pixel_count * square_total - total * total) / pixel_count
+            else:
+                mean = float(0)
+                m2 = float(0)
+            # end if
+
+            _, mode_stats.means[band_idx], mode_stats.m2s[band_idx] = merge_moments(
+                mode_stats.pixel_count, mode_stats.means[band_idx], mode_stats.m2s[band_idx], pixel_count, mean, m2
+            )
+
+            means.append(mean)
+            stds.append(_sqrt(m2 / pixel_count) if pixel_count > 0 else float(0))
+        # end for
+
+        mode_stats.crop_count += 1
+        mode_stats.pixel_count += pixel_count
+        mode_stats.histogram = list(map(_add, mode_stats.histogram, histogram))
+
+        if crop.mode in _luma_weights:
+            brightness = sum(map(_mul, _luma_weights[crop.mode], means))
+        else:
+            luma_histogram = crop.convert("L").histogram()
+            brightness = sum(map(_mul, _vals, luma_histogram)) / max(pixel_count, 1)
+        # end if
+
+        # Welford update of the brightness over the crops
+        self.crop_count += 1
+        delta = brightness - self._brightness_mean
+        self._brightness_mean += delta / self.crop_count
+        self._brightness_m2 += delta * (brightness - self._brightness_mean)
+
+        result = {
+            "brightness": brightness,
+            "mean": means,
+            "std": stds
+        }
+
+        return result
+
+    def merge(self, other):
+        """Merges the stats of another accumulator into self.
+
+        Args:
+            other: the other accumulator
+        """
+        other: StatsAccumulator = other
+
+        self.crop_count, self._brightness_mean, self._brightness_m2 = merge_moments(
+            self.crop_count, self._brightness_mean, self._brightness_m2,
+            other.crop_count, other._brightness_mean, other._brightness_m2
+        )
+
+        for mode in other._mode_stats:
+            if mode not in self._mode_stats:
+                self._mode_stats[mode] = _ModeStats(mode)
+
+            self._mode_stats[mode].merge(other._mode_stats[mode])
+        # end for
+
+    def to_dict(self):
+        """Finds the dataset stats.
+
+        Returns:
+            result: the dataset stats, a dict that has the "crop_count", "brightness", and "modes" keys
+        """
+        if self.crop_count > 0:
+            brightness_std = _sqrt(self._brightness_m2 / self.crop_count)
+        else:
+            brightness_std = float(0)
+        # end if
+
+        modes = {}
+
+        for mode in self._mode_stats:
+            modes[mode] = self._mode_stats[mode].to_dict()
+
+        result = {
+            "crop_count": self.crop_count,
+            "brightness": {"mean": self._brightness_mean, "std": brightness_std},
+            "modes": modes
+        }
+
+        return result
+
+    def save(self, loc):
+        """Saves the dataset stats to a JSON file.
+
+        Args:
+            loc: the JSON file location
+        """
+        loc = str(loc)
+
+        _save_json(self.to_dict(), loc)
@@ -0,0 +1,515 @@
+"""Stitches.
+
+Streaming reassembly of grid crops, or of the model outputs of grid crops, into a full image.
+The output is written band by band, so that the memory use depends on the output width and the band height, not on
+    the output height.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import array
+import concurrent.futures
+import os
+import re
+import struct
+import typing
+import zlib
+
+from os import path as ospath
+from PIL import Image as pil_image
+from PIL import ImageMath as pil_image_math
+
+from aidesign_widgets.libs import crops
+from aidesign_widgets.libs import manifests
+
+# Aliases
+
+_array = array.array
+_basename = ospath.basename
+_compressobj = zlib.compressobj
+_crc32 = zlib.crc32
+_deg_to_rot = crops.deg_to_rot
+_IO = typing.IO
+_join = ospath.join
+_lambda_eval = pil_image_math.lambda_eval
+_listdir = os.listdir
+_load_manifest = manifests.load_manifest
+_merge = pil_image.merge
+_pil_image = pil_image
+_re_compile = re.compile
+_resize_image = crops.resize_image
+_split_text = ospath.splitext
+_struct_pack = struct.pack
+_ThreadPoolExecutor = concurrent.futures.ThreadPoolExecutor
+
+# -
+
+supported_formats = ["png", "ppm"]
+"""Supported stitch output formats.
+
+Both formats are written as a stream of rows, so the full image is never held in memory.
+"ppm" writes a PGM file for the grayscale outputs.
+"""
+
+format_exts = {
+    "png": ".png",
+    "ppm": ".ppm"
+}
+"""Stitch output format file extensions."""
+
+crop_name_regex = _re_compile(
+    r"^(?P<image_name>.*?)(?:-Scale-(?P<scale>[0-9.]+))?-At-(?P<x>\d+)-(?P<y>\d+)-Crop-(?P<width>\d+)"
+    r"(?:-Resize-(?P<resize>\d+))?(?:-Flip-(?P<flip>[xy]+))?(?:-Rotation-(?P<rotation>\d*))?-Time-"
+)
+"""The regex that parses a grid crop name."""
+
+_png_signature = b"\x89PNG\r\n\x1a\n"
+_png_color_types = {"L": 0, "RGB": 2, "RGBA": 6}
+_ppm_magics = {"L": "P5", "RGB": "P6"}
+
+
+def parse_crop_name(name):
+    """Parses a grid crop name.
+
+    Args:
+        name: the crop name, with or without a folder and an extension
+
+    Returns:
+        result: the tile, a dict that has the "image_name", "x", "y", "width", "resize", "flip", "rotation", and
+            "scale" keys; or None if the name is not a grid crop name
+    """
+    name = _basename(str(name))
+
+    match = crop_name_regex.match(name)
+
+    if match is None:
+        result = None
+    else:
+        groups = match.groupdict()
+
+        result = {
+            "image_name": groups["image_name"],
+            "x": int(groups["x"]),
+            "y": int(groups["y"]),
+            "width": int(groups["width"]),
+            "resize": None if groups["resize"] is None else int(groups["resize"]),
+            "flip": groups["flip"] or "",
+            "rotation": int(groups["rotation"] or 0),
+            "scale": None if groups["scale"] is None else float(groups["scale"])
+        }
+    # end if
+
+    return result
+
+
+def find_name_tiles(path):
+    """Finds the tiles in a folder from their grid crop names.
+
+    The files whose names are not grid crop names, like the manifests and the label files, are skipped.
+
+    Args:
+        path: the folder path
+
+    Returns:
+        result: the tiles, a list of dicts like parse_crop_name returns, that also have the "location" key
+    """
+    path = str(path)
+
+    result = []
+
+    for name in sorted(_listdir(path)):
+        if _split_text(name)[1].lower() == ".json":
+            continue
+
+        tile = parse_crop_name(name)
+
+        if tile is not None:
+            tile["location"] = _join(path, name)
+            result.append(tile)
+        # end if
+    # end for
+
+    return result
+
+
+def _int_or_none(val):
+    if val is None or val == "":
+        result = None
+    else:
+        result = int(val)
+    # end if
+
+    return result
+
+
+def find_manifest_tiles(loc, input_path=None):
+    """Finds the tiles of a grid crop manifest.
+
+    Args:
+        loc: the manifest location
+        input_path: the folder of the tiles, like the model outputs of the crops, which keep the crop names but may
+            have other extensions; or None to use the manifest locations
+
+    Returns:
+        result: the tiles, a list of dicts like parse_crop_name returns, that also have the "location" key
+    """
+    loc = str(loc)
+
+    if input_path is not None:
+        input_path = str(input_path)
+        input_names = {}
+
+        for name in _listdir(input_path):
+            input_names[_split_text(name)[0]] = name
+        # end for
+    # end if
+
+    result = []
+
+    for record in _load_manifest(loc):
+        tile_loc = str(record["location"])
+
+        if input_path is not None:
+            stem = _split_text(_basename(tile_loc))[0]
+
+            if stem not in input_names:
+                raise FileNotFoundError(f"Cannot find the tile of crop {stem} in {input_path}")
+
+            tile_loc = _join(input_path, input_names[stem])
+        # end if
+
+        scale = record.get("scale")
+
+        if scale is None or scale == "":
+            # The older "bin" manifests keep no scale, but the crop names do
+            name_tile = parse_crop_name(record["location"])
+            scale = None if name_tile is None else name_tile["scale"]
+        # end if
+
+        tile = {
+            "image_name": _split_text(_basename(str(record["source"])))[0],
+            "x": int(record["x"]),
+            "y": int(record["y"]),
+            "width": int(record["width"]),
+            "resize": _int_or_none(record.get("resize")),
+            "flip": str(record.get("flip") or ""),
+            "rotation": int(record.get("rotation") or 0),
+            "scale": None if scale is None or scale == "" else float(scale),
+            "location": tile_loc
+        }
+
+        result.append(tile)
+    # end for
+
+    return result
+
+
+def select_tiles(tiles, image_name=None):
+    """Selects the tiles of 1 stitched image.
+
+    Keeps the tiles of the image name, and then the tiles of the largest scale and the largest resize resolution, as
+        the multi-scale and the multi-resolution grid crops hold several grids of the same image.
+
+    Args:
+        tiles: the tiles
+        image_name: the image name, or None if all the tiles come from 1 image
+
+    Returns:
+        result: the selected tiles, a new list
+    """
+    tiles = list(tiles)
+
+    if image_name is None:
+        image_names = sorted(set(tile["image_name"] for tile in tiles))
+
+        if len(image_names) > 1:
+            raise ValueError(f"Tiles come from {len(image_names)} images; Please pick 1 image name: {image_names}")
+    else:
+        image_name = str(image_name)
+        tiles = [tile for tile in tiles if tile["image_name"] == image_name]
+    # end if
+
+    if len(tiles) > 0:
+        max_scale = max(tile["scale"] or 1 for tile in tiles)
+        tiles = [tile for tile in tiles if (tile["scale"] or 1) == max_scale]
+
+        max_resize = max(tile["resize"] or tile["width"] for tile in tiles)
+        tiles = [tile for tile in tiles if tile["resize"] is None or tile["resize"] == max_resize]
+    # end if
+
+    result = tiles
+    return result
+
+
+def _find_stitch_mode(image_mode, out_format):
+    bands = _pil_image.getmodebands(image_mode)
+
+    if bands == 1 or image_mode == "LA":
+        result = "L"
+    elif "A" in image_mode and out_format == "png":
+        result = "RGBA"
+    else:
+        result = "RGB"
+    # end if
+
+    return result
+
+
+class StreamWriter:
+    """Stream writer of a stitched image.
+
+    Writes the image header up front, and then the pixel rows as they come, band by band.
+    """
+
+    def __init__(self, loc, out_format, width, height, mode, compress_level=6):
+        """Inits self with the given args.
+
+        Args:
+            loc: the output location
+            out_format: the output format, one of supported_formats
+            width: the image width
+            height: the image height
+            mode: the image mode, "L" or "RGB"; or "RGBA" for "png"
+            compress_level: the PNG zlib compress level
+        """
+        loc = str(loc)
+        out_format = str(out_format)
+        width = int(width)
+        height = int(height)
+        mode = str(mode)
+        compress_level = int(compress_level)
+
+        if out_format not in supported_formats:
+            raise ValueError(f"Unsupported stitch output format: {out_format}; Supported: {supported_formats}")
+
+        self.loc = loc
+        """Output location."""
+        self.out_format = out_format
+        """Output format."""
+        self.width = width
+        """Image width."""
+        self.height = height
+        """Image height."""
+        self.mode = mode
+        """Image mode."""
+        self.row_count = 0
+        """Written row count."""
+
+        self._file: _IO = open(loc, "wb")
+        self._row_bytes = width * _pil_image.getmodebands(mode)
+        self._compressor = None
+
+        if out_format == "png":
+            self._compressor = _compressobj(compress_level)
+            header = _struct_pack(">IIBBBBB", width, height, 8, _png_color_types[mode], 0, 0, 0)
+            self._file.write(_png_signature)
+            self._write_chunk(b"IHDR", header)
+        else:  # elif out_format == "ppm":
+            self._file.write(f"{_ppm_magics[mode]}\n{width} {height}\n255\n".encode("ascii"))
+        # end if
+
+    def _write_chunk(self, tag, data):
+        self._file.write(_struct_pack(">I", len(data)))
+        self._file.write(tag)
+        self._file.write(data)
+        self._file.write(_struct_pack(">I", _crc32(tag + data) & 0xFFFFFFFF))
+
+    def write(self, band):
+        """Writes the rows of a band.
+
+        Args:
+            band: the band, a PIL image that has the image width and mode
+        """
+        band: _pil_image.Image = band
+
+        data = band.tobytes()
+
+        if self.out_format == "png":
+            row_bytes = self._row_bytes
+            # Prefix each row with the PNG "None" filter type
+            rows = [b"\x00" + data[start:start + row_bytes] for start in range(0, len(data), row_bytes)]
+            compressed = self._compressor.compress(b"".join(rows))
+
+            if len(compressed) > 0:
+                self._write_chunk(b"IDAT", compressed)
+        else:  # elif self.out_format == "ppm":
+            self._file.write(data)
+        # end if
+
+        self.row_count += band.height
+
+    def close(self):
+        """Closes self."""
+        if self.row_count != self.height:
+            raise ValueError(f"Wrote {self.row_count} rows, but the image has {self.height} rows: {self.loc}")
+
+        if self.out_format == "png":
+            self._write_chunk(b"IDAT", self._compressor.flush())
+            self._write_chunk(b"IEND", b"")
+        # end if
+
+        self._file.close()
+
+
+def _make_weight(size):
+    # A tent that peaks at the tile center, so that the overlapping tiles fade into each other
+    ramp = _array("f", [min(idx + 1, size - idx) for idx in range(size)])
+    row = _pil_image.frombytes("F", (size, 1), ramp.tobytes()).resize((size, size), _pil_image.NEAREST)
+    col = _pil_image.frombytes("F", (1, size), ramp.tobytes()).resize((size, size), _pil_image.NEAREST)
+    result = _lambda_eval(lambda args: args["row"] * args["col"], row=row, col=col)
+    return result
+
+
+def _load_tile(loc, flip, rotation, size, mode, weight, resample):
+    """Returns channels, the weighted channels of a tile, a list of "F" mode PIL images."""
+    tile = _pil_image.open(loc)
+    tile = tile.convert(mode)
+
+    # Undo the crop flip and rotation
+    if _deg_to_rot(rotation) == "180":
+        tile = tile.transpose(_pil_image.ROTATE_180)
+
+    if "y" in flip:
+        tile = tile.transpose(_pil_image.FLIP_LEFT_RIGHT)
+
+    if "x" in flip:
+        tile = tile.transpose(_pil_image.FLIP_TOP_BOTTOM)
+
+    if tile.size != (size, size):
+        tile = _resize_image(tile, (size, size), resample)
+
+    channels = []
+
+    for channel in tile.split():
+        weighted = _lambda_eval(lambda args: args["channel"] * args["weight"], channel=channel, weight=weight)
+        channels.append(weighted)
+    # end for
+
+    return channels
+
+
+def iter_stitch_bands(
+    tiles, loc, out_format="png", band_height=None, worker_count=None, resample="bicubic", compress_level=6
+):
+    """Stitches some tiles into a full image, and writes it band by band.
+
+    Each tile goes back to its crop position, with its flip and rotation undone.
+    The tile scale is the tile size over the crop size, so that the resized crops and the model outputs that scale
+        the crops, like the super resolution outputs, stitch at their own resolution.
+    The overlapping tiles blend with tent weights that peak at the tile centers.
+    The sums and the weights of a band are held in "F" mode (32-bit float) images, 1 per channel.
+    The tiles are decoded in a thread pool, 1 band ahead of the band being blended, and each tile is released once the
+        bands pass it.
+
+    Args:
+        tiles: the tiles, a list of dicts that have the "location", "x", "y", "width", "flip", and "rotation" keys
+        loc: the output location
+        out_format: the output format, one of supported_formats
+        band_height: the band height, or None for the largest tile size
+        worker_count: the tile decoding thread count, or None for the default of concurrent.futures
+        resample: the resampling filter of the tiles that need a resize, one of crops.supported_resamples
+        compress_level: the PNG zlib compress level
+
+    Yields:
+        band_upper: the first row of the written band
+        band_lower: the row after the last row of the written band
+        height: the image height
+    """
+    tiles = list(tiles)
+    loc = str(loc)
+    out_format = str(out_format)
+
+    if len(tiles) <= 0:
+        raise ValueError("Cannot stitch 0 tiles")
+
+    first_tile = _pil_image.open(tiles[0]["location"])
+    mode = _find_stitch_mode(first_tile.mode, out_format)
+    tile_scale = first_tile.width / tiles[0]["width"]
+    first_tile.close()
+
+    placed = []
+
+    for tile in tiles:
+        size = max(round(tile["width"] * tile_scale), 1)
+        placed.append((round(tile["y"] * tile_scale), round(tile["x"] * tile_scale), size, tile))
+    # end for
+
+    placed.sort(key=lambda item: (item[0], item[1]))
+    width = max(left + size for _, left, size, _ in placed)
+    height = max(upper + size for upper, _, size, _ in placed)
+
+    if band_height is None:
+        band_height = max(size for _, _, size, _ in placed)
+
+    band_height = max(int(band_height), 1)
+
+    weights = {}
+
+    for _, _, size, _ in placed:
+        if size not in weights:
+            weights[size] = _make_weight(size)
+    # end for
+
+    writer = StreamWriter(loc, out_format, width, height, mode, compress_level)
+    executor = _ThreadPoolExecutor(worker_count)
+    next_idx = 0
+    active = []
+
+    try:
+        for band_upper in range(0, height, band_height):
+            band_lower = min(band_upper + band_height, height)
+
+            # Submit the tiles that reach into this band and the next one
+            while next_idx < len(placed) and placed[next_idx][0] < band_lower + band_height:
+                upper, left, size, tile = placed[next_idx]
+
+                future = executor.submit(
+                    _load_tile, tile["location"], tile["flip"], tile["rotation"], size, mode, weights[size], resample
+                )
+
+                active.append((upper, left, size, future))
+                next_idx += 1
+            # end while
+
+            band_size = (width, band_lower - band_upper)
+            sums = [_pil_image.new("F", band_size, 0) for _ in range(_pil_image.getmodebands(mode))]
+            weight_sum = _pil_image.new("F", band_size, 0)
+
+            for upper, left, size, future in active:
+                row_start = max(upper, band_upper)
+                row_end = min(upper + size, band_lower)
+
+                if row_end <= row_start:
+                    continue
+
+                tile_box = (0, row_start - upper, size, row_end - upper)
+                band_box = (left, row_start - band_upper, left + size, row_end - band_upper)
+                pieces = [channel.crop(tile_box) for channel in future.result()]
+                pieces.append(weights[size].crop(tile_box))
+
+                for acc, piece in zip(sums + [weight_sum], pieces):
+                    region = acc.crop(band_box)
+                    acc.paste(_lambda_eval(lambda args: args["a"] + args["b"], a=region, b=piece), band_box)
+                # end for
+            # end for
+
+            channels = []
+
+            for acc in sums:
+                # Round half up, as the "F" to "L" conversion truncates; the 0 weight pixels stay 0
+                channel = _lambda_eval(lambda args: args["a"] / args["w"] + 0.5, a=acc, w=weight_sum)
+                channels.append(channel.convert("L"))
+            # end for
+
+            writer.write(_merge(mode, channels))
+            active = [item for item in active if item[0] + item[2] > band_lower]
+            yield band_upper, band_lower, height
+        # end for
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    # end try
+
+    writer.close()
@@ -0,0 +1,323 @@
+"""Transforms.
+
+Batched user transform hooks.
+A transform hook is a function that a dotted import path names, like "package.module:function".
+The crop commands call the hook with batches of crops as arrays, inside a pool of worker processes, and then encode and
+    save the transformed crops in the same workers.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import collections
+import concurrent.futures
+import importlib
+import os
+
+from PIL import Image as pil_image
+
+from aidesign_widgets.libs import codecs
+from aidesign_widgets.libs import crops
+from aidesign_widgets.libs import stats
+
+# Aliases
+
+_cpu_count = os.cpu_count
+_deque = collections.deque
+_from_array = crops.from_array
+_import_module = importlib.import_module
+_pil_image = pil_image
+_ProcessPoolExecutor = concurrent.futures.ProcessPoolExecutor
+_save_image = codecs.save
+_StatsAccumulator = stats.StatsAccumulator
+_to_array = crops.to_array
+
+# -
+
+default_batch_size = 32
+"""Default batch size."""
+
+_hooks = {}
+_executors = {}
+_invert_table = bytes(range(255, -1, -1))
+
+
+def load_hook(hook_path):
+    """Loads a transform hook.
+
+    Args:
+        hook_path: the hook dotted import path, like "package.module:function" or "package.module.function"
+
+    Returns:
+        result: the hook, a function that takes (batch, metas) and returns the transformed batch, or None after
+            transforming the batch in place
+    """
+    hook_path = str(hook_path)
+
+    if hook_path in _hooks:
+        result = _hooks[hook_path]
+        return result
+
+    if ":" in hook_path:
+        module_name, attr_path = hook_path.split(":", 1)
+    else:
+        module_name, _, attr_path = hook_path.rpartition(".")
+    # end if
+
+    if len(module_name) <= 0 or len(attr_path) <= 0:
+        raise ValueError(f"Invalid transform hook path: {hook_path}; Expects: \"package.module:function\"")
+
+    result = _import_module(module_name)
+
+    for attr_name in attr_path.split("."):
+        result = getattr(result, attr_name)
+
+    if not callable(result):
+        raise TypeError(f"Transform hook is not callable: {hook_path}")
+
+    _hooks[hook_path] = result
+    return result
+
+
+def find_executor(worker_count=None):
+    """Finds a shared pool of worker processes.
+
+    The pool lives until the process exits, so that the bulk commands reuse it across the images.
+
+    Args:
+        worker_count: the worker process count; None means the CPU count
+
+    Returns:
+        result: the process pool executor
+    """
+    if worker_count is None:
+        worker_count = _cpu_count() or 1
+
+    worker_count = max(int(worker_count), 1)
+
+    if worker_count not in _executors:
+        _executors[worker_count] = _ProcessPoolExecutor(worker_count)
+
+    result = _executors[worker_count]
+    return result
+
+
+def invert(batch, metas):
+    """Inverts every band of the crops in a batch.
+
+    An example transform hook; Path: "aidesign_widgets.libs.transforms:invert".
+
+    Args:
+        batch: the batch, a buffer-protocol array of unsigned bytes that has the shape
+            (crop_count, height, width, band_count)
+        metas: the crop metadata list
+
+    Returns:
+        result: the transformed batch
+    """
+    batch = memoryview(batch)
+
+    data = batch.tobytes().translate(_invert_table)
+    result = memoryview(data).cast("B", batch.shape)
+    return result
+
+
+def _split_batch(result, mode, crop_count):
+    if isinstance(result, (list, tuple)):
+        arrays = list(result)
+    else:
+        array = memoryview(result)
+
+        if array.ndim != 4 or array.itemsize != 1:
+            raise ValueError(
+                f"Unsupported transformed batch:  Dimension count: {array.ndim}  Item size: {array.itemsize}; "
+                f"Expects: 4 dimensions of unsigned bytes"
+            )
+        # end if
+
+        shape = array.shape[1:]
+        data = array.tobytes()
+        item_size = shape[0] * shape[1] * shape[2]
+        arrays = [
+            memoryview(data)[idx * item_size: (idx + 1) * item_size].cast("B", shape) for idx in range(array.shape[0])
+        ]
+    # end if
+
+    if len(arrays) != crop_count:
+        raise ValueError(f"Transformed crop count: {len(arrays)}; Expects: {crop_count}")
+
+    result = [_from_array(array, mode) for array in arrays]
+    return result
+
+
+def _run_batch(hook_path, mode, shape, datas, metas, locs, out_format, save_kwargs, save_stats):
+    hook = load_hook(hook_path)
+
+    data = bytearray().join(datas)
+    batch = memoryview(data).cast("B", (len(datas),) + tuple(shape))
+    transformed = hook(batch, metas)
+
+    if transformed is None:
+        transformed = batch
+
+    transformed_crops = _split_batch(transformed, mode, len(datas))
+    byte_counts = []
+    crop_stats = []
+
+    if save_stats:
+        batch_stats = _StatsAccumulator()
+    else:
+        batch_stats = None
+    # end if
+
+    for crop, loc in zip(transformed_crops, locs):
+        byte_count = _save_image(crop, loc, out_format, save_kwargs)
+        byte_counts.append(byte_count)
+
+        if batch_stats is not None:
+            crop_stats.append(batch_stats.add(crop))
+        else:
+            crop_stats.append(None)
+        # end if
+    # end for
+
+    result = byte_counts, crop_stats, batch_stats
+    return result
+
+
+class BatchWriter:
+    """Batch writer.
+
+    Groups the crops into batches by their mode and size, and hands each full batch to a worker process, which runs the
+        transform hook, and then encodes and saves the transformed crops.
+    The write results come back in the batch submission order.
+    With save_stats, the workers also find the stats of the transformed crops, and their accumulators merge into stats.
+    """
+
+    def __init__(self, hook_path, out_format, save_kwargs, batch_size=None, worker_count=None, save_stats=False):
+        """Inits self with the given args.
+
+        Args:
+            hook_path: the hook dotted import path
+            out_format: the output format
+            save_kwargs: the PIL save keyword arguments
+            batch_size: the max crop count of a batch; None means default_batch_size
+            worker_count: the worker process count; None means the CPU count
+            save_stats: whether to find the crop stats
+        """
+        hook_path = str(hook_path)
+        out_format = str(out_format)
+        save_kwargs: dict = save_kwargs
+        save_stats = bool(save_stats)
+
+        if batch_size is None:
+            batch_size = default_batch_size
+
+        batch_size = max(int(batch_size), 1)
+
+        if worker_count is None:
+            worker_count = _cpu_count() or 1
+
+        worker_count = max(int(worker_count), 1)
+
+        # Load the hook early, so that a bad path fails before cropping
+        load_hook(hook_path)
+
+        self.hook_path = hook_path
+        """Hook dotted import path."""
+        self.out_format = out_format
+        """Output format."""
+        self.save_kwargs = save_kwargs
+        """PIL save keyword arguments."""
+        self.batch_size = batch_size
+        """Max crop count of a batch."""
+        self.worker_count = worker_count
+        """Worker process count."""
+        self.batch_count = 0
+        """Submitted batch count."""
+        self.stats = _StatsAccumulator() if save_stats else None
+        """Stats accumulator of the transformed crops, or None."""
+
+        self._executor = find_executor(worker_count)
+        self._max_pending_count = worker_count * 2
+        self._batches = {}
+        self._pending = _deque()
+
+    def _submit(self, key):
+        mode, shape = key
+        datas, metas, locs, contexts = self._batches.pop(key)
+
+        future = self._executor.submit(
+            _run_batch, self.hook_path, mode, shape, datas, metas, locs, self.out_format, self.save_kwargs,
+            self.stats is not None
+        )
+
+        self._pending.append((future, contexts))
+        self.batch_count += 1
+
+    def _collect(self, wait_count=0):
+        result = []
+
+        while len(self._pending) > 0:
+            future, contexts = self._pending[0]
+
+            if len(self._pending) <= wait_count and not future.done():
+                break
+
+            byte_counts, crop_stats, batch_stats = future.result()
+            self._pending.popleft()
+            result.extend(zip(contexts, byte_counts, crop_stats))
+
+            if batch_stats is not None:
+                self.stats.merge(batch_stats)
+        # end while
+
+        return result
+
+    def write(self, crop, loc, meta, context=None):
+        """Writes a crop.
+
+        Args:
+            crop: the crop, a PIL image
+            loc: the file location
+            meta: the crop metadata, a dict that the hook gets
+            context: an optional context that comes back with the write result
+
+        Returns:
+            result: the completed write results, a list of (context, byte_count, crop_stats)
+        """
+        crop: _pil_image.Image = crop
+        loc = str(loc)
+        meta: dict = meta
+
+        array = _to_array(crop)
+        key = (crop.mode, array.shape)
+
+        if key not in self._batches:
+            self._batches[key] = ([], [], [], [])
+
+        datas, metas, locs, contexts = self._batches[key]
+        datas.append(array.obj)
+        metas.append(dict(meta, location=loc))
+        locs.append(loc)
+        contexts.append(context)
+
+        if len(datas) >= self.batch_size:
+            self._submit(key)
+
+        result = self._collect(self._max_pending_count)
+        return result
+
+    def flush(self):
+        """Submits the partial batches and waits for all the batches.
+
+        Returns:
+            result: the completed write results, a list of (context, byte_count, crop_stats)
+        """
+        for key in list(self._batches):
+            self._submit(key)
+
+        result = self._collect()
+        return result
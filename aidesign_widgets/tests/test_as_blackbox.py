@@ -9,32 +9,66 @@ import asyncio
 import json
 import os
 import pathlib
+import random
 import re
 import shutil
+import struct
 import threading
 import typing
 import unittest
 
 from os import path as ospath
+from PIL import Image as pil_image
+from PIL import ImageStat as pil_image_stat
+
+from aidesign_widgets.libs import crops
+from aidesign_widgets.libs import datasets
+from aidesign_widgets.libs import manifests
+from aidesign_widgets.libs import masks
+from aidesign_widgets.libs import samplers
 
 # Aliases
 
+_basename = ospath.basename
+_copyfile = shutil.copyfile
 _copytree = shutil.copytree
 _create_subprocess_shell = asyncio.create_subprocess_shell
 _dump = json.dump
 _exists = ospath.exists
+_find_level_size = crops.find_level_size
+_getsize = ospath.getsize
+_grid_config_dataset = datasets.grid_config_dataset
+_grid_dataset = datasets.grid_dataset
+_ImportanceSampler = samplers.ImportanceSampler
 _IO = typing.IO
 _isdir = ospath.isdir
 _isfile = ospath.isfile
+_iter_grid_crops = crops.iter_grid_crops
+_iter_pyramid = crops.iter_pyramid
+_iter_rand_crops = crops.iter_rand_crops
 _join = ospath.join
 _listdir = os.listdir
 _load = json.load
+_load_manifest = manifests.load_manifest
+_loads = json.loads
 _makedirs = os.makedirs
+_manifest_dataset = datasets.manifest_dataset
+_ManifestWriter = manifests.ManifestWriter
+_MaskIndex = masks.MaskIndex
 _Path = pathlib.Path
+_pil_image = pil_image
 _PIPE = asyncio.subprocess.PIPE
+_rand_config_dataset = datasets.rand_config_dataset
+_rand_dataset = datasets.rand_dataset
+_Random = random.Random
 _remove = os.remove
+_resize_image = crops.resize_image
 _re_compile = re.compile
 _rmtree = shutil.rmtree
+_split_text = ospath.splitext
+_Stat = pil_image_stat.Stat
+_struct_pack = struct.pack
+_struct_unpack = struct.unpack
 _run = asyncio.run
 _TestCase = unittest.TestCase
 _Thread = threading.Thread
@@ -54,13 +88,18 @@ _app_data_path = _join(_repo_path, "aidesign_widgets_app_data")
 _grid_crop_config_loc = _join(_app_data_path, "grid_crop_config.json")
 _rand_crop_config_loc = _join(_app_data_path, "rand_crop_config.json")
 _bulk_crop_config_loc = _join(_app_data_path, "bulk_crop_config.json")
+_bench_config_loc = _join(_app_data_path, "bench_config.json")
+_grid_stitch_config_loc = _join(_app_data_path, "grid_stitch_config.json")
 
 _default_app_data_path = _join(_default_test_data_path, "app_data")
 _default_grid_crop_config_loc = _join(_default_app_data_path, "grid_crop_config.json")
 _default_rand_crop_config_loc = _join(_default_app_data_path, "rand_crop_config.json")
 _default_bulk_crop_config_loc = _join(_default_app_data_path, "bulk_crop_config.json")
+_default_bench_config_loc = _join(_default_app_data_path, "bench_config.json")
+_default_grid_stitch_config_loc = _join(_default_app_data_path, "grid_stitch_config.json")
 
 _default_to_crop_path = _join(_default_test_data_path, "to_crop")
+_default_to_crop_1_loc = _join(_default_to_crop_path, "to_crop_1.jpg")
 _default_to_bulk_crop_path = _join(_default_test_data_path, "to_bulk_crop")
 
 _log_loc = _join(_test_data_path, "log.txt")
@@ -70,11 +109,23 @@ _to_crop_1_loc = _join(_to_crop_path, "to_crop_1.jpg")
 _to_bulk_crop_path = _join(_test_data_path, "to_bulk_crop")
 
 _cropped_path = _join(_test_data_path, "cropped")
+_paired_cropped_path = _join(_test_data_path, "paired_cropped")
+_manifest_loc = _join(_test_data_path, "manifest.jsonl")
+_bin_manifest_loc = _join(_test_data_path, "manifest.bin")
+_annotation_loc = _join(_test_data_path, "annotations.csv")
+_mask_loc = _join(_test_data_path, "mask.png")
+_label_map_loc = _join(_test_data_path, "label_map.png")
+_pipe_in_loc = _join(_test_data_path, "pipe_in.bin")
+_pipe_out_loc = _join(_test_data_path, "pipe_out.bin")
 _bulk_cropped_path = _join(_test_data_path, "bulk_cropped")
+_stitched_loc = _join(_test_data_path, "stitched.png")
+_stats_loc = _join(_test_data_path, "stats.json")
 
 _grid_crop_config_backup_loc = _join(_test_data_path, "grid_crop_config_backup.json")
 _rand_crop_config_backup_loc = _join(_test_data_path, "rand_crop_config_backup.json")
 _bulk_crop_config_backup_loc = _join(_test_data_path, "bulk_crop_config_backup.json")
+_bench_config_backup_loc = _join(_test_data_path, "bench_config_backup.json")
+_grid_stitch_config_backup_loc = _join(_test_data_path, "grid_stitch_config_backup.json")
 
 
 def _fix_newline_format(instr):
@@ -176,6 +227,19 @@ def _save_json(from_dict, to_loc):
     file.close()
 
 
+class _ArraySource(bytes):
+    """Array source, the pixel bytes of an image with an array interface, like a NumPy array has."""
+
+
+def _make_array_source(image):
+    image: _pil_image.Image = image
+
+    result = _ArraySource(image.tobytes())
+    shape = (image.height, image.width, len(image.getbands()))
+    result.__array_interface__ = {"shape": shape, "typestr": "|u1", "version": 3}
+    return result
+
+
 class _TestCmd(_TestCase):
 
     def __init__(self, methodName=""):
@@ -273,6 +337,16 @@ class _TestCmd(_TestCase):
         default_config = _load_json(_default_bulk_crop_config_loc)
         _save_json(default_config, _bulk_crop_config_loc)
 
+        config = _load_json(_bench_config_loc)
+        _save_json(config, _bench_config_backup_loc)
+        default_config = _load_json(_default_bench_config_loc)
+        _save_json(default_config, _bench_config_loc)
+
+        config = _load_json(_grid_stitch_config_loc)
+        _save_json(config, _grid_stitch_config_backup_loc)
+        default_config = _load_json(_default_grid_stitch_config_loc)
+        _save_json(default_config, _grid_stitch_config_loc)
+
     def _restore_cmd_configs(self):
         config_backup = _load_json(_grid_crop_config_backup_loc)
         _save_json(config_backup, _grid_crop_config_loc)
@@ -292,6 +366,18 @@ class _TestCmd(_TestCase):
         if _exists(_bulk_crop_config_backup_loc):
             _remove(_bulk_crop_config_backup_loc)
 
+        config_backup = _load_json(_bench_config_backup_loc)
+        _save_json(config_backup, _bench_config_loc)
+
+        if _exists(_bench_config_backup_loc):
+            _remove(_bench_config_backup_loc)
+
+        config_backup = _load_json(_grid_stitch_config_backup_loc)
+        _save_json(config_backup, _grid_stitch_config_loc)
+
+        if _exists(_grid_stitch_config_backup_loc):
+            _remove(_grid_stitch_config_backup_loc)
+
 
 class _TestSimpleCmd(_TestCmd):
 
@@ -392,6 +478,14 @@ class TestWidgetsGridCrop(_TestCmd):
         _rmtree(_cropped_path, ignore_errors=True)
         _rmtree(_to_crop_path, ignore_errors=True)
 
+        for loc in [
+            _manifest_loc, _bin_manifest_loc, _bin_manifest_loc + manifests.bin_sources_suffix,
+            _bin_manifest_loc + manifests.bin_locations_suffix
+        ]:
+            if _exists(loc):
+                _remove(loc)
+        # end for
+
     def test_norm(self):
         """Tests the normal use case."""
         method_name = self.test_norm.__name__
@@ -444,38 +538,66 @@ class TestWidgetsGridCrop(_TestCmd):
         self._log_method_end(method_name)
 
 
-class TestWidgetsRandCrop(_TestCmd):
-    """Tests for the "widgets rand-crop" command."""
+    def test_manifest(self):
+        """Tests the use case with a crop manifest."""
+        method_name = self.test_manifest.__name__
+        self._log_method_start(method_name)
 
-    def setUp(self):
-        """Sets up before the tests."""
-        super().setUp()
-        self._backup_cmd_configs()
+        config = _load_json(_grid_crop_config_loc)
+        config["manifest_format"] = "jsonl"
+        config["manifest_location"] = _manifest_loc
+        _save_json(config, _grid_crop_config_loc)
 
-        _rmtree(_cropped_path, ignore_errors=True)
-        _rmtree(_to_crop_path, ignore_errors=True)
-        _makedirs(_cropped_path, exist_ok=True)
-        _copytree(_default_to_crop_path, _to_crop_path)
+        cmd = "widgets grid-crop"
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
 
-        config = _load_json(_rand_crop_config_loc)
-        config["image_location"] = _to_crop_1_loc
-        config["output_path"] = _cropped_path
-        _save_json(config, _rand_crop_config_loc)
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
 
-    def tearDown(self):
-        """Tears down after the tests."""
-        super().tearDown()
-        self._restore_cmd_configs()
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
 
-        _rmtree(_cropped_path, ignore_errors=True)
-        _rmtree(_to_crop_path, ignore_errors=True)
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
 
-    def test_norm(self):
-        """Tests the normal use case."""
-        method_name = self.test_norm.__name__
+        format_incorrect_info = "results format incorrect"
+
+        isfile = _isfile(_manifest_loc)
+        fail_msg = "{} is not a file; {}".format(_manifest_loc, format_incorrect_info)
+        self.assertTrue(isfile, fail_msg)
+
+        file = open(_manifest_loc, "r")
+        records = [_loads(line) for line in file.read().splitlines()]
+        file.close()
+
+        names = _listdir(_cropped_path)
+        fail_msg = "{} has {} records but {} has {} crops; {}".format(
+            _manifest_loc, len(records), _cropped_path, len(names), format_incorrect_info
+        )
+        self.assertTrue(len(records) == len(names), fail_msg)
+
+        for record in records:
+            isfile = _isfile(record["location"])
+            fail_msg = "The manifest location {} is not a file; {}".format(record["location"], format_incorrect_info)
+            self.assertTrue(isfile, fail_msg)
+        # end for
+
+        self._log_method_end(method_name)
+
+    def test_detail_filter(self):
+        """Tests the detail filter use case, with a threshold that rejects all the boxes."""
+        method_name = self.test_detail_filter.__name__
         self._log_method_start(method_name)
 
-        cmd = "widgets rand-crop"
+        config = _load_json(_grid_crop_config_loc)
+        config["min_variance"] = 1e9
+        _save_json(config, _grid_crop_config_loc)
+
+        cmd = "widgets grid-crop"
         instr = "\n"
         thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
         thread.start()
@@ -493,67 +615,151 @@ class TestWidgetsRandCrop(_TestCmd):
 
         format_incorrect_info = "results format incorrect"
 
-        isdir = _isdir(_cropped_path)
-        fail_msg = "{} is not a directory; {}".format(_cropped_path, format_incorrect_info)
-        self.assertTrue(isdir, fail_msg)
-
-        regexs = [
-            _re_compile(r".*-At-.*-Crop-.*(-Resize-.*)?(-Flip-(x|y|xy))?(-Rotation-(x|y|xy))?-Time-.*\.jpg")
-        ]
         names = _listdir(_cropped_path)
+        fail_msg = "{} has {} crops, but expects 0; {}".format(_cropped_path, len(names), format_incorrect_info)
+        self.assertTrue(len(names) == 0, fail_msg)
 
-        for name in names:
-            obj_path = _join(_cropped_path, name)
-            isfile = _isfile(obj_path)
-            fail_msg = "The object at path {} is not a file; {}".format(obj_path, format_incorrect_info)
-            self.assertTrue(isfile, fail_msg)
+        filtered_logs = _re_compile(r"Filtered (\d+) blank or blurry boxes").findall(out)
+        fail_msg = "Running \"{}\" does not log a positive filtered box count".format(cmd)
+        self.assertTrue(len(filtered_logs) == 1 and int(filtered_logs[0]) > 0, fail_msg)
 
-            for regex in regexs:
-                matched = bool(regex.match(name))
+        self._log_method_end(method_name)
 
-                fail_msg = "File name {} in {} does not match pattern {}; {}".format(
-                    name, _cropped_path, str(regex), format_incorrect_info
-                )
+    def test_annotations(self):
+        """Tests the annotation use case, with a box that splits between 2 crops below the min visibility."""
+        method_name = self.test_annotations.__name__
+        self._log_method_start(method_name)
 
-                self.assertTrue(matched, fail_msg)
-            # end for
+        file = open(_annotation_loc, "w")
+        file.write("image,left,upper,right,lower,label\n")
+        file.write("to_crop_1.jpg,0,0,32,32,a\n")
+        file.write("to_crop_1.jpg,48,0,80,32,b\n")
+        file.close()
+
+        config = _load_json(_grid_crop_config_loc)
+        config["manifest_format"] = "jsonl"
+        config["manifest_location"] = _manifest_loc
+        config["annotation_location"] = _annotation_loc
+        config["min_visibility"] = 0.6
+        _save_json(config, _grid_crop_config_loc)
+
+        cmd = "widgets grid-crop"
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
+
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
+
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        format_incorrect_info = "results format incorrect"
+
+        file = open(_manifest_loc, "r")
+        records = [_loads(line) for line in file.read().splitlines()]
+        file.close()
+
+        labeled = [record for record in records if len(record["labels"]) > 0]
+        fail_msg = "{} has {} labeled records, but expects 8; {}".format(
+            _manifest_loc, len(labeled), format_incorrect_info
+        )
+        self.assertTrue(len(labeled) == 8, fail_msg)
+
+        for record in labeled:
+            label = record["labels"][0]
+            fail_msg = "Record {} has unexpected labels; {}".format(record, format_incorrect_info)
+            self.assertTrue(record["x"] == 0 and record["y"] == 0 and len(record["labels"]) == 1, fail_msg)
+            self.assertTrue(label["label"] == "a", fail_msg)
+
+            if record["flip"] == "" and record["rotation"] == 0:
+                self.assertTrue([label["left"], label["upper"], label["right"], label["lower"]] == [0, 0, 32, 32])
+            elif record["flip"] == "" and record["rotation"] == 180:
+                self.assertTrue([label["left"], label["upper"], label["right"], label["lower"]] == [32, 32, 64, 64])
+            # end if
         # end for
 
         self._log_method_end(method_name)
 
+    def test_stride(self):
+        """Tests the overlapping crops use case, with the strides at half the crop resolution."""
+        method_name = self.test_stride.__name__
+        self._log_method_start(method_name)
 
-class TestWidgetsBulkCrop(_TestCmd):
-    """Tests for the "widgets bulk-crop <command> ..." command."""
+        image = _pil_image.open(_to_crop_1_loc)
+        width, height = image.size
+        image.close()
 
-    def setUp(self):
-        """Sets up before the tests."""
-        super().setUp()
-        self._backup_cmd_configs()
+        config = _load_json(_grid_crop_config_loc)
+        crop_res = config["crop_resolution"]
+        stride = crop_res // 2
+        config["save_flips"] = False
+        config["save_rotations"] = False
+        config["stride_x"] = stride
+        config["stride_y"] = stride
+        config["manifest_format"] = "jsonl"
+        config["manifest_location"] = _manifest_loc
+        _save_json(config, _grid_crop_config_loc)
 
-        _rmtree(_bulk_cropped_path, ignore_errors=True)
-        _rmtree(_to_bulk_crop_path, ignore_errors=True)
-        _makedirs(_bulk_cropped_path, exist_ok=True)
-        _copytree(_default_to_bulk_crop_path, _to_bulk_crop_path)
+        cmd = "widgets grid-crop"
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
 
-        config = _load_json(_bulk_crop_config_loc)
-        config["bulk_input_path"] = _to_bulk_crop_path
-        config["bulk_output_path"] = _bulk_cropped_path
-        _save_json(config, _bulk_crop_config_loc)
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
 
-    def tearDown(self):
-        """Tears down after the tests."""
-        super().tearDown()
-        self._restore_cmd_configs()
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
 
-        _rmtree(_bulk_cropped_path, ignore_errors=True)
-        _rmtree(_to_bulk_crop_path, ignore_errors=True)
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
 
-    def test_norm_grid(self):
-        """Tests the normal use case for the "grid" subcommand."""
-        method_name = self.test_norm_grid.__name__
+        format_incorrect_info = "results format incorrect"
+
+        count = ((width - crop_res) // stride + 1) * ((height - crop_res) // stride + 1)
+        names = _listdir(_cropped_path)
+        fail_msg = "{} has {} crops, but expects {}; {}".format(
+            _cropped_path, len(names), count, format_incorrect_info
+        )
+        self.assertTrue(len(names) == count, fail_msg)
+
+        file = open(_manifest_loc, "r")
+        records = [_loads(line) for line in file.read().splitlines()]
+        file.close()
+
+        for record in records:
+            fail_msg = "Record {} has unexpected strides; {}".format(record, format_incorrect_info)
+            self.assertTrue(record["stride_x"] == stride and record["stride_y"] == stride, fail_msg)
+        # end for
+
+        self._log_method_end(method_name)
+
+    def test_transform_hook(self):
+        """Tests the batched transform hook use case, with the example hook that inverts the crop colors."""
+        method_name = self.test_transform_hook.__name__
         self._log_method_start(method_name)
 
-        cmd = "widgets bulk-crop grid"
+        config = _load_json(_grid_crop_config_loc)
+        config["save_flips"] = False
+        config["save_rotations"] = False
+        config["resize_resolution"] = None
+        config["output_format"] = "png"
+        config["manifest_format"] = "jsonl"
+        config["manifest_location"] = _manifest_loc
+        config["transform_hook"] = "aidesign_widgets.libs.transforms:invert"
+        config["transform_batch_size"] = 5
+        config["transform_worker_count"] = 2
+        _save_json(config, _grid_crop_config_loc)
+
+        cmd = "widgets grid-crop"
         instr = "\n"
         thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
         thread.start()
@@ -571,63 +777,140 @@ class TestWidgetsBulkCrop(_TestCmd):
 
         format_incorrect_info = "results format incorrect"
 
-        isdir = _isdir(_bulk_cropped_path)
-        fail_msg = "{} is not a directory; {}".format(_bulk_cropped_path, format_incorrect_info)
-        self.assertTrue(isdir, fail_msg)
+        file = open(_manifest_loc, "r")
+        records = [_loads(line) for line in file.read().splitlines()]
+        file.close()
 
-        regexs_depth_1 = [
-            _re_compile(r"GridCrop-.*")
-        ]
-        regexs_depth_2 = [
-            _re_compile(r".*-At-.*-Crop-.*(-Resize-.*)?(-Flip-(x|y|xy))?(-Rotation-(x|y|xy))?-Time-.*\.jpg")
-        ]
+        names = _listdir(_cropped_path)
+        fail_msg = "{} has {} crops, but the manifest has {} records; {}".format(
+            _cropped_path, len(names), len(records), format_incorrect_info
+        )
+        self.assertTrue(len(names) > 0 and len(names) == len(records), fail_msg)
 
-        names_depth_1 = _listdir(_bulk_cropped_path)
+        image = _pil_image.open(_to_crop_1_loc).convert("RGB")
+        invert_table = bytes(range(255, -1, -1))
 
-        for name_depth_1 in names_depth_1:
-            obj_path_depth_1 = _join(_bulk_cropped_path, name_depth_1)
-            isdir_depth_1 = _isdir(obj_path_depth_1)
-            fail_msg = "The object at path {} is not a directory; {}".format(obj_path_depth_1, format_incorrect_info)
-            self.assertTrue(isdir_depth_1, fail_msg)
+        for record in records:
+            box = (record["x"], record["y"], record["x"] + record["width"], record["y"] + record["height"])
+            expected = image.crop(box).tobytes().translate(invert_table)
 
-            for regex_depth_1 in regexs_depth_1:
-                matched = bool(regex_depth_1.match(name_depth_1))
+            crop = _pil_image.open(record["location"])
+            data = crop.convert("RGB").tobytes()
+            crop.close()
 
-                fail_msg = "Folder name {} in {} does not match pattern {}; {}".format(
-                    name_depth_1, _bulk_cropped_path, str(regex_depth_1), format_incorrect_info
-                )
+            fail_msg = "{} is not the inverted crop; {}".format(record["location"], format_incorrect_info)
+            self.assertTrue(data == expected, fail_msg)
 
-                self.assertTrue(matched, fail_msg)
-            # end for
+            fail_msg = "Record {} has an unexpected byte count; {}".format(record, format_incorrect_info)
+            self.assertTrue(record["bytes"] == _getsize(record["location"]), fail_msg)
+        # end for
 
-            names_depth_2 = _listdir(obj_path_depth_1)
+        image.close()
+        self._log_method_end(method_name)
 
-            for name_depth_2 in names_depth_2:
-                obj_path_depth_2 = _join(_bulk_cropped_path, name_depth_1, name_depth_2)
-                isfile_depth_2 = _isfile(obj_path_depth_2)
-                fail_msg = "The object at path {} is not a file; {}".format(obj_path_depth_2, format_incorrect_info)
-                self.assertTrue(isfile_depth_2, fail_msg)
+    def test_stats(self):
+        """Tests the streaming stats use case, in the main process and then in the transform hook workers."""
+        method_name = self.test_stats.__name__
+        self._log_method_start(method_name)
 
-                for regex_depth_2 in regexs_depth_2:
-                    matched = bool(regex_depth_2.match(name_depth_2))
+        config = _load_json(_grid_crop_config_loc)
+        config["save_flips"] = False
+        config["save_rotations"] = False
+        config["output_format"] = "png"
+        config["manifest_format"] = "jsonl"
+        config["manifest_location"] = _manifest_loc
+        config["save_stats"] = True
+        config["stats_location"] = _stats_loc
+        _save_json(config, _grid_crop_config_loc)
 
-                    fail_msg = "File name {} in {} does not match pattern {}; {}".format(
-                        name_depth_2, obj_path_depth_1, str(regex_depth_2), format_incorrect_info
-                    )
+        format_incorrect_info = "results format incorrect"
+        dataset_means = []
+
+        for transform_hook in [None, "aidesign_widgets.libs.transforms:invert"]:
+            config = _load_json(_grid_crop_config_loc)
+            config["transform_hook"] = transform_hook
+            config["transform_batch_size"] = 3
+            config["transform_worker_count"] = 2
+            _save_json(config, _grid_crop_config_loc)
+
+            cmd = "widgets grid-crop"
+            instr = "\n"
+            thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+            thread.start()
+            exit_code, out, err = thread.join(_timeout)
+            timed_out = thread.is_alive()
+
+            self._log_cmdout(cmd, "stdout", out)
+            self._log_cmdout(cmd, "stderr", err)
+
+            fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+            self.assertTrue(timed_out is False, fail_msg)
+
+            fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+            self.assertTrue(exit_code == 0, fail_msg)
+
+            file = open(_manifest_loc, "r")
+            records = [_loads(line) for line in file.read().splitlines()]
+            file.close()
+
+            for record in records:
+                crop = _pil_image.open(record["location"])
+                stat = _Stat(crop)
+                crop.close()
+
+                diffs = [abs(mean - stat_mean) for mean, stat_mean in zip(record["mean"], stat.mean)]
+                diffs += [abs(std - stat_std) for std, stat_std in zip(record["std"], stat.stddev)]
+                fail_msg = "Record {} has unexpected stats; {}".format(record, format_incorrect_info)
+                self.assertTrue(len(diffs) == 6 and max(diffs) < 1e-6, fail_msg)
+            # end for
 
-                    self.assertTrue(matched, fail_msg)
-                # end for
+            stats = _load_json(_stats_loc)
+            rgb_stats = stats["modes"]["RGB"]
+            fail_msg = "{} has unexpected crop counts; {}".format(_stats_loc, format_incorrect_info)
+            self.assertTrue(stats["crop_count"] == len(records) == rgb_stats["crop_count"], fail_msg)
+
+            # The crops have the same size, so the dataset mean is the mean of the crop means
+            for band_idx, mean in enumerate(rgb_stats["mean"]):
+                crop_means = [record["mean"][band_idx] for record in records]
+                fail_msg = "{} has an unexpected mean: {}; {}".format(_stats_loc, mean, format_incorrect_info)
+                self.assertTrue(abs(mean - sum(crop_means) / len(crop_means)) < 1e-6, fail_msg)
             # end for
+
+            dataset_means.append(rgb_stats["mean"])
         # end for
 
+        diffs = [abs(mean + inverted_mean - 255) for mean, inverted_mean in zip(*dataset_means)]
+        fail_msg = "The inverted crops have unexpected means: {}; {}".format(dataset_means, format_incorrect_info)
+        self.assertTrue(max(diffs) < 1e-6, fail_msg)
+
         self._log_method_end(method_name)
 
-    def test_norm_rand(self):
-        """Tests the normal use case for the "rand" subcommand."""
-        method_name = self.test_norm_grid.__name__
+    def test_rois(self):
+        """Tests the region of interest use case, with an uncompressed image that gets read region by region."""
+        method_name = self.test_rois.__name__
         self._log_method_start(method_name)
 
-        cmd = "widgets bulk-crop rand"
+        image_loc = _join(_to_crop_path, "to_crop_1.ppm")
+        image = _pil_image.open(_to_crop_1_loc).convert("RGB")
+        image.save(image_loc)
+
+        config = _load_json(_grid_crop_config_loc)
+        config["image_location"] = image_loc
+        config["save_flips"] = False
+        config["save_rotations"] = False
+        config["output_format"] = "png"
+        config["manifest_format"] = "jsonl"
+        config["manifest_location"] = _manifest_loc
+
+        config["rois"] = [
+            {"left": 10, "upper": 20, "right": 150, "lower": 100},
+            {"left": 300, "upper": 100, "right": 600, "lower": 250, "max_crop_count_x": 2},
+            {"left": 600, "upper": 0, "right": 700, "lower": 100}
+        ]
+
+        _save_json(config, _grid_crop_config_loc)
+
+        cmd = "widgets grid-crop"
         instr = "\n"
         thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
         thread.start()
@@ -645,36 +928,976 @@ class TestWidgetsBulkCrop(_TestCmd):
 
         format_incorrect_info = "results format incorrect"
 
-        isdir = _isdir(_bulk_cropped_path)
-        fail_msg = "{} is not a directory; {}".format(_bulk_cropped_path, format_incorrect_info)
-        self.assertTrue(isdir, fail_msg)
+        file = open(_manifest_loc, "r")
+        records = [_loads(line) for line in file.read().splitlines()]
+        file.close()
+
+        # 2 by 1 crops in the first ROI, 2 by 2 in the clipped second ROI, and none in the third ROI
+        positions = sorted((record["x"], record["y"]) for record in records)
+        expected_positions = [(10, 20), (74, 20), (300, 100), (300, 164), (364, 100), (364, 164)]
+        fail_msg = "{} has unexpected crop positions {}; {}".format(_manifest_loc, positions, format_incorrect_info)
+        self.assertTrue(positions == expected_positions, fail_msg)
+
+        for record in records:
+            crop = _pil_image.open(record["location"])
+            box = (record["x"], record["y"], record["x"] + 64, record["y"] + 64)
+            same = crop.tobytes() == image.crop(box).tobytes()
+            fail_msg = "Crop {} differs from the image box {}; {}".format(
+                record["location"], box, format_incorrect_info
+            )
+            self.assertTrue(same, fail_msg)
+        # end for
 
-        regexs_depth_1 = [
-            _re_compile(r"RandCrop-.*")
-        ]
-        regexs_depth_2 = [
-            _re_compile(r".*-At-.*-Crop-.*(-Resize-.*)?(-Flip-(x|y|xy))?(-Rotation-(x|y|xy))?-Time-.*\.jpg")
-        ]
+        self._log_method_end(method_name)
 
-        names_depth_1 = _listdir(_bulk_cropped_path)
+    def test_scales(self):
+        """Tests the multi-scale grid cropping use case, with a 2 level image pyramid."""
+        method_name = self.test_scales.__name__
+        self._log_method_start(method_name)
 
-        for name_depth_1 in names_depth_1:
-            obj_path_depth_1 = _join(_bulk_cropped_path, name_depth_1)
-            isdir_depth_1 = _isdir(obj_path_depth_1)
-            fail_msg = "The object at path {} is not a directory; {}".format(obj_path_depth_1, format_incorrect_info)
-            self.assertTrue(isdir_depth_1, fail_msg)
+        image = _pil_image.open(_to_crop_1_loc)
+        width, height = image.size
+        image.close()
 
-            for regex_depth_1 in regexs_depth_1:
-                matched = bool(regex_depth_1.match(name_depth_1))
+        config = _load_json(_grid_crop_config_loc)
+        crop_res = config["crop_resolution"]
+        config["save_flips"] = False
+        config["save_rotations"] = False
+        config["resize_resolution"] = None
+        config["scales"] = [1, 0.5]
+        _save_json(config, _grid_crop_config_loc)
 
-                fail_msg = "Folder name {} in {} does not match pattern {}; {}".format(
-                    name_depth_1, _bulk_cropped_path, str(regex_depth_1), format_incorrect_info
-                )
+        cmd = "widgets grid-crop"
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
 
-                self.assertTrue(matched, fail_msg)
-            # end for
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
 
-            names_depth_2 = _listdir(obj_path_depth_1)
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        format_incorrect_info = "results format incorrect"
+
+        names = _listdir(_cropped_path)
+        level_sizes = {"1": (width, height), "0.5": ((width + 1) // 2, (height + 1) // 2)}
+
+        for scale, (level_width, level_height) in level_sizes.items():
+            count = (level_width // crop_res) * (level_height // crop_res)
+            level_names = [name for name in names if f"-Scale-{scale}-" in name]
+            fail_msg = "{} has {} scale {} crops, but expects {}; {}".format(
+                _cropped_path, len(level_names), scale, count, format_incorrect_info
+            )
+            self.assertTrue(len(level_names) == count, fail_msg)
+        # end for
+
+        self._log_method_end(method_name)
+
+    def test_resize_cascade(self):
+        """Tests the multiple resize resolutions use case."""
+        method_name = self.test_resize_cascade.__name__
+        self._log_method_start(method_name)
+
+        resize_ress = [64, 32, 16]
+        config = _load_json(_grid_crop_config_loc)
+        config["resize_resolution"] = resize_ress
+        _save_json(config, _grid_crop_config_loc)
+
+        cmd = "widgets grid-crop"
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
+
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
+
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        format_incorrect_info = "results format incorrect"
+        counts = []
+
+        for resize_res in resize_ress:
+            level_path = _join(_cropped_path, "Resize-{}".format(resize_res))
+            names = _listdir(level_path)
+            counts.append(len(names))
+
+            crop = _pil_image.open(_join(level_path, names[0]))
+            size = crop.size
+            crop.close()
+
+            fail_msg = "{} has a crop of size {}, but expects {}; {}".format(
+                level_path, size, (resize_res, resize_res), format_incorrect_info
+            )
+            self.assertTrue(size == (resize_res, resize_res), fail_msg)
+        # end for
+
+        fail_msg = "The resize subfolders have unequal crop counts {}; {}".format(counts, format_incorrect_info)
+        self.assertTrue(counts[0] > 0 and len(set(counts)) == 1, fail_msg)
+
+        self._log_method_end(method_name)
+
+    def test_bin_manifest(self):
+        """Tests the use case with a binary crop manifest, the strides, and the scales."""
+        method_name = self.test_bin_manifest.__name__
+        self._log_method_start(method_name)
+
+        config = _load_json(_grid_crop_config_loc)
+        crop_res = config["crop_resolution"]
+        stride = crop_res // 2
+        config["save_flips"] = False
+        config["save_rotations"] = False
+        config["stride_x"] = stride
+        config["stride_y"] = stride
+        config["scales"] = [1, 0.5]
+        config["manifest_format"] = "bin"
+        config["manifest_location"] = _bin_manifest_loc
+        _save_json(config, _grid_crop_config_loc)
+
+        cmd = "widgets grid-crop"
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
+
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
+
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        format_incorrect_info = "results format incorrect"
+
+        records = _load_manifest(_bin_manifest_loc)
+        names = _listdir(_cropped_path)
+        fail_msg = "{} has {} records, but {} has {} crops; {}".format(
+            _bin_manifest_loc, len(records), _cropped_path, len(names), format_incorrect_info
+        )
+        self.assertTrue(len(records) == len(names), fail_msg)
+
+        for record in records:
+            fail_msg = "Record {} has unexpected strides; {}".format(record, format_incorrect_info)
+            self.assertTrue(record["stride_x"] == stride and record["stride_y"] == stride, fail_msg)
+
+            fail_msg = "Record {} has a scale that disagrees with its crop name; {}".format(
+                record, format_incorrect_info
+            )
+            self.assertTrue(f"-Scale-{record['scale']:g}-" in record["location"], fail_msg)
+        # end for
+
+        scales = sorted(set(record["scale"] for record in records))
+        fail_msg = "{} has unexpected scales {}; {}".format(_bin_manifest_loc, scales, format_incorrect_info)
+        self.assertTrue(scales == [0.5, 1], fail_msg)
+
+        self._log_method_end(method_name)
+
+
+class TestWidgetsGridStitch(_TestCmd):
+    """Tests for the "widgets grid-stitch" command."""
+
+    def setUp(self):
+        """Sets up before the tests."""
+        super().setUp()
+        self._backup_cmd_configs()
+
+        _rmtree(_cropped_path, ignore_errors=True)
+        _rmtree(_to_crop_path, ignore_errors=True)
+        _makedirs(_cropped_path, exist_ok=True)
+        _copytree(_default_to_crop_path, _to_crop_path)
+
+        config = _load_json(_grid_crop_config_loc)
+        config["image_location"] = _to_crop_1_loc
+        config["output_path"] = _cropped_path
+        config["output_format"] = "png"
+        config["manifest_format"] = "jsonl"
+        config["manifest_location"] = _manifest_loc
+        config["stride_x"] = 48
+        config["stride_y"] = 48
+        _save_json(config, _grid_crop_config_loc)
+
+        config = _load_json(_grid_stitch_config_loc)
+        config["manifest_location"] = _manifest_loc
+        config["output_location"] = _stitched_loc
+        config["band_height"] = 40
+        config["worker_count"] = 2
+        _save_json(config, _grid_stitch_config_loc)
+
+    def tearDown(self):
+        """Tears down after the tests."""
+        super().tearDown()
+        self._restore_cmd_configs()
+
+        _rmtree(_cropped_path, ignore_errors=True)
+        _rmtree(_to_crop_path, ignore_errors=True)
+
+        if _exists(_manifest_loc):
+            _remove(_manifest_loc)
+
+        if _exists(_stitched_loc):
+            _remove(_stitched_loc)
+
+    def test_norm(self):
+        """Tests the normal use case, with the overlapping, flipped, and rotated grid crops of an image."""
+        method_name = self.test_norm.__name__
+        self._log_method_start(method_name)
+
+        for cmd in ["widgets grid-crop", "widgets grid-stitch"]:
+            instr = "\n"
+            thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+            thread.start()
+            exit_code, out, err = thread.join(_timeout)
+            timed_out = thread.is_alive()
+
+            self._log_cmdout(cmd, "stdout", out)
+            self._log_cmdout(cmd, "stderr", err)
+
+            fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+            self.assertTrue(timed_out is False, fail_msg)
+
+            fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+            self.assertTrue(exit_code == 0, fail_msg)
+        # end for
+
+        format_incorrect_info = "results format incorrect"
+
+        isfile = _isfile(_stitched_loc)
+        fail_msg = "{} is not a file; {}".format(_stitched_loc, format_incorrect_info)
+        self.assertTrue(isfile, fail_msg)
+
+        image = _pil_image.open(_to_crop_1_loc).convert("RGB")
+        stitched = _pil_image.open(_stitched_loc)
+        stitched.load()
+
+        # The 64 pixel crops at a 48 pixel stride cover 496 by 256 pixels of the 512 by 288 image
+        fail_msg = "{} has an unexpected size {}; {}".format(_stitched_loc, stitched.size, format_incorrect_info)
+        self.assertTrue(stitched.size == (496, 256), fail_msg)
+
+        image_data = image.crop((0, 0) + stitched.size).tobytes()
+        stitched_data = stitched.tobytes()
+        max_diff = max(abs(val1 - val2) for val1, val2 in zip(image_data, stitched_data))
+        fail_msg = "{} differs from the image by up to {}; {}".format(_stitched_loc, max_diff, format_incorrect_info)
+        self.assertTrue(max_diff <= 1, fail_msg)
+
+        self._log_method_end(method_name)
+
+
+class TestWidgetsRandCrop(_TestCmd):
+    """Tests for the "widgets rand-crop" command."""
+
+    def setUp(self):
+        """Sets up before the tests."""
+        super().setUp()
+        self._backup_cmd_configs()
+
+        _rmtree(_cropped_path, ignore_errors=True)
+        _rmtree(_to_crop_path, ignore_errors=True)
+        _makedirs(_cropped_path, exist_ok=True)
+        _copytree(_default_to_crop_path, _to_crop_path)
+
+        config = _load_json(_rand_crop_config_loc)
+        config["image_location"] = _to_crop_1_loc
+        config["output_path"] = _cropped_path
+        _save_json(config, _rand_crop_config_loc)
+
+    def tearDown(self):
+        """Tears down after the tests."""
+        super().tearDown()
+        self._restore_cmd_configs()
+
+        _rmtree(_cropped_path, ignore_errors=True)
+        _rmtree(_to_crop_path, ignore_errors=True)
+
+        if _exists(_pipe_in_loc):
+            _remove(_pipe_in_loc)
+
+        if _exists(_pipe_out_loc):
+            _remove(_pipe_out_loc)
+
+        if _exists(_manifest_loc):
+            _remove(_manifest_loc)
+
+    def test_norm(self):
+        """Tests the normal use case."""
+        method_name = self.test_norm.__name__
+        self._log_method_start(method_name)
+
+        cmd = "widgets rand-crop"
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
+
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
+
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        format_incorrect_info = "results format incorrect"
+
+        isdir = _isdir(_cropped_path)
+        fail_msg = "{} is not a directory; {}".format(_cropped_path, format_incorrect_info)
+        self.assertTrue(isdir, fail_msg)
+
+        regexs = [
+            _re_compile(r".*-At-.*-Crop-.*(-Resize-.*)?(-Flip-(x|y|xy))?(-Rotation-(x|y|xy))?-Time-.*\.jpg")
+        ]
+        names = _listdir(_cropped_path)
+
+        for name in names:
+            obj_path = _join(_cropped_path, name)
+            isfile = _isfile(obj_path)
+            fail_msg = "The object at path {} is not a file; {}".format(obj_path, format_incorrect_info)
+            self.assertTrue(isfile, fail_msg)
+
+            for regex in regexs:
+                matched = bool(regex.match(name))
+
+                fail_msg = "File name {} in {} does not match pattern {}; {}".format(
+                    name, _cropped_path, str(regex), format_incorrect_info
+                )
+
+                self.assertTrue(matched, fail_msg)
+            # end for
+        # end for
+
+        self._log_method_end(method_name)
+
+    def test_pipe(self):
+        """Tests the pipe mode use case."""
+        method_name = self.test_pipe.__name__
+        self._log_method_start(method_name)
+
+        file = open(_to_crop_1_loc, "rb")
+        image_bytes = file.read()
+        file.close()
+
+        image_count = 2
+        file = open(_pipe_in_loc, "wb")
+
+        for _ in range(image_count):
+            file.write(_struct_pack(">Q", len(image_bytes)))
+            file.write(image_bytes)
+        # end for
+
+        file.close()
+
+        cmd = f"widgets rand-crop --pipe < \"{_pipe_in_loc}\" > \"{_pipe_out_loc}\""
+        instr = ""
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
+
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
+
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        format_incorrect_info = "results format incorrect"
+
+        file = open(_pipe_out_loc, "rb")
+        out_bytes = file.read()
+        file.close()
+
+        config = _load_json(_rand_crop_config_loc)
+        headers = []
+        pos = 0
+
+        while pos < len(out_bytes):
+            header_len, = _struct_unpack(">I", out_bytes[pos:pos + 4])
+            pos += 4
+            headers.append(_loads(out_bytes[pos:pos + header_len].decode("utf-8")))
+            pos += header_len
+            payload_len, = _struct_unpack(">Q", out_bytes[pos:pos + 8])
+            pos += 8
+
+            fail_msg = "A crop frame payload in {} is not a JPEG image; {}".format(
+                _pipe_out_loc, format_incorrect_info
+            )
+
+            self.assertTrue(out_bytes[pos:pos + 2] == b"\xff\xd8", fail_msg)
+            pos += payload_len
+        # end while
+
+        expected_count = config["crop_count"] * image_count
+        fail_msg = "{} has {} crop frames, but expects {}; {}".format(
+            _pipe_out_loc, len(headers), expected_count, format_incorrect_info
+        )
+        self.assertTrue(len(headers) == expected_count, fail_msg)
+
+        self._log_method_end(method_name)
+
+    def test_unique_positions(self):
+        """Tests the unique positions use case, with more crops requested than the distinct positions."""
+        method_name = self.test_unique_positions.__name__
+        self._log_method_start(method_name)
+
+        image = _pil_image.open(_to_crop_1_loc)
+        width, height = image.size
+        image.close()
+
+        config = _load_json(_rand_crop_config_loc)
+        config["random_flipping"] = False
+        config["random_rotating"] = False
+        crop_res = min(width, height)
+        expected_count = (width - crop_res + 1) * (height - crop_res + 1)
+        config["crop_resolution"] = crop_res
+        config["resize_resolution"] = 8
+        config["crop_count"] = expected_count + 16
+        config["unique_positions"] = True
+        _save_json(config, _rand_crop_config_loc)
+
+        cmd = "widgets rand-crop"
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
+
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
+
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        format_incorrect_info = "results format incorrect"
+
+        names = _listdir(_cropped_path)
+        fail_msg = "{} has {} crops, but expects {}; {}".format(
+            _cropped_path, len(names), expected_count, format_incorrect_info
+        )
+        self.assertTrue(len(names) == expected_count, fail_msg)
+
+        positions = set(_re_compile(r".*-At-(\d+)-(\d+)-").match(name).groups() for name in names)
+        fail_msg = "{} has duplicate crop positions; {}".format(_cropped_path, format_incorrect_info)
+        self.assertTrue(len(positions) == expected_count, fail_msg)
+
+        fail_msg = "Running \"{}\" does not log the position saturation".format(cmd)
+        self.assertTrue("distinct positions" in out, fail_msg)
+
+        self._log_method_end(method_name)
+
+    def test_max_overlap(self):
+        """Tests the max overlap use case, with more crops requested than the constraint allows."""
+        method_name = self.test_max_overlap.__name__
+        self._log_method_start(method_name)
+
+        image = _pil_image.open(_to_crop_1_loc)
+        width, height = image.size
+        image.close()
+
+        crop_res = min(width, height) // 4
+        config = _load_json(_rand_crop_config_loc)
+        config["crop_resolution"] = crop_res
+        config["resize_resolution"] = 8
+        config["crop_count"] = (width // crop_res + 1) * (height // crop_res + 1) + 16
+        config["max_overlap"] = 0
+        _save_json(config, _rand_crop_config_loc)
+
+        cmd = "widgets rand-crop"
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
+
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
+
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        format_incorrect_info = "results format incorrect"
+
+        names = _listdir(_cropped_path)
+        positions = [_re_compile(r".*-At-(\d+)-(\d+)-").match(name).groups() for name in names]
+        positions = [(int(pos_x), int(pos_y)) for pos_x, pos_y in positions]
+
+        for idx, (pos_x, pos_y) in enumerate(positions):
+            for other_x, other_y in positions[idx + 1:]:
+                overlapped = abs(pos_x - other_x) < crop_res and abs(pos_y - other_y) < crop_res
+                fail_msg = "Crops at {} and {} overlap; {}".format(
+                    (pos_x, pos_y), (other_x, other_y), format_incorrect_info
+                )
+                self.assertFalse(overlapped, fail_msg)
+            # end for
+        # end for
+
+        fail_msg = "Running \"{}\" does not log the constraint saturation".format(cmd)
+        self.assertTrue("saturated" in out, fail_msg)
+
+        self._log_method_end(method_name)
+
+    def test_mask(self):
+        """Tests the mask use case, with a mask that covers only the left half of the image."""
+        method_name = self.test_mask.__name__
+        self._log_method_start(method_name)
+
+        image = _pil_image.open(_to_crop_1_loc)
+        width, height = image.size
+        image.close()
+
+        half_width = width // 2
+        mask = _pil_image.new("L", (width, height), 0)
+        mask.paste(255, (0, 0, half_width, height))
+        mask.save(_mask_loc)
+
+        crop_res = min(half_width, height) // 2
+        config = _load_json(_rand_crop_config_loc)
+        config["crop_resolution"] = crop_res
+        config["resize_resolution"] = 8
+        config["crop_count"] = 32
+        config["mask_location"] = _mask_loc
+        config["min_mask_coverage"] = 1
+        _save_json(config, _rand_crop_config_loc)
+
+        cmd = "widgets rand-crop"
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
+
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
+
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        format_incorrect_info = "results format incorrect"
+
+        names = _listdir(_cropped_path)
+        fail_msg = "{} has {} crops, but expects 32; {}".format(_cropped_path, len(names), format_incorrect_info)
+        self.assertTrue(len(names) == 32, fail_msg)
+
+        for name in names:
+            pos_x = int(_re_compile(r".*-At-(\d+)-(\d+)-").match(name).group(1))
+            fail_msg = "Crop {} reaches outside the mask; {}".format(name, format_incorrect_info)
+            self.assertTrue(pos_x + crop_res <= half_width, fail_msg)
+        # end for
+
+        self._log_method_end(method_name)
+
+    def test_mask_map_res(self):
+        """Tests the mask use case, with the coverage map reduced to a quarter of the image resolution."""
+        method_name = self.test_mask_map_res.__name__
+        self._log_method_start(method_name)
+
+        image = _pil_image.open(_to_crop_1_loc)
+        width, height = image.size
+        image.close()
+
+        half_width = width // 2
+        mask = _pil_image.new("L", (width, height), 0)
+        mask.paste(255, (0, 0, half_width, height))
+        mask.save(_mask_loc)
+
+        # The map scale, 4, divides the mask edge position, so the map keeps the edge exact
+        crop_res = min(half_width, height) // 2
+        config = _load_json(_rand_crop_config_loc)
+        config["crop_resolution"] = crop_res
+        config["resize_resolution"] = 8
+        config["crop_count"] = 32
+        config["mask_location"] = _mask_loc
+        config["min_mask_coverage"] = 1
+        config["mask_map_resolution"] = max(width, height) // 4
+        _save_json(config, _rand_crop_config_loc)
+
+        cmd = "widgets rand-crop"
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
+
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
+
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        format_incorrect_info = "results format incorrect"
+
+        fail_msg = "Running \"{}\" logs no mask map resolution; {}".format(cmd, format_incorrect_info)
+        self.assertTrue("Mask map resolution" in out, fail_msg)
+
+        names = _listdir(_cropped_path)
+        fail_msg = "{} has {} crops, but expects 32; {}".format(_cropped_path, len(names), format_incorrect_info)
+        self.assertTrue(len(names) == 32, fail_msg)
+
+        for name in names:
+            pos_x = int(_re_compile(r".*-At-(\d+)-(\d+)-").match(name).group(1))
+            fail_msg = "Crop {} reaches outside the mask; {}".format(name, format_incorrect_info)
+            self.assertTrue(pos_x + crop_res <= half_width, fail_msg)
+        # end for
+
+        self._log_method_end(method_name)
+
+    def test_paired(self):
+        """Tests the paired images use case, with a 2-value label map."""
+        method_name = self.test_paired.__name__
+        self._log_method_start(method_name)
+
+        _rmtree(_paired_cropped_path, ignore_errors=True)
+
+        image = _pil_image.open(_to_crop_1_loc)
+        label_map = image.convert("L").point(lambda val: 255 if val >= 128 else 0)
+        label_map.save(_label_map_loc)
+        image.close()
+
+        config = _load_json(_rand_crop_config_loc)
+        config["resize_resolution"] = 48
+        config["crop_count"] = 8
+        config["paired_image_locations"] = [_label_map_loc]
+        config["paired_output_paths"] = [_paired_cropped_path]
+        config["paired_output_format"] = "png"
+        _save_json(config, _rand_crop_config_loc)
+
+        cmd = "widgets rand-crop"
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
+
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
+
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        format_incorrect_info = "results format incorrect"
+
+        names = sorted(_split_text(name)[0] for name in _listdir(_cropped_path))
+        paired_names = sorted(_split_text(name)[0] for name in _listdir(_paired_cropped_path))
+        fail_msg = "{} and {} have unmatched crop names; {}".format(
+            _cropped_path, _paired_cropped_path, format_incorrect_info
+        )
+        self.assertTrue(len(names) == 8 and names == paired_names, fail_msg)
+
+        for name in _listdir(_paired_cropped_path):
+            paired_crop = _pil_image.open(_join(_paired_cropped_path, name))
+            vals = set(val for _, val in paired_crop.getcolors())
+            paired_crop.close()
+
+            fail_msg = "Paired crop {} has values other than the labels {}; {}".format(
+                name, [0, 255], format_incorrect_info
+            )
+            self.assertTrue(vals.issubset({0, 255}), fail_msg)
+        # end for
+
+        self._log_method_end(method_name)
+
+    def test_scale_jitter(self):
+        """Tests the scale jitter use case, with the windows from half to twice the crop resolution."""
+        method_name = self.test_scale_jitter.__name__
+        self._log_method_start(method_name)
+
+        image = _pil_image.open(_to_crop_1_loc)
+        width, height = image.size
+        image.close()
+
+        config = _load_json(_rand_crop_config_loc)
+        crop_res = config["crop_resolution"]
+        config["resize_resolution"] = None
+        config["crop_count"] = 16
+        config["scale_jitter_range"] = [0.5, 2]
+        _save_json(config, _rand_crop_config_loc)
+
+        cmd = "widgets rand-crop"
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
+
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
+
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        format_incorrect_info = "results format incorrect"
+
+        names = _listdir(_cropped_path)
+        fail_msg = "{} has {} crops, but expects 16; {}".format(_cropped_path, len(names), format_incorrect_info)
+        self.assertTrue(len(names) == 16, fail_msg)
+
+        min_size = round(crop_res * 0.5)
+        max_size = min(crop_res * 2, width, height)
+
+        for name in names:
+            size = int(_re_compile(r".*-Crop-(\d+)-").match(name).group(1))
+            fail_msg = "Crop {} has a window size out of [{}, {}]; {}".format(
+                name, min_size, max_size, format_incorrect_info
+            )
+            self.assertTrue(min_size <= size <= max_size, fail_msg)
+
+            crop = _pil_image.open(_join(_cropped_path, name))
+            crop_size = crop.size
+            crop.close()
+
+            fail_msg = "Crop {} has size {}, but expects the crop resolution {}; {}".format(
+                name, crop_size, crop_res, format_incorrect_info
+            )
+            self.assertTrue(crop_size == (crop_res, crop_res), fail_msg)
+        # end for
+
+        self._log_method_end(method_name)
+
+    def test_draw_index(self):
+        """Tests that the crops come out in the row-major order of their boxes, and keep their draw indices."""
+        method_name = self.test_draw_index.__name__
+        self._log_method_start(method_name)
+
+        crop_count = 16
+        config = _load_json(_rand_crop_config_loc)
+        config["crop_count"] = crop_count
+        config["manifest_format"] = "jsonl"
+        config["manifest_location"] = _manifest_loc
+        _save_json(config, _rand_crop_config_loc)
+
+        cmd = "widgets rand-crop"
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
+
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
+
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        format_incorrect_info = "results format incorrect"
+        draw_pattern = _re_compile(r".*-Draw-(\d+)-At-(\d+)-(\d+)-")
+
+        names = _listdir(_cropped_path)
+        draw_idxs = sorted(int(draw_pattern.match(name).group(1)) for name in names)
+        fail_msg = "{} has the draw indices {}; {}".format(_cropped_path, draw_idxs, format_incorrect_info)
+        self.assertTrue(draw_idxs == list(range(crop_count)), fail_msg)
+
+        file = open(_manifest_loc, "r")
+        records = [_loads(line) for line in file.read().splitlines()]
+        file.close()
+
+        positions = [(record["y"], record["x"]) for record in records]
+        fail_msg = "{} has the crops out of the row-major order {}; {}".format(
+            _manifest_loc, positions, format_incorrect_info
+        )
+        self.assertTrue(positions == sorted(positions), fail_msg)
+
+        for record in records:
+            match = draw_pattern.match(_basename(record["location"]))
+            fail_msg = "Record {} disagrees with the draw index or position of its name; {}".format(
+                record, format_incorrect_info
+            )
+            self.assertTrue(int(match.group(1)) == record["index"], fail_msg)
+            self.assertTrue((int(match.group(2)), int(match.group(3))) == (record["x"], record["y"]), fail_msg)
+        # end for
+
+        self._log_method_end(method_name)
+
+
+class TestWidgetsBulkCrop(_TestCmd):
+    """Tests for the "widgets bulk-crop <command> ..." command."""
+
+    def setUp(self):
+        """Sets up before the tests."""
+        super().setUp()
+        self._backup_cmd_configs()
+
+        _rmtree(_bulk_cropped_path, ignore_errors=True)
+        _rmtree(_to_bulk_crop_path, ignore_errors=True)
+        _makedirs(_bulk_cropped_path, exist_ok=True)
+        _copytree(_default_to_bulk_crop_path, _to_bulk_crop_path)
+
+        config = _load_json(_bulk_crop_config_loc)
+        config["bulk_input_path"] = _to_bulk_crop_path
+        config["bulk_output_path"] = _bulk_cropped_path
+        _save_json(config, _bulk_crop_config_loc)
+
+    def tearDown(self):
+        """Tears down after the tests."""
+        super().tearDown()
+        self._restore_cmd_configs()
+
+        _rmtree(_bulk_cropped_path, ignore_errors=True)
+        _rmtree(_to_bulk_crop_path, ignore_errors=True)
+
+    def test_norm_grid(self):
+        """Tests the normal use case for the "grid" subcommand."""
+        method_name = self.test_norm_grid.__name__
+        self._log_method_start(method_name)
+
+        cmd = "widgets bulk-crop grid"
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
+
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
+
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        format_incorrect_info = "results format incorrect"
+
+        isdir = _isdir(_bulk_cropped_path)
+        fail_msg = "{} is not a directory; {}".format(_bulk_cropped_path, format_incorrect_info)
+        self.assertTrue(isdir, fail_msg)
+
+        regexs_depth_1 = [
+            _re_compile(r"GridCrop-.*")
+        ]
+        regexs_depth_2 = [
+            _re_compile(r".*-At-.*-Crop-.*(-Resize-.*)?(-Flip-(x|y|xy))?(-Rotation-(x|y|xy))?-Time-.*\.jpg")
+        ]
+
+        names_depth_1 = _listdir(_bulk_cropped_path)
+
+        for name_depth_1 in names_depth_1:
+            obj_path_depth_1 = _join(_bulk_cropped_path, name_depth_1)
+            isdir_depth_1 = _isdir(obj_path_depth_1)
+            fail_msg = "The object at path {} is not a directory; {}".format(obj_path_depth_1, format_incorrect_info)
+            self.assertTrue(isdir_depth_1, fail_msg)
+
+            for regex_depth_1 in regexs_depth_1:
+                matched = bool(regex_depth_1.match(name_depth_1))
+
+                fail_msg = "Folder name {} in {} does not match pattern {}; {}".format(
+                    name_depth_1, _bulk_cropped_path, str(regex_depth_1), format_incorrect_info
+                )
+
+                self.assertTrue(matched, fail_msg)
+            # end for
+
+            names_depth_2 = _listdir(obj_path_depth_1)
+
+            for name_depth_2 in names_depth_2:
+                obj_path_depth_2 = _join(_bulk_cropped_path, name_depth_1, name_depth_2)
+                isfile_depth_2 = _isfile(obj_path_depth_2)
+                fail_msg = "The object at path {} is not a file; {}".format(obj_path_depth_2, format_incorrect_info)
+                self.assertTrue(isfile_depth_2, fail_msg)
+
+                for regex_depth_2 in regexs_depth_2:
+                    matched = bool(regex_depth_2.match(name_depth_2))
+
+                    fail_msg = "File name {} in {} does not match pattern {}; {}".format(
+                        name_depth_2, obj_path_depth_1, str(regex_depth_2), format_incorrect_info
+                    )
+
+                    self.assertTrue(matched, fail_msg)
+                # end for
+            # end for
+        # end for
+
+        self._log_method_end(method_name)
+
+    def test_norm_rand(self):
+        """Tests the normal use case for the "rand" subcommand."""
+        method_name = self.test_norm_grid.__name__
+        self._log_method_start(method_name)
+
+        cmd = "widgets bulk-crop rand"
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
+
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
+
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        format_incorrect_info = "results format incorrect"
+
+        isdir = _isdir(_bulk_cropped_path)
+        fail_msg = "{} is not a directory; {}".format(_bulk_cropped_path, format_incorrect_info)
+        self.assertTrue(isdir, fail_msg)
+
+        regexs_depth_1 = [
+            _re_compile(r"RandCrop-.*")
+        ]
+        regexs_depth_2 = [
+            _re_compile(r".*-At-.*-Crop-.*(-Resize-.*)?(-Flip-(x|y|xy))?(-Rotation-(x|y|xy))?-Time-.*\.jpg")
+        ]
+
+        names_depth_1 = _listdir(_bulk_cropped_path)
+
+        for name_depth_1 in names_depth_1:
+            obj_path_depth_1 = _join(_bulk_cropped_path, name_depth_1)
+            isdir_depth_1 = _isdir(obj_path_depth_1)
+            fail_msg = "The object at path {} is not a directory; {}".format(obj_path_depth_1, format_incorrect_info)
+            self.assertTrue(isdir_depth_1, fail_msg)
+
+            for regex_depth_1 in regexs_depth_1:
+                matched = bool(regex_depth_1.match(name_depth_1))
+
+                fail_msg = "Folder name {} in {} does not match pattern {}; {}".format(
+                    name_depth_1, _bulk_cropped_path, str(regex_depth_1), format_incorrect_info
+                )
+
+                self.assertTrue(matched, fail_msg)
+            # end for
+
+            names_depth_2 = _listdir(obj_path_depth_1)
 
             for name_depth_2 in names_depth_2:
                 obj_path_depth_2 = _join(_bulk_cropped_path, name_depth_1, name_depth_2)
@@ -682,20 +1905,823 @@ class TestWidgetsBulkCrop(_TestCmd):
                 fail_msg = "The object at path {} is not a file; {}".format(obj_path_depth_2, format_incorrect_info)
                 self.assertTrue(isfile_depth_2, fail_msg)
 
-                for regex_depth_2 in regexs_depth_2:
-                    matched = bool(regex_depth_2.match(name_depth_2))
+                for regex_depth_2 in regexs_depth_2:
+                    matched = bool(regex_depth_2.match(name_depth_2))
+
+                    fail_msg = "File name {} in {} does not match pattern {}; {}".format(
+                        name_depth_2, obj_path_depth_1, str(regex_depth_2), format_incorrect_info
+                    )
+
+                    self.assertTrue(matched, fail_msg)
+                # end for
+            # end for
+        # end for
+
+        self._log_method_end(method_name)
+
+    def test_total_crop_count(self):
+        """Tests the use case for the "rand" subcommand with a total crop count split over the images."""
+        method_name = self.test_total_crop_count.__name__
+        self._log_method_start(method_name)
+
+        config = _load_json(_bulk_crop_config_loc)
+        config["total_crop_count"] = 11
+        config["crop_count_weighting"] = "area"
+        _save_json(config, _bulk_crop_config_loc)
+
+        cmd = "widgets bulk-crop rand"
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
+
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
+
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        format_incorrect_info = "results format incorrect"
+
+        crop_counts = []
+
+        for name in sorted(_listdir(_bulk_cropped_path)):
+            names = _listdir(_join(_bulk_cropped_path, name))
+            crop_counts.append(len([crop_name for crop_name in names if crop_name.endswith(".jpg")]))
+        # end for
+
+        # The 2 images have the same size, so the earlier one gets the remainder
+        fail_msg = "{} has unexpected crop counts {}; {}".format(
+            _bulk_cropped_path, crop_counts, format_incorrect_info
+        )
+        self.assertTrue(sorted(crop_counts) == [5, 6], fail_msg)
+
+        self._log_method_end(method_name)
+
+    def test_norm_resize(self):
+        """Tests the normal use case for the "resize" subcommand."""
+        method_name = self.test_norm_resize.__name__
+        self._log_method_start(method_name)
+
+        manifest_loc = _join(_bulk_cropped_path, "manifest.jsonl")
+
+        config = _load_json(_bulk_crop_config_loc)
+        config["manifest_format"] = "jsonl"
+        config["resize_config_overrides"]["short_side"] = 72
+        config["resize_config_overrides"]["worker_count"] = 2
+        _save_json(config, _bulk_crop_config_loc)
+
+        cmd = "widgets bulk-crop resize"
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
+
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
+
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        format_incorrect_info = "results format incorrect"
+
+        in_names = _listdir(_to_bulk_crop_path)
+        regex = _re_compile(r"Resize-.*\.jpg")
+        names = [name for name in _listdir(_bulk_cropped_path) if bool(regex.match(name))]
+
+        fail_msg = "{} has {} resized images but {} has {} images; {}".format(
+            _bulk_cropped_path, len(names), _to_bulk_crop_path, len(in_names), format_incorrect_info
+        )
+        self.assertTrue(len(names) == len(in_names), fail_msg)
+
+        for name in names:
+            # The 512 by 288 images shrink to a 72 pixel short side
+            image = _pil_image.open(_join(_bulk_cropped_path, name))
+            fail_msg = "Resized image {} has an unexpected size {}; {}".format(name, image.size, format_incorrect_info)
+            self.assertTrue(image.size == (128, 72), fail_msg)
+        # end for
+
+        file = open(manifest_loc, "r")
+        records = [_loads(line) for line in file.read().splitlines()]
+        file.close()
+
+        fail_msg = "{} has {} records but {} images are resized; {}".format(
+            manifest_loc, len(records), len(names), format_incorrect_info
+        )
+        self.assertTrue(len(records) == len(names), fail_msg)
+
+        self._log_method_end(method_name)
+
+    def test_dedup_grid(self):
+        """Tests the near duplicate dropping use case for the "grid" subcommand, with a duplicate image."""
+        method_name = self.test_dedup_grid.__name__
+        self._log_method_start(method_name)
+
+        image_name = _listdir(_to_bulk_crop_path)[0]
+        image_base_name, image_ext = _split_text(image_name)
+        dup_name = f"{image_base_name}-Duplicate{image_ext}"
+        _copyfile(_join(_to_bulk_crop_path, image_name), _join(_to_bulk_crop_path, dup_name))
+
+        config = _load_json(_bulk_crop_config_loc)
+        config["grid_crop_config_overrides"]["dedup_max_distance"] = 0
+        _save_json(config, _bulk_crop_config_loc)
+
+        cmd = "widgets bulk-crop grid"
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
+
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
+
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        format_incorrect_info = "results format incorrect"
+
+        crop_counts = []
+
+        for name in [image_base_name, f"{image_base_name}-Duplicate"]:
+            path = _join(_bulk_cropped_path, f"GridCrop-{name}")
+            crop_counts.append(len(_listdir(path)) if _exists(path) else 0)
+        # end for
+
+        # The image cropped first keeps its crops, and the other has all its crops dropped
+        kept_count = max(crop_counts)
+        fail_msg = "The duplicate images have crop counts {}, but expect a positive one and 0; {}".format(
+            crop_counts, format_incorrect_info
+        )
+        self.assertTrue(kept_count > 0 and min(crop_counts) == 0, fail_msg)
+
+        dropped_logs = _re_compile(r"Bulk dropped near duplicate count: (\d+)").findall(out)
+        fail_msg = "Running \"{}\" does not log a bulk dropped count of at least {}".format(cmd, kept_count)
+        self.assertTrue(len(dropped_logs) == 1 and int(dropped_logs[0]) >= kept_count, fail_msg)
+
+        self._log_method_end(method_name)
+
+
+class TestWidgetsBench(_TestCmd):
+    """Tests for the "widgets bench <command> ..." command."""
+
+    def setUp(self):
+        """Sets up before the tests."""
+        super().setUp()
+        self._backup_cmd_configs()
+
+        _rmtree(_to_crop_path, ignore_errors=True)
+        _copytree(_default_to_crop_path, _to_crop_path)
+
+        config = _load_json(_bench_config_loc)
+        config["image_location"] = _to_crop_1_loc
+        _save_json(config, _bench_config_loc)
+
+    def tearDown(self):
+        """Tears down after the tests."""
+        super().tearDown()
+        self._restore_cmd_configs()
+
+        _rmtree(_to_crop_path, ignore_errors=True)
+
+    def test_norm_codec(self):
+        """Tests the normal use case for the "codec" subcommand."""
+        method_name = self.test_norm_codec.__name__
+        self._log_method_start(method_name)
+
+        cmd = "widgets bench codec"
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
 
-                    fail_msg = "File name {} in {} does not match pattern {}; {}".format(
-                        name_depth_2, obj_path_depth_1, str(regex_depth_2), format_incorrect_info
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
+
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        format_incorrect_info = "results format incorrect"
+        regex = _re_compile(r"Format: .* Profile: .* Encode: .* ms/crop .* Size: .* bytes/crop .* PSNR: .* dB")
+        matched = bool(regex.search(out))
+        fail_msg = "The output of \"{}\" does not match pattern {}; {}".format(cmd, str(regex), format_incorrect_info)
+        self.assertTrue(matched, fail_msg)
+
+        self._log_method_end(method_name)
+
+    def test_norm_resample(self):
+        """Tests the normal use case for the "resample" subcommand."""
+        method_name = self.test_norm_resample.__name__
+        self._log_method_start(method_name)
+
+        config = _load_json(_bench_config_loc)
+        config["resize_resolution"] = config["crop_resolution"] // 4
+        _save_json(config, _bench_config_loc)
+
+        cmd = "widgets bench resample"
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
+
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
+
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        format_incorrect_info = "results format incorrect"
+        regex = _re_compile(r"Resample: .* Reducing gap: .* Resize: .* ms/crop .* PSNR: .* dB")
+        matched = bool(regex.search(out))
+        fail_msg = "The output of \"{}\" does not match pattern {}; {}".format(cmd, str(regex), format_incorrect_info)
+        self.assertTrue(matched, fail_msg)
+
+        self._log_method_end(method_name)
+
+
+class TestCrops(_TestCmd):
+    """Tests for the in-memory crop generators."""
+
+    def test_pyramid_levels(self):
+        """Tests the pyramid level sizes on the odd image sizes, where the reduce rounding shows."""
+        method_name = self.test_pyramid_levels.__name__
+        self._log_method_start(method_name)
+
+        format_incorrect_info = "results format incorrect"
+
+        for size in [(250, 131), (251, 97)]:
+            image = _pil_image.new("RGB", size)
+
+            for scales in [[1, 0.5, 0.25], [0.75, 0.375, 0.125], [0.6, 0.3]]:
+                for scale, level in _iter_pyramid(image, scales):
+                    level_size = _find_level_size(size, scale)
+                    fail_msg = "Level {} of size {} has size {}, but find_level_size gives {}; {}".format(
+                        scale, size, level.size, level_size, format_incorrect_info
                     )
+                    self.assertTrue(level.size == level_size, fail_msg)
+                # end for
+            # end for
+        # end for
 
-                    self.assertTrue(matched, fail_msg)
+        fail_msg = "find_level_size does not round up a 0.25 scale like the PIL reduce; {}".format(
+            format_incorrect_info
+        )
+        self.assertTrue(_find_level_size((250, 131), 0.25) == (63, 33), fail_msg)
+
+        self._log_method_end(method_name)
+
+    def test_resize_image(self):
+        """Tests that an exact integer downscale keeps the resample and the reducing gap, except for "box"."""
+        method_name = self.test_resize_image.__name__
+        self._log_method_start(method_name)
+
+        format_incorrect_info = "results format incorrect"
+
+        rand = _Random(0)
+        image = _pil_image.new("L", (256, 128))
+        image.putdata([rand.randrange(256) for _ in range(256 * 128)])
+        size = (64, 32)
+
+        for resample, filter_ in [("bicubic", _pil_image.BICUBIC), ("lanczos", _pil_image.LANCZOS)]:
+            for reducing_gap in [None, 2]:
+                result = _resize_image(image, size, resample, reducing_gap)
+                expected = image.resize(size, resample=filter_, reducing_gap=reducing_gap)
+                fail_msg = "The {} resample with the reducing gap {} differs from the PIL resize; {}".format(
+                    resample, reducing_gap, format_incorrect_info
+                )
+                self.assertTrue(result.tobytes() == expected.tobytes(), fail_msg)
+            # end for
+        # end for
+
+        result = _resize_image(image, size, "box", None)
+        fail_msg = "The box resample does not take the PIL reduce; {}".format(format_incorrect_info)
+        self.assertTrue(result.tobytes() == image.reduce(4).tobytes(), fail_msg)
+
+        self._log_method_end(method_name)
+
+    def test_grid_crops(self):
+        """Tests the grid crop generator with the PIL image, array, and location sources."""
+        method_name = self.test_grid_crops.__name__
+        self._log_method_start(method_name)
+
+        format_incorrect_info = "results format incorrect"
+
+        image = _pil_image.open(_default_to_crop_1_loc)
+        image.load()
+        width, height = image.size
+        sources = {"image": image, "array": _make_array_source(image), "location": _default_to_crop_1_loc}
+
+        crop_res = 64
+        resize_res = 32
+        flips = ["", "x"]
+        count = (width // crop_res) * (height // crop_res) * len(flips)
+        meta_keys = {"index", "x", "y", "width", "height", "resize", "flip", "rotation", "stride_x", "stride_y"}
+        expected_datas = None
+
+        for source_type, source in sources.items():
+            image_crops = list(_iter_grid_crops(source, crop_res, resize_res, flips=flips))
+            array_crops = list(_iter_grid_crops(source, crop_res, resize_res, flips=flips, as_array=True))
+
+            fail_msg = "The {} source gives {} crops, but expects {}; {}".format(
+                source_type, len(image_crops), count, format_incorrect_info
+            )
+            self.assertTrue(len(image_crops) == count and len(array_crops) == count, fail_msg)
+
+            for (crop, meta), (array, array_meta) in zip(image_crops, array_crops):
+                fail_msg = "The {} source gives the crop metadata {}; {}".format(
+                    source_type, meta, format_incorrect_info
+                )
+                self.assertTrue(set(meta) == meta_keys and meta == array_meta, fail_msg)
+                self.assertTrue(meta["width"] == crop_res and meta["resize"] == resize_res, fail_msg)
+                self.assertTrue(meta["x"] + crop_res <= width and meta["y"] + crop_res <= height, fail_msg)
+
+                fail_msg = "The {} source gives a crop of size {} and an array of shape {}; {}".format(
+                    source_type, crop.size, array.shape, format_incorrect_info
+                )
+                self.assertTrue(crop.size == (resize_res, resize_res), fail_msg)
+                self.assertTrue(array.shape == (resize_res, resize_res, 3), fail_msg)
+
+                fail_msg = "The {} source gives an array that differs from its crop; {}".format(
+                    source_type, format_incorrect_info
+                )
+                self.assertTrue(array.tobytes() == crop.tobytes(), fail_msg)
+            # end for
+
+            datas = [crop.tobytes() for crop, _ in image_crops]
+
+            if expected_datas is None:
+                expected_datas = datas
+
+            fail_msg = "The {} source gives crops that differ from the image source; {}".format(
+                source_type, format_incorrect_info
+            )
+            self.assertTrue(datas == expected_datas, fail_msg)
+        # end for
+
+        self._log_method_end(method_name)
+
+    def test_rand_crops(self):
+        """Tests the random crop generator with the PIL image, array, and location sources, and the seeds."""
+        method_name = self.test_rand_crops.__name__
+        self._log_method_start(method_name)
+
+        format_incorrect_info = "results format incorrect"
+
+        image = _pil_image.open(_default_to_crop_1_loc)
+        image.load()
+        width, height = image.size
+        sources = {"image": image, "array": _make_array_source(image), "location": _default_to_crop_1_loc}
+
+        crop_res = 64
+        resize_res = 48
+        crop_count = 16
+        meta_keys = {"index", "x", "y", "width", "height", "resize", "flip", "rotation"}
+        expected = None
+
+        for source_type, source in sources.items():
+            image_crops = list(
+                _iter_rand_crops(source, crop_res, resize_res, crop_count, seed=0, flips=["", "x", "y", "xy"])
+            )
+            array_crops = list(
+                _iter_rand_crops(
+                    source, crop_res, resize_res, crop_count, seed=0, flips=["", "x", "y", "xy"], as_array=True
+                )
+            )
+
+            fail_msg = "The {} source gives {} crops, but expects {}; {}".format(
+                source_type, len(image_crops), crop_count, format_incorrect_info
+            )
+            self.assertTrue(len(image_crops) == crop_count and len(array_crops) == crop_count, fail_msg)
+
+            for (crop, meta), (array, array_meta) in zip(image_crops, array_crops):
+                fail_msg = "The {} source gives the crop metadata {}; {}".format(
+                    source_type, meta, format_incorrect_info
+                )
+                self.assertTrue(set(meta) == meta_keys and meta == array_meta, fail_msg)
+                self.assertTrue(meta["width"] == crop_res and meta["resize"] == resize_res, fail_msg)
+                self.assertTrue(meta["x"] + crop_res <= width and meta["y"] + crop_res <= height, fail_msg)
+
+                fail_msg = "The {} source gives an array of shape {} that differs from its crop; {}".format(
+                    source_type, array.shape, format_incorrect_info
+                )
+                self.assertTrue(array.shape == (resize_res, resize_res, 3), fail_msg)
+                self.assertTrue(array.tobytes() == crop.tobytes(), fail_msg)
+            # end for
+
+            results = [(meta, crop.tobytes()) for crop, meta in image_crops]
+
+            if expected is None:
+                expected = results
+
+            fail_msg = "The {} source with the same seed gives different crops; {}".format(
+                source_type, format_incorrect_info
+            )
+            self.assertTrue(results == expected, fail_msg)
+        # end for
+
+        other_crops = _iter_rand_crops(image, crop_res, resize_res, crop_count, seed=1, flips=["", "x", "y", "xy"])
+        other_metas = [meta for _, meta in other_crops]
+        fail_msg = "Seeds 0 and 1 give the same crop positions; {}".format(format_incorrect_info)
+        self.assertTrue(other_metas != [meta for meta, _ in expected], fail_msg)
+
+        self._log_method_end(method_name)
+
+    def test_rand_crop_order(self):
+        """Tests the row-major order of the random crops, and the draw indices in their metadata."""
+        method_name = self.test_rand_crop_order.__name__
+        self._log_method_start(method_name)
+
+        format_incorrect_info = "results format incorrect"
+
+        crop_count = 32
+        metas = [meta for _, meta in _iter_rand_crops(_default_to_crop_1_loc, 64, None, crop_count, seed=2)]
+        positions = [(meta["y"], meta["x"]) for meta in metas]
+        fail_msg = "The crops are out of the row-major order {}; {}".format(positions, format_incorrect_info)
+        self.assertTrue(positions == sorted(positions), fail_msg)
+
+        draw_metas = [
+            meta for _, meta in _iter_rand_crops(_default_to_crop_1_loc, 64, None, crop_count, seed=2, row_major=False)
+        ]
+
+        draw_idxs = [meta["index"] for meta in draw_metas]
+        fail_msg = "The crops in the draw order have the draw indices {}; {}".format(draw_idxs, format_incorrect_info)
+        self.assertTrue(draw_idxs == list(range(crop_count)), fail_msg)
+
+        # Each draw index keeps its position, whichever order the crops come in
+        fail_msg = "The row-major crops lose the positions of their draw indices; {}".format(format_incorrect_info)
+        self.assertTrue(sorted(metas, key=lambda meta: meta["index"]) == draw_metas, fail_msg)
+
+        dataset = _rand_dataset([_default_to_crop_1_loc] * 2, 64, None, crop_count, seed=2)
+        keys = [(meta["source"], meta["y"], meta["x"]) for _, meta in dataset]
+        fail_msg = "The dataset crops are out of the (source, y, x) order {}; {}".format(keys, format_incorrect_info)
+        self.assertTrue(keys == sorted(keys) and len(keys) == crop_count * 2, fail_msg)
+
+        self._log_method_end(method_name)
+
+    def test_rand_crop_jitter_checks(self):
+        """Tests that the jittered windows keep the mask coverage and the unique windows."""
+        method_name = self.test_rand_crop_jitter_checks.__name__
+        self._log_method_start(method_name)
+
+        format_incorrect_info = "results format incorrect"
+
+        image = _pil_image.new("RGB", (256, 128))
+        mask = _pil_image.new("L", image.size, 0)
+        mask.paste(255, (0, 0, 128, 128))
+        crop_res = 32
+        mask_index = _MaskIndex(mask, crop_res, min_coverage=1)
+
+        crops = _iter_rand_crops(image, crop_res, None, 64, seed=0, mask=mask_index, scale_range=[1, 4])
+        metas = [meta for _, meta in crops]
+
+        fail_msg = "The rand crops give {} crops, but expects 64; {}".format(len(metas), format_incorrect_info)
+        self.assertTrue(len(metas) == 64, fail_msg)
+
+        for meta in metas:
+            fail_msg = "A jittered crop {} reaches outside the mask; {}".format(meta, format_incorrect_info)
+            self.assertTrue(meta["x"] + meta["width"] <= 128, fail_msg)
+        # end for
+
+        # Every window clamps to the whole image, so only the drawn windows can stay unique
+        image = _pil_image.new("RGB", (34, 34))
+        crops = _iter_rand_crops(image, crop_res, None, 9, seed=0, unique=True, scale_range=[4, 4])
+        metas = [meta for _, meta in crops]
+        windows = {(meta["x"], meta["y"], meta["width"]) for meta in metas}
+        fail_msg = "The unique jittered crops repeat a window, giving {}; {}".format(windows, format_incorrect_info)
+        self.assertTrue(len(metas) == 9 and len(windows) == 9, fail_msg)
+
+        self._log_method_end(method_name)
+
+    def test_importance_edges(self):
+        """Tests that the importance draws on a flat image do not pile up at the right and bottom edges."""
+        method_name = self.test_importance_edges.__name__
+        self._log_method_start(method_name)
+
+        format_incorrect_info = "results format incorrect"
+
+        image = _pil_image.new("RGB", (100, 100))
+        sampler = _ImportanceSampler(image, 25, "variance", 10)
+        draw_count = 8000
+        xs, ys = sampler.draw(_Random(0), draw_count)
+        limit = 3 * draw_count // (sampler.max_pos_x + 1)
+
+        for axis, poses in [("X", xs), ("Y", ys)]:
+            max_count = max(poses.count(pos) for pos in set(poses))
+            fail_msg = "A {} position gets {} of {} draws, over {}; {}".format(
+                axis, max_count, draw_count, limit, format_incorrect_info
+            )
+            self.assertTrue(max_count <= limit, fail_msg)
+        # end for
+
+        self._log_method_end(method_name)
+
+    def test_importance_modes(self):
+        """Tests that the importance modes favor the textured half of a half flat, half textured image."""
+        method_name = self.test_importance_modes.__name__
+        self._log_method_start(method_name)
+
+        format_incorrect_info = "results format incorrect"
+
+        width = 512
+        height = 256
+        half_width = width // 2
+        rand = _Random(0)
+        noise_data = bytes(rand.randrange(256) for _ in range(half_width * height))
+        image = _pil_image.new("L", (width, height), 128)
+        image.paste(_pil_image.frombytes("L", (half_width, height), noise_data), (half_width, 0))
+        image = image.convert("RGB")
+
+        crop_res = 32
+        crop_count = 64
+
+        for importance_mode in ["edges", "variance"]:
+            metas = [
+                meta for _, meta in _iter_rand_crops(
+                    image, crop_res, None, crop_count, seed=0, importance_mode=importance_mode
+                )
+            ]
+
+            textured_count = sum(1 for meta in metas if meta["x"] + crop_res // 2 >= half_width)
+            fail_msg = "Importance mode {} puts {} of {} crops in the textured half; {}".format(
+                importance_mode, textured_count, crop_count, format_incorrect_info
+            )
+            self.assertTrue(len(metas) == crop_count and textured_count >= crop_count * 3 // 4, fail_msg)
+
+            same_seed_metas = [
+                meta for _, meta in _iter_rand_crops(
+                    image, crop_res, None, crop_count, seed=0, importance_mode=importance_mode
+                )
+            ]
+
+            fail_msg = "Importance mode {} with the same seed gives different positions; {}".format(
+                importance_mode, format_incorrect_info
+            )
+            self.assertTrue(same_seed_metas == metas, fail_msg)
+        # end for
+
+        self._log_method_end(method_name)
+
+
+class TestDatasets(_TestCmd):
+    """Tests for the virtual crop datasets."""
+
+    def setUp(self):
+        """Sets up before the tests."""
+        super().setUp()
+        self._backup_cmd_configs()
+
+        _rmtree(_cropped_path, ignore_errors=True)
+        _rmtree(_to_crop_path, ignore_errors=True)
+        _makedirs(_cropped_path, exist_ok=True)
+        _copytree(_default_to_crop_path, _to_crop_path)
+
+        for config_loc in [_grid_crop_config_loc, _rand_crop_config_loc]:
+            config = _load_json(config_loc)
+            config["image_location"] = _to_crop_1_loc
+            config["output_path"] = _cropped_path
+            config["output_format"] = "png"
+            _save_json(config, config_loc)
+        # end for
+
+    def tearDown(self):
+        """Tears down after the tests."""
+        super().tearDown()
+        self._restore_cmd_configs()
+
+        _rmtree(_cropped_path, ignore_errors=True)
+        _rmtree(_to_crop_path, ignore_errors=True)
+
+        for loc in [
+            _manifest_loc, _manifest_loc.replace(".jsonl", ".csv"), _bin_manifest_loc,
+            _bin_manifest_loc + manifests.bin_sources_suffix, _bin_manifest_loc + manifests.bin_locations_suffix
+        ]:
+            if _exists(loc):
+                _remove(loc)
+        # end for
+
+    def _run_crop(self, cmd, config_loc, config_updates):
+        config = _load_json(config_loc)
+        config.update(config_updates)
+        _save_json(config, config_loc)
+
+        _rmtree(_cropped_path, ignore_errors=True)
+        _makedirs(_cropped_path, exist_ok=True)
+
+        instr = "\n"
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
+
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
+
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        return config
+
+    def test_csv_manifest_fields(self):
+        """Tests that a CSV manifest keeps the fields that only the later records have, and rejects unknown fields."""
+        method_name = self.test_csv_manifest_fields.__name__
+        self._log_method_start(method_name)
+
+        format_incorrect_info = "results format incorrect"
+
+        csv_loc = _manifest_loc.replace(".jsonl", ".csv")
+        base_record = {
+            "index": 0, "source": "a.png", "x": 0, "y": 0, "width": 8, "height": 8, "resize": None, "flip": "",
+            "rotation": 0, "location": "a-0.png", "bytes": 1
+        }
+        paired_record = dict(base_record, index=1, location="a-1.png", paired_locations=["b-1.png"])
+
+        manifest = _ManifestWriter(csv_loc, "csv")
+        manifest.write(base_record)
+        manifest.write(paired_record)
+
+        try:
+            manifest.write(dict(base_record, unknown=1))
+            raised = False
+        except ValueError:
+            raised = True
+        # end try
+
+        manifest.close()
+        records = _load_manifest(csv_loc)
+
+        fail_msg = "A CSV manifest drops the later fields, giving {}; {}".format(records, format_incorrect_info)
+        self.assertTrue(len(records) == 2, fail_msg)
+        self.assertTrue(records[0]["paired_locations"] == "", fail_msg)
+        self.assertTrue(_loads(records[1]["paired_locations"]) == ["b-1.png"], fail_msg)
+
+        fail_msg = "A CSV manifest accepts an unknown field; {}".format(format_incorrect_info)
+        self.assertTrue(raised, fail_msg)
+
+        self._log_method_end(method_name)
+
+    def test_manifest_dataset(self):
+        """Tests that the manifest datasets regenerate the saved crops, including the multi-scale and cascaded runs."""
+        method_name = self.test_manifest_dataset.__name__
+        self._log_method_start(method_name)
+
+        runs = [
+            ("widgets grid-crop", _grid_crop_config_loc, {}),
+            ("widgets grid-crop", _grid_crop_config_loc, {"save_flips": False, "scales": [1, 0.5]}),
+            ("widgets grid-crop", _grid_crop_config_loc, {"save_flips": False, "resize_resolution": [64, 32, 16]}),
+            (
+                "widgets grid-crop", _grid_crop_config_loc,
+                {"save_flips": False, "crop_resolution": 40, "resize_resolution": [48, 24], "scales": [1, 0.5, 0.25]}
+            ),
+            ("widgets rand-crop", _rand_crop_config_loc, {"manual_seed": 0, "resize_resolution": [48, 16]})
+        ]
+
+        manifest_locs = {
+            "jsonl": _manifest_loc,
+            "csv": _manifest_loc.replace(".jsonl", ".csv"),
+            "bin": _bin_manifest_loc
+        }
+
+        format_incorrect_info = "results format incorrect"
+
+        for cmd, config_loc, config_updates in runs:
+            for manifest_format, manifest_loc in manifest_locs.items():
+                format_updates = dict(config_updates, manifest_format=manifest_format, manifest_location=manifest_loc)
+                self._run_crop(cmd, config_loc, format_updates)
+
+                records = _load_manifest(manifest_loc)
+                dataset = _manifest_dataset(manifest_loc)
+
+                fail_msg = "The dataset of {} has {} crops, but the manifest has {} records; {}".format(
+                    manifest_loc, len(dataset), len(records), format_incorrect_info
+                )
+                self.assertTrue(len(dataset) == len(records) and len(records) > 0, fail_msg)
+
+                for idx, record in enumerate(records):
+                    crop, _ = dataset[idx]
+                    saved = _pil_image.open(record["location"])
+                    saved.load()
+
+                    fail_msg = "Crop {} of the {} dataset of {} {} differs from {}; {}".format(
+                        idx, manifest_format, cmd, config_updates, record["location"], format_incorrect_info
+                    )
+                    self.assertTrue(crop.tobytes() == saved.tobytes(), fail_msg)
                 # end for
             # end for
         # end for
 
         self._log_method_end(method_name)
 
+    def test_config_datasets(self):
+        """Tests that the grid and random config datasets regenerate the crops of the commands."""
+        method_name = self.test_config_datasets.__name__
+        self._log_method_start(method_name)
+
+        format_incorrect_info = "results format incorrect"
+
+        runs = [
+            ("widgets grid-crop", _grid_crop_config_loc, _grid_config_dataset),
+            ("widgets rand-crop", _rand_crop_config_loc, _rand_config_dataset)
+        ]
+
+        for cmd, config_loc, make_dataset in runs:
+            config_updates = {"manual_seed": 0, "manifest_format": "jsonl", "manifest_location": _manifest_loc}
+            config = self._run_crop(cmd, config_loc, config_updates)
+
+            saved_crops = {}
+
+            for record in _load_manifest(_manifest_loc):
+                key = (record["index"], record["x"], record["y"], record["flip"], record["rotation"])
+                saved_crops[key] = _pil_image.open(record["location"]).tobytes()
+            # end for
+
+            dataset_crops = {}
+
+            for crop, meta in make_dataset(config):
+                key = (meta["index"], meta["x"], meta["y"], meta["flip"], meta["rotation"])
+                dataset_crops[key] = crop.tobytes()
+            # end for
+
+            fail_msg = "The config dataset of \"{}\" differs from the saved crops; {}".format(
+                cmd, format_incorrect_info
+            )
+            self.assertTrue(len(saved_crops) > 0 and dataset_crops == saved_crops, fail_msg)
+        # end for
+
+        # The flip and rotation keys are optional
+        config = _load_json(_grid_crop_config_loc)
+        del config["save_flips"]
+        del config["save_rotations"]
+        dataset = _grid_config_dataset(config)
+        variants = set((meta["flip"], meta["rotation"]) for _, meta in dataset)
+        fail_msg = "The config dataset without the flip keys has the variants {}; {}".format(
+            variants, format_incorrect_info
+        )
+        self.assertTrue(variants == {("", 0)}, fail_msg)
+
+        self._log_method_end(method_name)
+
+    def test_cache_bytes(self):
+        """Tests that the decoded source cache stays within its byte bound, and keeps the latest source."""
+        method_name = self.test_cache_bytes.__name__
+        self._log_method_start(method_name)
+
+        format_incorrect_info = "results format incorrect"
+
+        image = _pil_image.open(_to_crop_1_loc)
+        image_bytes = image.width * image.height * len(image.getbands())
+        image.close()
+
+        sources = [_to_crop_1_loc] * 3
+
+        for max_cache_bytes in [1, image_bytes * 2]:
+            dataset = _grid_dataset(sources, 64, max_cache_bytes=max_cache_bytes)
+            crop_count = len(dataset) // len(sources)
+
+            for source_idx in range(len(sources)):
+                _, meta = dataset[source_idx * crop_count]
+                cache_bytes = dataset.cache_bytes
+
+                fail_msg = "Cache byte size {} exceeds the bound {}; {}".format(
+                    cache_bytes, max(max_cache_bytes, image_bytes), format_incorrect_info
+                )
+                self.assertTrue(cache_bytes <= max(max_cache_bytes, image_bytes), fail_msg)
+            # end for
+
+            expected_bytes = min(max(max_cache_bytes, image_bytes), image_bytes * len(sources))
+            fail_msg = "Cache byte size {} after all the sources, but expects {}; {}".format(
+                dataset.cache_bytes, expected_bytes, format_incorrect_info
+            )
+            self.assertTrue(dataset.cache_bytes == expected_bytes, fail_msg)
+
+            dataset.clear_cache()
+            fail_msg = "Cache byte size {} after clearing; {}".format(dataset.cache_bytes, format_incorrect_info)
+            self.assertTrue(dataset.cache_bytes == 0, fail_msg)
+        # end for
+
+        self._log_method_end(method_name)
+
 
 def main():
     """Runs this module as an executable."""